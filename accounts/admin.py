@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Account, SimpleFINConnection
+from .models import Account, PlaidItem, SimpleFINConnection, SimpleFINSyncJob
 
 
 class AccountAdmin(admin.ModelAdmin):
@@ -13,5 +13,17 @@ class SimpleFINConnectionAdmin(admin.ModelAdmin):
     list_filter = ("budget",)
 
 
+class PlaidItemAdmin(admin.ModelAdmin):
+    list_display = ("item_id", "budget", "last_synced_at")
+    list_filter = ("budget",)
+
+
+class SimpleFINSyncJobAdmin(admin.ModelAdmin):
+    list_display = ("budget", "status", "scheduled", "created_at", "finished_at")
+    list_filter = ("status", "scheduled")
+
+
 admin.site.register(Account, AccountAdmin)
+admin.site.register(PlaidItem, PlaidItemAdmin)
 admin.site.register(SimpleFINConnection, SimpleFINConnectionAdmin)
+admin.site.register(SimpleFINSyncJob, SimpleFINSyncJobAdmin)
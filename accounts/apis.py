@@ -12,8 +12,7 @@ from plaid.api import plaid_api
 import plaid
 
 from budgets.models import Budget
-from .models import Account, SimpleFINConnection
-
+from .models import Account, SimpleFINConnection, SimpleFINSyncJob
 
 logger = logging.getLogger(__name__)
 
@@ -91,6 +90,20 @@ class AddSimpleFINAccountsRequest(Schema):
     sfinData: Dict[str, Any]
 
 
+class SimpleFINSyncJobSchema(Schema):
+    """A queued or finished background SimpleFIN sync"""
+
+    id: str
+    budget_id: str
+    sfin_account_id: Optional[str] = None
+    status: str
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+
 @router.get(
     "/{budget_id}",
     response=List[AccountSchema],
@@ -230,60 +243,65 @@ def add_simplefin_accounts(request, budget_id: str, data: AddSimpleFINAccountsRe
 
 @router.get(
     "/{budget_id}/simplefin/transactions",
-    response=Dict[str, Any],
+    response={200: SimpleFINSyncJobSchema, 404: Dict[str, str]},
     auth=django_auth,
     tags=["Accounts"],
 )
 def get_simplefin_transactions(
-    request,
-    budget_id: str,
-    account_id: Optional[str] = None,
-    start_date: Optional[str] = None,
-    end_date: Optional[str] = None,
-    include_pending: bool = True,
-    import_transactions: bool = True,
-    update_account_amounts: bool = True,
+    request, budget_id: str, account_id: Optional[str] = None
 ):
     """
-    Get transactions from the SimpleFIN connection for a budget.
+    Queue a SimpleFIN sync for the budget and return the job to poll.
+
+    Kept for API clients of the old synchronous pull, which ran the whole
+    sync inside the request; it now behaves like
+    ``POST /{budget_id}/simplefin/sync``.
 
     Args:
         budget_id: The ID of the budget
-        account_id: Optional specific account to retrieve transactions for
-        start_date: Optional start date for transaction filtering in 'YYYY-MM-DD' format
-        end_date: Optional end date for transaction filtering in 'YYYY-MM-DD' format
-        include_pending: Whether to include pending transactions (defaults to True)
-        import_transactions: Whether to import the transactions to a matching EB account
-            (defaults to True)
+        account_id: Optional SimpleFIN account to limit the sync to
+    """
+    return queue_simplefin_sync(request, budget_id, account_id=account_id)
 
-    Returns:
-        JSON response containing transaction details from the SimpleFIN API
+
+@router.post(
+    "/{budget_id}/simplefin/sync",
+    response={200: SimpleFINSyncJobSchema, 404: Dict[str, str]},
+    auth=django_auth,
+    tags=["Accounts"],
+)
+def queue_simplefin_sync(request, budget_id: str, account_id: Optional[str] = None):
+    """
+    Queue a SimpleFIN sync for the budget and return the job to poll.
+
+    The sync itself is run by the ``simplefin_worker`` management command. A
+    sync of the same scope that is already queued or running is returned
+    instead of queueing another one.
+
+    Args:
+        budget_id: The ID of the budget
+        account_id: Optional SimpleFIN account to limit the sync to
     """
     user = request.auth
     budget = get_object_or_404(Budget, id=budget_id, user=user)
+    if not SimpleFINConnection.objects.filter(budget=budget).exists():
+        return 404, {"error": "No SimpleFIN connection exists for this budget"}
+    return SimpleFINSyncJob.enqueue(budget, sfin_account_id=account_id)
 
-    try:
-        connection = SimpleFINConnection.objects.get(budget=budget)
-        result = connection.get_transactions(
-            account_id=account_id,
-            start_date=start_date,
-            end_date=end_date,
-            include_pending=include_pending,
-            import_transactions=import_transactions,
-            update_account_amounts=update_account_amounts,
-        )
 
-        # Check if there was an error in the result
-        if "error" in result:
-            logger.error("SimpleFIN API error: %s", result["error"])
-            return result
-
-        return result
-    except SimpleFINConnection.DoesNotExist:
-        return {"error": "No SimpleFIN connection exists for this budget"}
-    except (ValueError, KeyError, AttributeError) as e:
-        logger.error("Unexpected error in get_simplefin_transactions: %s", str(e))
-        return {"error": f"Failed to retrieve transactions: {str(e)}"}
+@router.get(
+    "/{budget_id}/simplefin/sync/{job_id}",
+    response=SimpleFINSyncJobSchema,
+    auth=django_auth,
+    tags=["Accounts"],
+)
+def get_simplefin_sync(request, budget_id: str, job_id: str):
+    """
+    Get the status of a queued SimpleFIN sync.
+    """
+    user = request.auth
+    budget = get_object_or_404(Budget, id=budget_id, user=user)
+    return get_object_or_404(SimpleFINSyncJob, id=job_id, budget=budget)
 
 
 @router.get(
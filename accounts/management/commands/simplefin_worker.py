@@ -0,0 +1,64 @@
+import datetime
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from accounts.models import SimpleFINSyncJob
+
+# A running job older than this belongs to a worker that died
+ABANDONED_AFTER = datetime.timedelta(minutes=30)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued SimpleFIN syncs and periodically queue a sync for every "
+        "connected budget."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Queue due syncs, run everything queued and exit (for cron).",
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=5,
+            help="Seconds to wait between checks of the queue.",
+        )
+        parser.add_argument(
+            "--sync-interval",
+            type=int,
+            default=settings.SIMPLEFIN_SYNC_INTERVAL,
+            help="Minutes between scheduled syncs of a budget; 0 disables them.",
+        )
+
+    def handle(self, *args, **options):
+        sync_interval = datetime.timedelta(minutes=options["sync_interval"])
+
+        while True:
+            close_old_connections()
+            # Checked on every pass: a worker that died mid-job may have been
+            # restarted long before its job counts as abandoned
+            failed = SimpleFINSyncJob.fail_abandoned(ABANDONED_AFTER)
+            if failed:
+                self.stdout.write(f"Failed {failed} abandoned SimpleFIN syncs")
+
+            if sync_interval:
+                queued = SimpleFINSyncJob.schedule_due(sync_interval)
+                if queued:
+                    self.stdout.write(f"Queued {queued} scheduled SimpleFIN syncs")
+
+            job = SimpleFINSyncJob.claim_next()
+            while job:
+                self.stdout.write(f"Running {job}")
+                job.run()
+                close_old_connections()
+                job = SimpleFINSyncJob.claim_next()
+
+            if options["once"]:
+                return
+            time.sleep(options["poll_interval"])
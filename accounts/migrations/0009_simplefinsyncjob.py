@@ -0,0 +1,71 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:04
+
+import budgetapp.utils
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        (
+            "accounts",
+            "0008_account_plaid_access_token_account_plaid_account_id_and_more",
+        ),
+        ("budgets", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="SimpleFINSyncJob",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=budgetapp.utils.generate_uuid_hex,
+                        editable=False,
+                        max_length=32,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "sfin_account_id",
+                    models.CharField(blank=True, max_length=255, null=True),
+                ),
+                ("scheduled", models.BooleanField(default=False)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("queued", "Queued"),
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                        ],
+                        default="queued",
+                        max_length=16,
+                    ),
+                ),
+                ("result", models.JSONField(blank=True, null=True)),
+                ("error", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("started_at", models.DateTimeField(blank=True, null=True)),
+                ("finished_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "budget",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="budgets.budget"
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["status", "created_at"],
+                        name="accounts_si_status_7a5d93_idx",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:06
+
+import budgetapp.utils
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0009_simplefinsyncjob"),
+        ("budgets", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PlaidItem",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=budgetapp.utils.generate_uuid_hex,
+                        editable=False,
+                        max_length=32,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("item_id", models.CharField(max_length=255, unique=True)),
+                ("cursor", models.TextField(blank=True, null=True)),
+                ("last_synced_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "budget",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="budgets.budget"
+                    ),
+                ),
+            ],
+        ),
+    ]
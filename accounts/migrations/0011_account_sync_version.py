@@ -0,0 +1,24 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0010_plaiditem"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="account",
+            name="sync_version",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="account",
+            index=models.Index(
+                fields=["budget", "sync_version"], name="account_sync_idx"
+            ),
+        ),
+    ]
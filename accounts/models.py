@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 import base64
 import datetime
 import logging
@@ -5,17 +6,21 @@ import urllib
 
 import requests
 
+from django.conf import settings
 from django.db import models
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
+from django.utils import timezone
 from django.utils.text import slugify
 
-from budgetapp.utils import generate_uuid_hex
+from budgetapp.utils import chunked, generate_uuid_hex
 from transactions.models import Payee, Transaction
-
+from .simplefin import get_session
 
 logger = logging.getLogger(__name__)
 
+DEBT_ACCOUNT_TYPES = ["credit_card", "loan", "credit", "line_of_credit"]
+
 
 class Account(models.Model):
     id = models.CharField(
@@ -45,17 +50,22 @@ class Account(models.Model):
     plaid_official_name = models.CharField(max_length=255, blank=True, null=True)
     plaid_mask = models.CharField(max_length=10, blank=True, null=True)
     plaid_last_sync = models.DateTimeField(blank=True, null=True)
+    # Set by database triggers to the budget's version on every write, see
+    # budgets.models.BudgetVersion
+    sync_version = models.PositiveBigIntegerField(default=0, editable=False)
 
     class Meta:
         unique_together = ["budget", "slug"]
+        indexes = [
+            models.Index(fields=["budget", "sync_version"], name="account_sync_idx")
+        ]
 
     @property
     def is_debt_account(self):
         """
         Check if this account is a debt account (credit card or loan).
         """
-        debt_types = ["credit_card", "loan", "credit", "line_of_credit"]
-        return self.type in debt_types
+        return self.type in DEBT_ACCOUNT_TYPES
 
     def __str__(self):
         return str(self.name)
@@ -88,6 +98,9 @@ class SimpleFINConnection(models.Model):
     access_url = models.URLField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Days re-fetched before an account's last import on every sync
+    SYNC_BUFFER_DAYS = 4
+
     def __str__(self):
         return f"SimpleFINConnection for {self.budget.name}"
 
@@ -173,7 +186,7 @@ class SimpleFINConnection(models.Model):
             dict: A JSON-decoded response containing account details
         """
         endpoint = f"{self.access_url}/accounts?balances-only=true"
-        response = requests.get(endpoint, timeout=30)
+        response = get_session().get(endpoint, timeout=settings.SIMPLEFIN_TIMEOUT)
         # logger.info("SimpleFIN Accounts: %s", response.json())
         return response.json()
 
@@ -235,6 +248,10 @@ class SimpleFINConnection(models.Model):
         Retrieve transactions from the SimpleFIN connection's access URL.
 
         Fetches transactions with optional filtering by account, date range, and pending status.
+        Without an ``account_id`` every linked account is fetched with its own
+        window on a bounded thread pool, so a sync takes roughly as long as the
+        slowest account. The database work happens afterwards on the calling
+        thread.
 
         Args:
             account_id (str, optional): Specific account to retrieve transactions for.
@@ -250,54 +267,103 @@ class SimpleFINConnection(models.Model):
         Returns:
             dict: A JSON-decoded response containing transaction details from the SimpleFIN API.
         """
-        parameters = {}
-        buffer_days = 4
         logger.info("Retrieving transactions from SimpleFIN...")
 
-        # If account_id is provided, use the last imported date with a buffer
+        linked = Account.objects.filter(
+            budget=self.budget, sfin_id__isnull=False
+        ).exclude(sfin_id="")
         if account_id:
-            parameters["account"] = account_id
+            linked = linked.filter(sfin_id=account_id)
+        last_imported = dict(linked.values_list("sfin_id", "sfin_last_imported_on"))
+        if account_id and account_id not in last_imported:
+            logger.warning("No account found with sfin_id: %s", account_id)
 
-            # If start_date is not explicitly provided, try to use the last imported date
-            if not start_date:
-                try:
-                    account = Account.objects.get(sfin_id=account_id)
-                    if account.sfin_last_imported_on:
-                        # Use the last imported date minus a 3-day buffer to ensure we don't miss
-                        # any transactions
-                        buffer_date = (
-                            account.sfin_last_imported_on
-                            - datetime.timedelta(days=buffer_days)
-                        )
-                        parameters["start-date"] = int(buffer_date.timestamp())
-                        logger.info(
-                            "Using last imported date with buffer: %s",
-                            buffer_date.strftime("%Y-%m-%d"),
-                        )
-                except Account.DoesNotExist:
-                    logger.warning("No account found with sfin_id: %s", account_id)
+        if account_id:
+            windows = [
+                self._window_parameters(
+                    account_id,
+                    last_imported.get(account_id),
+                    start_date,
+                    end_date,
+                    include_pending,
+                )
+            ]
+        elif last_imported:
+            windows = [
+                self._window_parameters(
+                    sfin_id, imported_on, start_date, end_date, include_pending
+                )
+                for sfin_id, imported_on in last_imported.items()
+            ]
         else:
-            if not start_date:
-                # Use the furthest back start date of all accounts that have sfin_last_imported_on
-                accounts = Account.objects.filter(sfin_last_imported_on__isnull=False)
-                if accounts.exists():
-                    start_date = (
-                        accounts.order_by("sfin_last_imported_on")
-                        .first()
-                        .sfin_last_imported_on
-                    )
-                    buffer_date = start_date - datetime.timedelta(days=buffer_days)
-                    parameters["start-date"] = int(buffer_date.timestamp())
-                    logger.info(
-                        "Using date: %s",
-                        buffer_date.strftime("%Y-%m-%d"),
-                    )
+            # Nothing linked yet: fetch everything the connection can see
+            windows = [
+                self._window_parameters(
+                    None, None, start_date, end_date, include_pending
+                )
+            ]
+
+        workers = max(1, min(settings.SIMPLEFIN_MAX_WORKERS, len(windows)))
+        if workers == 1:
+            results = [self._fetch_window(parameters) for parameters in windows]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(self._fetch_window, windows))
+
+        failures = [result for result in results if "error" in result]
+        payloads = [result for result in results if "error" not in result]
+        if not payloads:
+            return failures[0]
+
+        sfin_data = self._merge_payloads(payloads, failures)
+        try:
+            accounts = self.linked_accounts(sfin_data)
+
+            if import_transactions:
+                # Import the transactions to the budget
+                imported = self.import_sfin_transactions(sfin_data, accounts=accounts)
+                sfin_data["imported"] = {
+                    "created": len(imported["created_ids"]),
+                    "duplicates": len(imported["duplicate_ids"]),
+                    "cleared": len(imported["cleared_ids"]),
+                }
+
+            if update_account_amounts:
+                # Update the account balances
+                self.update_sfin_account_balances(sfin_data, accounts=accounts)
+
+            return sfin_data
+        except (ValueError, TypeError) as e:
+            logger.error("Data processing error in get_transactions: %s", str(e))
+            return {
+                "error": "Error processing transaction data",
+                "details": str(e),
+            }
+
+    def _window_parameters(
+        self, sfin_id, last_imported_on, start_date, end_date, include_pending
+    ):
+        """Build the ``/accounts`` query parameters for one fetch."""
+        parameters = {}
+        if sfin_id:
+            parameters["account"] = sfin_id
 
-        # If start_date is explicitly provided, use it
-        if start_date and not parameters.get("start-date"):
+        # An explicit start_date wins; otherwise use the last imported date
+        # with a buffer so late-posting transactions aren't missed
+        if start_date:
             parameters["start-date"] = int(
                 datetime.datetime.strptime(start_date, "%Y-%m-%d").timestamp()
             )
+        elif last_imported_on:
+            buffer_date = last_imported_on - datetime.timedelta(
+                days=self.SYNC_BUFFER_DAYS
+            )
+            parameters["start-date"] = int(buffer_date.timestamp())
+            logger.info(
+                "Using last imported date with buffer for %s: %s",
+                sfin_id,
+                buffer_date.strftime("%Y-%m-%d"),
+            )
 
         if end_date:
             parameters["end-date"] = int(
@@ -307,169 +373,421 @@ class SimpleFINConnection(models.Model):
             )
 
         if include_pending:
-            parameters["pending"] = 1 if include_pending else 0
+            parameters["pending"] = 1
+        return parameters
+
+    def _fetch_window(self, parameters):
+        """
+        GET ``/accounts`` with the given parameters.
+
+        Runs on the sync thread pool, so it must not touch the database.
 
+        Returns:
+            dict: The decoded payload, or an ``error`` dictionary
+        """
         endpoint = f"{self.access_url}/accounts?{urllib.parse.urlencode(parameters)}"
         logger.info("SimpleFIN Transactions endpoint: %s", endpoint)
 
         try:
-            response = requests.get(endpoint, timeout=30)
-
-            # Log the response for debugging
-            logger.debug("SimpleFIN API response status: %s", response.status_code)
-            logger.debug(
-                "SimpleFIN API response content: %s...", response.text[:200]
-            )  # Log first 200 chars
-
-            # Check if response is successful and contains content
-            if response.status_code != 200:
-                return {
-                    "error": f"SimpleFIN API returned status code {response.status_code}",
-                    "details": response.text,
-                }
+            response = get_session().get(endpoint, timeout=settings.SIMPLEFIN_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            logger.error("Request error: %s", str(e))
+            return {"error": "Failed to connect to SimpleFIN API", "details": str(e)}
 
-            if not response.text.strip():
-                return {"error": "SimpleFIN API returned empty response"}
+        # Log the response for debugging
+        logger.debug("SimpleFIN API response status: %s", response.status_code)
+        logger.debug(
+            "SimpleFIN API response content: %s...", response.text[:200]
+        )  # Log first 200 chars
 
-            if import_transactions:
-                # Import the transactions to the budget
-                self.import_sfin_transactions(response.json())
+        # Check if response is successful and contains content
+        if response.status_code != 200:
+            return {
+                "error": f"SimpleFIN API returned status code {response.status_code}",
+                "details": response.text,
+            }
 
-            if update_account_amounts:
-                # Update the account balances
-                self.update_sfin_account_balances(response.json())
+        if not response.text.strip():
+            return {"error": "SimpleFIN API returned empty response"}
 
+        try:
             return response.json()
         except requests.exceptions.JSONDecodeError as e:
             logger.error("JSON decode error: %s", str(e))
             return {
                 "error": "Failed to parse SimpleFIN API response as JSON",
                 "details": str(e),
-                "raw_response": (
-                    response.text if "response" in locals() else "No response"
-                ),
+                "raw_response": response.text,
             }
-        except requests.exceptions.RequestException as e:
-            logger.error("Request error: %s", str(e))
-            return {"error": "Failed to connect to SimpleFIN API", "details": str(e)}
 
-        except (ValueError, TypeError) as e:
-            logger.error("Data processing error in get_transactions: %s", str(e))
-            return {
-                "error": "Error processing transaction data",
-                "details": str(e),
-            }
+    @staticmethod
+    def _merge_payloads(payloads, failures):
+        """
+        Combine per-account payloads into one ``/accounts`` response. Failed
+        fetches are reported through ``errors`` like SimpleFIN's own errors.
+        """
+        errors = []
+        sfin_accounts = {}
+        for payload in payloads:
+            errors.extend(payload.get("errors", []))
+            for sfin_account in payload.get("accounts", []):
+                sfin_accounts.setdefault(sfin_account.get("id"), sfin_account)
+        for failure in failures:
+            errors.append(f"{failure['error']}: {failure.get('details', '')}")
+        return {"errors": errors, "accounts": list(sfin_accounts.values())}
+
+    def linked_accounts(self, sfin_data):
+        """
+        Resolve the SimpleFIN accounts in a payload to this budget's accounts.
+
+        Args:
+            sfin_data (dict): The data received from the SimpleFIN API.
+
+        Returns:
+            dict: Account instances keyed by their SimpleFIN account ID
+        """
+        sfin_ids = {
+            sfin_account.get("id") for sfin_account in sfin_data.get("accounts", [])
+        }
+        return {
+            account.sfin_id: account
+            for account in Account.objects.filter(
+                budget=self.budget, sfin_id__in=sfin_ids
+            )
+        }
+
+    def import_sfin_transactions(
+        self, sfin_data, update_account_amounts=True, accounts=None
+    ):
+        """
+        Import the transactions of every linked account in a SimpleFIN payload.
+
+        Existing rows are found with one query per account, missing payees are
+        created in bulk and all new transactions are inserted with a single
+        ``bulk_create``.
+
+        Args:
+            sfin_data (dict): The data received from the SimpleFIN API.
+            accounts (dict, optional): The result of ``linked_accounts``, when
+                the caller already resolved it.
+
+        Returns:
+            dict: Lists of created, duplicate and cleared transaction IDs
+        """
+        if accounts is None:
+            accounts = self.linked_accounts(sfin_data)
+
+        duplicate_transaction_ids = []
+        cleared_transaction_ids = []
+        new_transactions = []
+        payee_names = []  # parallel to new_transactions
 
-    def import_sfin_transactions(self, sfin_data, update_account_amounts=True):
-        logger.info("Importing SimpleFIN transactions, data: %s", sfin_data)
         for sfin_account in sfin_data.get("accounts", []):
-            try:
-                account = Account.objects.get(sfin_id=sfin_account.get("id"))
-                logger.info("Found account for SimpleFIN account: %s", account)
-            except Account.DoesNotExist:
+            account = accounts.get(sfin_account.get("id"))
+            if account is None:
                 logger.warning(
                     "No account found for SimpleFIN account: %s", sfin_account["id"]
                 )
                 continue
-            duplicate_transaction_ids = []
-            created_transaction_ids = []
-            for transaction in sfin_account.get("transactions", []):
-                logger.info("Importing SimpleFIN transaction: %s", transaction)
-                # Check for existing transaction with the same sfin_id or import_id
-                transaction_exists = (
+            logger.info("Found account for SimpleFIN account: %s", account)
+
+            sfin_transactions = sfin_account.get("transactions", [])
+            existing = {}
+            # Each id is bound twice, so halve the batches
+            for batch in chunked({t.get("id") for t in sfin_transactions}, size=450):
+                batch = set(batch)
+                for row in (
                     Transaction.objects.include_deleted()
-                    .filter(
+                    .filter(budget=self.budget, account=account)
+                    .filter(models.Q(import_id__in=batch) | models.Q(sfin_id__in=batch))
+                    .order_by()
+                    .values("id", "import_id", "sfin_id", "pending")
+                ):
+                    for key in (row["import_id"], row["sfin_id"]):
+                        if key in batch:
+                            existing.setdefault(key, row)
+
+            for transaction in sfin_transactions:
+                transaction_exists = existing.get(transaction.get("id"))
+                if transaction_exists:
+                    # Clear existing transactions that were pending and no longer are
+                    if transaction_exists["pending"] and not transaction.get(
+                        "pending", False
+                    ):
+                        transaction_exists["pending"] = False
+                        if "instance" in transaction_exists:
+                            # Created earlier in this payload, not saved yet
+                            transaction_exists["instance"].pending = False
+                            transaction_exists["instance"].cleared = True
+                        else:
+                            cleared_transaction_ids.append(transaction_exists["id"])
+                    else:
+                        duplicate_transaction_ids.append(transaction_exists["id"])
+                    continue
+
+                # Create a new Transaction for each unique transaction
+                try:
+                    new_transaction = Transaction(
                         budget=self.budget,
                         account=account,
+                        date=datetime.datetime.fromtimestamp(
+                            transaction["transacted_at"]
+                        ).date(),
+                        amount=int(float(transaction["amount"]) * 1000),
+                        memo=transaction["description"],
+                        sfin_id=transaction["id"],
+                        import_payee_name=transaction["payee"],
+                        cleared=False if transaction.get("pending") else True,
+                        pending=transaction.get("pending", False),
                     )
-                    .filter(
-                        models.Q(import_id=transaction.get("id"))
-                        | models.Q(sfin_id=transaction.get("id"))
+                except (ValueError, TypeError, KeyError) as e:
+                    logger.error(
+                        "Error creating transaction: %s for transaction: %s",
+                        str(e),
+                        transaction,
                     )
-                    .first()
+                    continue
+                new_transactions.append(new_transaction)
+                payee_names.append(transaction["payee"])
+                # Repeats of this id later in the payload are duplicates
+                existing[transaction["id"]] = {
+                    "id": new_transaction.id,
+                    "pending": new_transaction.pending,
+                    "instance": new_transaction,
+                }
+
+        if cleared_transaction_ids:
+            # Only the flags change, so the balances stay as they are
+            for batch in chunked(cleared_transaction_ids):
+                Transaction.objects.include_deleted().filter(id__in=batch).update(
+                    pending=False, cleared=True
                 )
+            logger.info(
+                "Updated %d transactions from pending to cleared",
+                len(cleared_transaction_ids),
+            )
 
-                if transaction_exists:
-                    # Update the existing transaction if it was pending and new one is not
-                    if transaction_exists.pending and not transaction.get(
-                        "pending", False
-                    ):
-                        transaction_exists.pending = False
-                        transaction_exists.cleared = True
-                        transaction_exists.save()
-                        logger.info(
-                            "Updated transaction %s from pending to cleared",
-                            transaction_exists.id,
-                        )
-                    else:
-                        # If transaction exists, add its ID to duplicate_transaction_ids
-                        duplicate_transaction_ids.append(transaction_exists.id)
-                else:
-                    # Create a new Transaction for each unique transaction
-                    try:
-                        payee = None
-                        if transaction["payee"]:
-                            payee = Payee.objects.get_or_create(
-                                name=transaction["payee"], budget=self.budget
-                            )[0]
-
-                        new_transaction = Transaction.objects.create(
-                            budget=self.budget,
-                            account=account,
-                            date=datetime.datetime.fromtimestamp(
-                                transaction["transacted_at"]
-                            ).date(),
-                            amount=int(float(transaction["amount"]) * 1000),
-                            memo=transaction["description"],
-                            payee=payee,
-                            sfin_id=transaction["id"],
-                            import_payee_name=transaction["payee"],
-                            cleared=False if transaction.get("pending") else True,
-                            pending=transaction.get("pending", False),
-                        )
-                        created_transaction_ids.append(new_transaction.id)
-                    except (
-                        ValueError,
-                        TypeError,
-                        KeyError,
-                        Payee.DoesNotExist,
-                        Transaction.DoesNotExist,
-                    ) as e:
-                        logger.error(
-                            "Error creating transaction: %s for transaction: %s",
-                            str(e),
-                            transaction,
-                        )
-            # Update the last imported date for this account
-            account.sfin_last_imported_on = datetime.datetime.now()
-            account.save(update_fields=["sfin_last_imported_on"])
-
-    def update_sfin_account_balances(self, sfin_data):
+        payees = Payee.get_or_create_imported(self.budget.id, payee_names)
+        for new_transaction, payee_name in zip(new_transactions, payee_names):
+            new_transaction.payee = payees.get(payee_name)
+        Transaction.bulk_create_with_balances(new_transactions)
+
+        # Update the last imported date for the accounts in the payload
+        Account.objects.filter(pk__in=[a.pk for a in accounts.values()]).update(
+            sfin_last_imported_on=timezone.now()
+        )
+
+        return {
+            "created_ids": [t.id for t in new_transactions],
+            "duplicate_ids": duplicate_transaction_ids,
+            "cleared_ids": cleared_transaction_ids,
+        }
+
+    def update_sfin_account_balances(self, sfin_data, accounts=None):
         """
         Update the balances of SimpleFIN accounts based on the provided data.
 
         Args:
             sfin_data (dict): The data received from the SimpleFIN API.
+            accounts (dict, optional): The result of ``linked_accounts``, when
+                the caller already resolved it.
         """
         logger.info("⚖️ Updating SimpleFIN account balances...")
+        if accounts is None:
+            accounts = self.linked_accounts(sfin_data)
+
+        updated_accounts = []
         for sfin_account in sfin_data.get("accounts", []):
-            try:
-                account = Account.objects.get(sfin_id=sfin_account.get("id"))
-                logger.info("Found account for SimpleFIN account: %s", account)
-            except Account.DoesNotExist:
+            account = accounts.get(sfin_account.get("id"))
+            if account is None:
                 logger.warning(
                     "No account found for SimpleFIN account: %s", sfin_account["id"]
                 )
                 continue
-            balance = int(float(sfin_account.get("balance")) * 1000)
-            if account:
-                account.balance = balance
-                account.save(update_fields=["balance"])
-                logger.info(
-                    "✅ Updated balance for account: %s; balance: %s",
-                    account.name,
-                    balance,
-                )
+            account.balance = int(float(sfin_account.get("balance")) * 1000)
+            updated_accounts.append(account)
+            logger.info(
+                "✅ Updated balance for account: %s; balance: %s",
+                account.name,
+                account.balance,
+            )
+        Account.objects.bulk_update(updated_accounts, ["balance"])
+
+
+class PlaidItem(models.Model):
+    """
+    Sync state of one Plaid Item (a login at an institution), shared by all
+    accounts that carry its ``plaid_item_id``.
+    """
+
+    id = models.CharField(
+        primary_key=True,
+        default=generate_uuid_hex,
+        editable=False,
+        max_length=32,
+    )
+    budget = models.ForeignKey("budgets.Budget", on_delete=models.CASCADE)
+    item_id = models.CharField(max_length=255, unique=True)
+    # The /transactions/sync cursor after the last applied page; empty
+    # before the first sync
+    cursor = models.TextField(blank=True, null=True)
+    last_synced_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Plaid item {self.item_id}"
+
+
+class SimpleFINSyncJob(models.Model):
+    """
+    A SimpleFIN sync waiting for, or run by, the ``simplefin_worker``
+    management command, so that web requests never wait on SimpleFIN.
+    """
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+    ACTIVE_STATUSES = [QUEUED, RUNNING]
+
+    id = models.CharField(
+        primary_key=True,
+        default=generate_uuid_hex,
+        editable=False,
+        max_length=32,
+    )
+    budget = models.ForeignKey("budgets.Budget", on_delete=models.CASCADE)
+    # Limit the sync to one SimpleFIN account; all linked accounts when empty
+    sfin_account_id = models.CharField(max_length=255, blank=True, null=True)
+    scheduled = models.BooleanField(default=False)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.JSONField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["status", "created_at"])]
+
+    def __str__(self):
+        return f"SimpleFIN sync {self.id} ({self.status})"
+
+    @classmethod
+    def enqueue(cls, budget, sfin_account_id=None, scheduled=False):
+        """
+        Queue a sync for a budget. A sync of the same scope that is already
+        queued or running is returned instead of queueing a second one.
+
+        Args:
+            budget: The Budget to sync
+            sfin_account_id (str, optional): A single SimpleFIN account to sync
+            scheduled (bool, optional): Whether the worker's schedule queued it
+
+        Returns:
+            SimpleFINSyncJob: The queued or already active job
+        """
+        active = cls.objects.filter(
+            budget=budget,
+            sfin_account_id=sfin_account_id,
+            status__in=cls.ACTIVE_STATUSES,
+        ).first()
+        if active:
+            return active
+        return cls.objects.create(
+            budget=budget, sfin_account_id=sfin_account_id, scheduled=scheduled
+        )
+
+    @classmethod
+    def schedule_due(cls, interval):
+        """
+        Queue a full sync for every connected budget that has not synced
+        within ``interval``.
+
+        Args:
+            interval (timedelta): How often each budget is synced
+
+        Returns:
+            int: The number of jobs queued
+        """
+        recent = cls.objects.filter(
+            models.Q(created_at__gte=timezone.now() - interval)
+            | models.Q(status__in=cls.ACTIVE_STATUSES),
+            sfin_account_id__isnull=True,
+        ).values("budget_id")
+        due = SimpleFINConnection.objects.exclude(budget_id__in=recent).values_list(
+            "budget_id", flat=True
+        )
+        jobs = cls.objects.bulk_create(
+            [cls(budget_id=budget_id, scheduled=True) for budget_id in due]
+        )
+        return len(jobs)
+
+    @classmethod
+    def claim_next(cls):
+        """
+        Mark the oldest queued job as running and return it. The conditional
+        UPDATE makes the claim safe with more than one worker.
+
+        Returns:
+            SimpleFINSyncJob: The claimed job, or None when the queue is empty
+        """
+        queued = cls.objects.filter(status=cls.QUEUED).order_by("created_at")
+        for job_id in queued.values_list("id", flat=True)[:10]:
+            claimed = cls.objects.filter(id=job_id, status=cls.QUEUED).update(
+                status=cls.RUNNING, started_at=timezone.now()
+            )
+            if claimed:
+                return cls.objects.get(id=job_id)
+        return None
+
+    @classmethod
+    def fail_abandoned(cls, timeout):
+        """
+        Fail running jobs that started more than ``timeout`` ago; the worker
+        running them is gone.
+
+        Returns:
+            int: The number of jobs failed
+        """
+        return cls.objects.filter(
+            status=cls.RUNNING, started_at__lt=timezone.now() - timeout
+        ).update(
+            status=cls.FAILED,
+            error="The sync worker stopped before the job finished",
+            finished_at=timezone.now(),
+        )
+
+    def run(self):
+        """Run the sync and record its outcome on the job."""
+        try:
+            connection = SimpleFINConnection.objects.get(budget_id=self.budget_id)
+            sfin_data = connection.get_transactions(account_id=self.sfin_account_id)
+        except SimpleFINConnection.DoesNotExist:
+            sfin_data = {"error": "No SimpleFIN connection exists for this budget"}
+        except Exception as e:  # pylint: disable=broad-except
+            logger.exception("SimpleFIN sync %s failed", self.id)
+            sfin_data = {"error": f"Failed to retrieve transactions: {str(e)}"}
+
+        if "error" in sfin_data:
+            self.status = self.FAILED
+            self.error = sfin_data["error"]
+            self.result = {"details": sfin_data.get("details")}
+        else:
+            self.status = self.SUCCEEDED
+            self.result = {
+                "accounts": len(sfin_data.get("accounts", [])),
+                "errors": sfin_data.get("errors", []),
+                "imported": sfin_data.get("imported", {}),
+            }
+        self.finished_at = timezone.now()
+        self.save(update_fields=["status", "error", "result", "finished_at"])
+        logger.info("SimpleFIN sync %s finished: %s", self.id, self.status)
 
 
 @receiver(post_save, sender=Account)
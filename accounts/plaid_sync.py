@@ -0,0 +1,245 @@
+from decimal import Decimal
+import datetime
+import json
+import logging
+
+from django.db import transaction as db_transaction
+from django.utils import timezone
+from plaid import ApiException
+from plaid.model.transactions_sync_request import TransactionsSyncRequest
+
+from budgetapp.utils import chunked
+from transactions.models import Payee, Transaction
+from .models import Account, PlaidItem
+
+logger = logging.getLogger(__name__)
+
+# Largest page /transactions/sync returns
+PAGE_SIZE = 500
+
+# Pagination restarts allowed when the Item changes mid-sync
+MAX_PAGINATION_RESTARTS = 3
+
+MUTATION_DURING_PAGINATION = "TRANSACTIONS_SYNC_MUTATION_DURING_PAGINATION"
+
+
+def sync_plaid_item(client, budget, item_id):
+    """
+    Pull the changes of a Plaid Item since its stored cursor and apply them.
+
+    Only the added, modified and removed transactions since the last sync
+    are transferred. They are written with bulk queries, and the new cursor
+    is stored in the same database transaction, so a failed sync is simply
+    retried from the old cursor.
+
+    Args:
+        client (PlaidApi): The Plaid client
+        budget: The Budget the Item's accounts belong to
+        item_id (str): The Plaid Item ID
+
+    Returns:
+        dict: Counts of added, modified and removed transactions
+
+    Raises:
+        ValueError: If no account in the budget belongs to the Item
+    """
+    accounts = {
+        account.plaid_account_id: account
+        for account in Account.objects.filter(budget=budget, plaid_item_id=item_id)
+    }
+    access_token = next(
+        (a.plaid_access_token for a in accounts.values() if a.plaid_access_token),
+        None,
+    )
+    if not access_token:
+        raise ValueError(f"No Plaid accounts found for item {item_id}")
+
+    item, _ = PlaidItem.objects.get_or_create(item_id=item_id, budget=budget)
+    added, modified, removed, next_cursor = fetch_changes(
+        client, access_token, item.cursor
+    )
+    logger.info(
+        "Plaid item %s: %d added, %d modified, %d removed",
+        item_id,
+        len(added),
+        len(modified),
+        len(removed),
+    )
+
+    now = timezone.now()
+    with db_transaction.atomic():
+        result = apply_changes(budget, accounts, added, modified, removed)
+        item.cursor = next_cursor
+        item.last_synced_at = now
+        item.save(update_fields=["cursor", "last_synced_at"])
+        Account.objects.filter(pk__in=[a.pk for a in accounts.values()]).update(
+            plaid_last_sync=now
+        )
+    return result
+
+
+def fetch_changes(client, access_token, cursor):
+    """
+    Page through ``/transactions/sync`` from ``cursor`` until ``has_more`` is
+    false. Plaid asks for the whole pagination to be restarted when the Item
+    changes while paging, which is done up to MAX_PAGINATION_RESTARTS times.
+
+    Returns:
+        tuple: (added, modified, removed, next_cursor)
+    """
+    for _ in range(MAX_PAGINATION_RESTARTS + 1):
+        added, modified, removed = [], [], []
+        page_cursor = cursor
+        try:
+            while True:
+                request = {"access_token": access_token, "count": PAGE_SIZE}
+                if page_cursor:
+                    request["cursor"] = page_cursor
+                response = client.transactions_sync(TransactionsSyncRequest(**request))
+                added.extend(_as_dict(t) for t in response["added"])
+                modified.extend(_as_dict(t) for t in response["modified"])
+                removed.extend(_as_dict(t) for t in response["removed"])
+                page_cursor = response["next_cursor"]
+                if not response["has_more"]:
+                    return added, modified, removed, page_cursor
+        except ApiException as e:
+            if _error_code(e) != MUTATION_DURING_PAGINATION:
+                raise
+            logger.warning("Plaid data changed during pagination, restarting sync")
+    raise ValueError("Plaid transactions kept changing during the sync")
+
+
+def apply_changes(budget, accounts, added, modified, removed):
+    """
+    Write a batch of ``/transactions/sync`` changes to the budget.
+
+    - removed rows are soft-deleted
+    - modified rows get the new amount, date and pending state
+    - a posted transaction that replaces a pending one updates the pending
+      row, keeping the envelope and payee the user assigned
+    - everything else is created
+
+    Each kind is written with one bulk query and a single aggregated
+    balance update.
+
+    Args:
+        budget: The Budget to write to
+        accounts (dict): Accounts keyed by Plaid account ID
+        added (list): Transactions from ``added``
+        modified (list): Transactions from ``modified``
+        removed (list): Entries from ``removed``
+
+    Returns:
+        dict: Counts of added, modified and removed transactions
+    """
+    added = [t for t in added if t["account_id"] in accounts]
+    modified = [t for t in modified if t["account_id"] in accounts]
+    removed_ids = {t["transaction_id"] for t in removed}
+
+    existing = _existing_transactions(
+        budget,
+        accounts.values(),
+        {t["transaction_id"] for t in added + modified}
+        | {
+            t["pending_transaction_id"]
+            for t in added
+            if t.get("pending_transaction_id")
+        }
+        | removed_ids,
+    )
+
+    updates = {}
+    new_rows = []
+    for plaid_transaction in added + modified:
+        transaction_id = plaid_transaction["transaction_id"]
+        if transaction_id in removed_ids:
+            continue
+        trans = existing.get(transaction_id)
+        pending_id = plaid_transaction.get("pending_transaction_id")
+        if trans is None and pending_id and pending_id in existing:
+            # The posted transaction replaces the pending one
+            trans = existing[pending_id]
+            removed_ids.discard(pending_id)
+            existing[transaction_id] = trans
+        if trans is None:
+            new_rows.append(plaid_transaction)
+        else:
+            _apply_fields(trans, plaid_transaction)
+            updates[trans.pk] = trans
+
+    removals = [
+        existing[transaction_id]
+        for transaction_id in removed_ids
+        if transaction_id in existing and existing[transaction_id].pk not in updates
+    ]
+
+    payees = Payee.get_or_create_imported(budget.id, (_payee_name(t) for t in new_rows))
+    new_transactions = []
+    for plaid_transaction in new_rows:
+        trans = Transaction(
+            budget=budget, account=accounts[plaid_transaction["account_id"]]
+        )
+        _apply_fields(trans, plaid_transaction)
+        trans.payee = payees.get(_payee_name(plaid_transaction))
+        new_transactions.append(trans)
+
+    # Removing first frees the import_ids of replaced rows
+    removed_count = Transaction.bulk_soft_delete(removals)
+    Transaction.bulk_update_with_balances(
+        updates.values(),
+        ["import_id", "amount", "date", "memo", "import_payee_name", "cleared"],
+    )
+    Transaction.bulk_create_with_balances(new_transactions)
+
+    return {
+        "added": len(new_transactions),
+        "modified": len(updates),
+        "removed": removed_count,
+    }
+
+
+def _existing_transactions(budget, accounts, transaction_ids):
+    """Load the transactions already imported under the given Plaid ids."""
+    existing = {}
+    for batch in chunked(transaction_ids):
+        for trans in (
+            Transaction.objects.include_deleted()
+            .filter(budget=budget, account__in=accounts, import_id__in=batch)
+            .order_by()
+        ):
+            # Prefer the live row over soft-deleted copies
+            if trans.import_id not in existing or existing[trans.import_id].deleted:
+                existing[trans.import_id] = trans
+    return existing
+
+
+def _apply_fields(trans, plaid_transaction):
+    trans.import_id = plaid_transaction["transaction_id"]
+    # Plaid reports money leaving the account as a positive amount
+    trans.amount = -int(round(Decimal(str(plaid_transaction["amount"])) * 1000))
+    trans.date = _as_date(plaid_transaction["date"])
+    trans.memo = plaid_transaction.get("name")
+    trans.import_payee_name = _payee_name(plaid_transaction)
+    trans.pending = bool(plaid_transaction.get("pending"))
+    trans.cleared = not trans.pending
+
+
+def _payee_name(plaid_transaction):
+    return plaid_transaction.get("merchant_name") or plaid_transaction.get("name")
+
+
+def _as_dict(obj):
+    return obj.to_dict() if hasattr(obj, "to_dict") else obj
+
+
+def _as_date(value):
+    if isinstance(value, str):
+        return datetime.date.fromisoformat(value)
+    return value
+
+
+def _error_code(error):
+    try:
+        return json.loads(error.body).get("error_code")
+    except (TypeError, ValueError, AttributeError):
+        return None
@@ -0,0 +1,223 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.test import TestCase
+from django.urls import reverse
+from plaid import ApiException
+
+from accounts.models import Account, PlaidItem
+from accounts.plaid_sync import MUTATION_DURING_PAGINATION, sync_plaid_item
+from budgets.models import Budget
+from transactions.models import Transaction
+
+
+class FakePlaidClient:
+    """
+    A local stand-in for ``PlaidApi.transactions_sync``.
+
+    ``pages`` maps the cursor a request is sent with (``None`` for the first
+    sync) to the response for it. ``failures`` maps cursors to a number of
+    mutation-during-pagination errors to raise first.
+    """
+
+    def __init__(self, pages, failures=None):
+        self.pages = pages
+        self.failures = dict(failures or {})
+        self.requests = []
+
+    def transactions_sync(self, request):
+        cursor = request.get("cursor")
+        self.requests.append(cursor)
+        if self.failures.get(cursor, 0) > 0:
+            self.failures[cursor] -= 1
+            error = ApiException(status=400, reason="Bad Request")
+            error.body = json.dumps({"error_code": MUTATION_DURING_PAGINATION})
+            raise error
+        return self.pages[cursor]
+
+
+def page(next_cursor, added=(), modified=(), removed=(), has_more=False):
+    return {
+        "added": list(added),
+        "modified": list(modified),
+        "removed": [{"transaction_id": t} for t in removed],
+        "next_cursor": next_cursor,
+        "has_more": has_more,
+    }
+
+
+def plaid_transaction(transaction_id, amount, account_id="plaid-checking", **fields):
+    return {
+        "transaction_id": transaction_id,
+        "account_id": account_id,
+        "amount": amount,
+        "date": "2024-05-01",
+        "name": f"PURCHASE {transaction_id}",
+        "merchant_name": "Corner Store",
+        "pending": False,
+        "pending_transaction_id": None,
+        **fields,
+    }
+
+
+class PlaidSyncTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="plaid", password="plaid"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.account = Account.objects.create(
+            budget=self.budget,
+            name="Checking",
+            type="checking",
+            plaid_access_token="access-sandbox",
+            plaid_account_id="plaid-checking",
+            plaid_item_id="item-1",
+        )
+
+    def sync(self, client):
+        return sync_plaid_item(client, self.budget, "item-1")
+
+    def test_initial_sync_pages_through_history(self):
+        """Test that the first sync follows has_more and stores the cursor"""
+        client = FakePlaidClient(
+            {
+                None: page(
+                    "c1",
+                    added=[plaid_transaction("t1", 12.5), plaid_transaction("t2", 3)],
+                    has_more=True,
+                ),
+                "c1": page(
+                    "c2",
+                    added=[
+                        plaid_transaction("t3", -100),
+                        plaid_transaction("other", 1, account_id="unknown"),
+                    ],
+                ),
+            }
+        )
+        result = self.sync(client)
+
+        self.assertEqual(result, {"added": 3, "modified": 0, "removed": 0})
+        self.assertEqual(client.requests, [None, "c1"])
+        self.assertEqual(PlaidItem.objects.get(item_id="item-1").cursor, "c2")
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, 84500)
+        self.assertIsNotNone(self.account.plaid_last_sync)
+        trans = Transaction.objects.get(import_id="t1")
+        self.assertEqual(trans.amount, -12500)
+        self.assertEqual(trans.payee.name, "Corner Store")
+
+    def test_steady_state_applies_deltas(self):
+        """Test that a later sync only applies the changes since the cursor"""
+        self.sync(
+            FakePlaidClient(
+                {
+                    None: page(
+                        "c1",
+                        added=[
+                            plaid_transaction("t1", 10),
+                            plaid_transaction("t2", 20),
+                        ],
+                    )
+                }
+            )
+        )
+        client = FakePlaidClient(
+            {
+                "c1": page(
+                    "c2",
+                    added=[plaid_transaction("t3", 5)],
+                    modified=[plaid_transaction("t1", 15)],
+                    removed=["t2"],
+                )
+            }
+        )
+        result = self.sync(client)
+
+        self.assertEqual(result, {"added": 1, "modified": 1, "removed": 1})
+        self.assertEqual(client.requests, ["c1"])
+        self.assertEqual(Transaction.objects.get(import_id="t1").amount, -15000)
+        self.assertFalse(Transaction.objects.filter(import_id="t2").exists())
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, -20000)
+
+    def test_posted_transaction_replaces_pending(self):
+        """Test that a posted transaction takes over its pending row"""
+        self.sync(
+            FakePlaidClient(
+                {None: page("c1", added=[plaid_transaction("p1", 8, pending=True)])}
+            )
+        )
+        pending = Transaction.objects.get(import_id="p1")
+        self.assertTrue(pending.pending)
+        self.assertFalse(pending.cleared)
+
+        self.sync(
+            FakePlaidClient(
+                {
+                    "c1": page(
+                        "c2",
+                        added=[
+                            plaid_transaction("t1", 8.25, pending_transaction_id="p1")
+                        ],
+                        removed=["p1"],
+                    )
+                }
+            )
+        )
+
+        posted = Transaction.objects.get(import_id="t1")
+        self.assertEqual(posted.pk, pending.pk)
+        self.assertFalse(posted.pending)
+        self.assertTrue(posted.cleared)
+        self.assertEqual(Transaction.objects.filter(account=self.account).count(), 1)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, -8250)
+
+    def test_mutation_during_pagination_restarts(self):
+        """Test that pagination restarts from the stored cursor"""
+        client = FakePlaidClient(
+            {
+                None: page("c1", added=[plaid_transaction("t1", 1)], has_more=True),
+                "c1": page("c2", added=[plaid_transaction("t2", 2)]),
+            },
+            failures={"c1": 1},
+        )
+        result = self.sync(client)
+
+        self.assertEqual(client.requests, [None, "c1", None, "c1"])
+        self.assertEqual(result["added"], 2)
+        self.assertEqual(Transaction.objects.filter(account=self.account).count(), 2)
+
+    def test_item_of_another_budget_is_not_used(self):
+        """Test that a sync never picks up the cursor another budget stored"""
+        other = Budget.objects.create(user=self.user, name="Other")
+        PlaidItem.objects.create(budget=other, item_id="item-1", cursor="theirs")
+        client = FakePlaidClient({})
+
+        with self.assertRaises(IntegrityError):
+            self.sync(client)
+
+        self.assertEqual(client.requests, [])
+        self.assertEqual(PlaidItem.objects.get(item_id="item-1").budget, other)
+
+    def test_sync_view_only_accepts_post(self):
+        """Test that the sync view refuses GET and checks the account on POST"""
+        self.client.force_login(self.user)
+        session = self.client.session
+        session["budget"] = str(self.budget.id)
+        session.save()
+        unlinked = Account.objects.create(
+            budget=self.budget, name="Cash", type="checking"
+        )
+        url = reverse("sync_plaid_transactions", args=[unlinked.id])
+
+        self.assertEqual(self.client.get(url).status_code, 405)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {"status": "error", "message": "Account is not connected to Plaid"},
+        )
@@ -0,0 +1,52 @@
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def build_session():
+    """
+    Build a ``requests.Session`` for talking to SimpleFIN bridges.
+
+    Connections are kept alive and pooled, with room for every sync worker.
+    Idempotent requests are retried with exponential backoff on connection
+    errors, rate limiting and 5xx responses, honouring ``Retry-After``.
+
+    Returns:
+        requests.Session: The configured session
+    """
+    retry = Retry(
+        total=settings.SIMPLEFIN_MAX_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        # Hand back the last response so callers can report its status code
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        max_retries=retry,
+        pool_connections=settings.SIMPLEFIN_MAX_WORKERS,
+        pool_maxsize=settings.SIMPLEFIN_MAX_WORKERS,
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session():
+    """
+    Return the process-wide SimpleFIN session, creating it on first use.
+
+    The session is shared by all threads; its connection pool is thread-safe.
+    """
+    global _session  # pylint: disable=global-statement
+    with _session_lock:
+        if _session is None:
+            _session = build_session()
+        return _session
@@ -7,6 +7,11 @@ urlpatterns = [
         "exchange-plaid-token", views.exchange_plaid_token, name="exchange_plaid_token"
     ),
     path("x-add-plaid", views.x_add_plaid, name="x_add_plaid"),
+    path(
+        "plaid-sync/<str:account_id>/",
+        views.sync_plaid_transactions,
+        name="sync_plaid_transactions",
+    ),
     path("x-add-sfin", views.x_add_sfin, name="x_add_sfin"),
     path("x-add-account-form", views.x_add_account_form, name="x_add_account_form"),
     path("<slug:slug>/", views.account_transactions, name="account_transactions"),
@@ -1,5 +1,4 @@
 from decimal import Decimal
-import datetime
 import logging
 import os
 
@@ -7,6 +6,7 @@ from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, render, redirect
+from django.views.decorators.http import require_POST
 
 from plaid import Environment
 from plaid.api import plaid_api
@@ -20,13 +20,13 @@ from plaid.model.item_public_token_exchange_request import (
 from plaid.model.link_token_create_request import LinkTokenCreateRequest
 from plaid.model.link_token_create_request_user import LinkTokenCreateRequestUser
 from plaid.model.products import Products
-from plaid.model.transactions_get_request import TransactionsGetRequest
 
 from budgetapp.utils import money_db_prep
 from budgets.models import Budget
 from envelopes.models import Category, Envelope
 from .forms import AccountForm
 from .models import Account, SimpleFINConnection
+from .plaid_sync import sync_plaid_item
 
 logger = logging.getLogger(__name__)
 
@@ -158,40 +158,37 @@ def x_add_plaid(request):
 
 
 @login_required
+@require_POST
 def sync_plaid_transactions(request, account_id):
     """
-    Sync transactions for a specific Plaid account
+    Sync transactions for the Plaid Item a specific account belongs to.
+
+    Only the changes since the Item's stored cursor are fetched, so every
+    account of the Item is brought up to date in the same pass.
     """
     try:
         account = get_object_or_404(
             Account, id=account_id, budget=request.session.get("budget")
         )
 
-        if not account.plaid_access_token:
+        if not account.plaid_access_token or not account.plaid_item_id:
             return JsonResponse(
                 {"status": "error", "message": "Account is not connected to Plaid"}
             )
 
-        client = get_plaid_client()
-
-        # Get transactions from the last 30 days
-        start_date = datetime.date.today() - datetime.timedelta(days=30)
-        end_date = datetime.date.today()
-
-        transactions_request = TransactionsGetRequest(
-            access_token=account.plaid_access_token,
-            start_date=start_date,
-            end_date=end_date,
-            account_ids=[account.plaid_account_id],
+        result = sync_plaid_item(
+            get_plaid_client(), account.budget, account.plaid_item_id
         )
 
-        transactions_response = client.transactions_get(transactions_request)
-
-        # Process transactions (you'll need to create Transaction model and logic)
-        transaction_count = len(transactions_response["transactions"])
-
         return JsonResponse(
-            {"status": "success", "message": f"Synced {transaction_count} transactions"}
+            {
+                "status": "success",
+                "message": (
+                    f"Synced {result['added']} new, {result['modified']} updated "
+                    f"and {result['removed']} removed transactions"
+                ),
+                **result,
+            }
         )
 
     except Exception as e:
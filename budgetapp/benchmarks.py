@@ -0,0 +1,108 @@
+"""
+Helpers shared by the ``bench_*`` management commands.
+
+Benchmarks always run against a throwaway test database so they can be run
+safely on a machine that also holds real budget data.
+"""
+
+from contextlib import contextmanager
+from datetime import date, timedelta
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+
+@contextmanager
+def benchmark_database():
+    """
+    Create a fresh test database for the duration of the block and destroy it
+    afterwards. The test environment is set up as well so the test client can
+    be used to drive the API.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=False
+    )
+    try:
+        yield
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+
+
+@contextmanager
+def measure():
+    """
+    Capture the wall time and the SQL queries issued inside the block.
+
+    Yields a dict that is filled with ``seconds`` and ``queries`` on exit.
+    """
+    result = {"queries": 0}
+
+    def count_queries(execute, sql, params, many, context):
+        result["queries"] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(count_queries):
+        start = time.perf_counter()
+        yield result
+        result["seconds"] = time.perf_counter() - start
+
+
+def seed_budget(
+    envelope_count=20, account_types=("checking", "savings", "credit_card")
+):
+    """
+    Create a user, a budget, a few accounts and a category full of envelopes.
+
+    Returns:
+        tuple: (budget, accounts, envelopes)
+    """
+    # pylint: disable=import-outside-toplevel
+    from accounts.models import Account
+    from budgets.models import Budget
+    from envelopes.models import Category, Envelope
+
+    user = get_user_model().objects.create_user(
+        username=f"bench-{random.randint(0, 1_000_000)}", password="bench"
+    )
+    budget = Budget.objects.create(user=user, name="Benchmark Budget")
+    accounts = [
+        Account.objects.create(budget=budget, name=f"Account {index}", type=kind)
+        for index, kind in enumerate(account_types)
+    ]
+    category = Category.objects.create(budget=budget, name="Benchmark")
+    envelopes = [
+        Envelope.objects.create(
+            budget=budget, category=category, name=f"Envelope {index}"
+        )
+        for index in range(envelope_count)
+    ]
+    return budget, accounts, envelopes
+
+
+def random_transactions(budget, accounts, envelopes, count, payees=None, seed=42):
+    """
+    Build (but do not save) ``count`` random Transaction instances.
+    """
+    # pylint: disable=import-outside-toplevel
+    from transactions.models import Transaction
+
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=365 * 3)
+    return [
+        Transaction(
+            budget=budget,
+            account=rng.choice(accounts),
+            envelope=rng.choice(envelopes),
+            payee=rng.choice(payees) if payees else None,
+            date=start + timedelta(days=rng.randint(0, 365 * 3)),
+            amount=rng.randint(-250_000, 50_000),
+            memo=f"Benchmark transaction {index}",
+            cleared=rng.random() < 0.8,
+        )
+        for index in range(count)
+    ]
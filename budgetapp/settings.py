@@ -276,6 +276,22 @@ PLAID_ENVIRONMENT = os.environ.get("PLAID_ENVIRONMENT", "sandbox")
 PLAID_CLIENT_NAME = os.environ.get("PLAID_CLIENT_NAME", "EnvelopeBudget.com")
 
 
+# SimpleFIN
+SIMPLEFIN_TIMEOUT = int(os.environ.get("SIMPLEFIN_TIMEOUT", 30))
+SIMPLEFIN_MAX_RETRIES = int(os.environ.get("SIMPLEFIN_MAX_RETRIES", 3))
+# Accounts fetched in parallel during a sync
+SIMPLEFIN_MAX_WORKERS = int(os.environ.get("SIMPLEFIN_MAX_WORKERS", 4))
+# Minutes between scheduled syncs run by the simplefin_worker command
+SIMPLEFIN_SYNC_INTERVAL = int(os.environ.get("SIMPLEFIN_SYNC_INTERVAL", 240))
+
+
+# Payee resolution cache (per process)
+PAYEE_CACHE_SIZE = int(os.environ.get("PAYEE_CACHE_SIZE", 10000))
+# Seconds before a cached payee is looked up again, so renames and merges made
+# by other processes are picked up
+PAYEE_CACHE_TTL = int(os.environ.get("PAYEE_CACHE_TTL", 300))
+
+
 # Logging configuration
 LOGGING = {
     "version": 1,
@@ -13,3 +13,15 @@ def generate_uuid_hex():
 
 def money_db_prep(value):
     return int(float(value) * 1000)
+
+
+def chunked(items, size=900):
+    """
+    Split ``items`` into lists of at most ``size`` elements.
+
+    Used to keep ``__in`` lookups under the 999 bound parameter limit of older
+    SQLite builds.
+    """
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
@@ -1,10 +1,12 @@
 from uuid import UUID
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
-from ninja import Router, Schema
+from ninja import Query, Router, Schema
 from ninja.security import django_auth
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 from .models import Budget
+from .sync import DEFAULT_LIMIT, changes_since
 
 router = Router()
 
@@ -75,6 +77,22 @@ class BudgetSchema(Schema):
         )
 
 
+class DeletedRowSchema(Schema):
+    kind: str
+    id: str
+
+
+class BudgetChangesSchema(Schema):
+    version: int
+    has_more: bool
+    accounts: List[Dict[str, Any]]
+    categories: List[Dict[str, Any]]
+    envelopes: List[Dict[str, Any]]
+    payees: List[Dict[str, Any]]
+    transactions: List[Dict[str, Any]]
+    deleted: List[DeletedRowSchema]
+
+
 @router.post("", response=BudgetSchema, auth=django_auth, tags=["Budgets"])
 def create_budget(request, payload: createBudgetSchema):
     budget = Budget.objects.create(
@@ -103,3 +121,24 @@ def list_budgets(request):
 def get_budget(request, budget_id: str):
     budget = get_object_or_404(Budget, id=budget_id)
     return BudgetSchema.from_django(budget)
+
+
+@router.get("/{budget_id}/changes", response=BudgetChangesSchema, tags=["Budgets"])
+def list_budget_changes(
+    request,
+    budget_id: str,
+    since: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=10_000),
+):
+    """
+    List what changed in a budget after the ``version`` of the last sync.
+
+    Returns the accounts, categories, envelopes, payees and transactions
+    created or updated since then, soft-deleted ones included with
+    ``deleted`` set, and the hard-deleted ones under ``deleted``. Pass the
+    returned ``version`` as ``since`` next time, straight away while
+    ``has_more`` is set. Start from 0 for every row of the budget.
+    """
+    budget = get_object_or_404(Budget, id=budget_id, user=request.auth)
+    # Rows are returned as read, without validating them again
+    return JsonResponse(changes_since(budget.id, since=since, limit=limit))
@@ -0,0 +1,120 @@
+"""
+Server-sent events with the changes of a budget.
+
+There is no broker between workers: every open stream polls the budget's
+``BudgetVersion`` row, a single indexed read, and when it moved on reads the
+changes with ``sync.changes_since`` and sends them as compact events. Any
+worker that writes to the shared SQLite database is picked up by every
+stream, whichever worker serves it.
+
+Each batch of events ends with a ``sync`` event whose SSE ``id`` is the
+budget version it brings the client to, so a reconnecting ``EventSource``
+resumes from there through ``Last-Event-ID``.
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+
+from .sync import changes_since
+
+POLL_INTERVAL = 1.0
+KEEPALIVE_INTERVAL = 15.0
+# Streams end after a while so workers are not held forever; the browser
+# reconnects after RECONNECT_DELAY and resumes from its last event ID
+STREAM_LIFETIME = 300.0
+RECONNECT_DELAY = 2.0
+
+
+def format_event(event, data, event_id=None):
+    """Encode one event in the text/event-stream format."""
+    lines = [f"event: {event}", f"data: {json.dumps(data, separators=(',', ':'))}"]
+    if event_id is not None:
+        lines.insert(0, f"id: {event_id}")
+    return "\n".join(lines) + "\n\n"
+
+
+def change_events(changes):
+    """
+    Turn the result of ``changes_since`` into ``(event, data)`` pairs.
+
+    Balances are all that open pages show of accounts, envelopes and
+    categories, so those events only carry the balances.
+    """
+    for row in changes["transactions"]:
+        yield "transaction", {
+            "id": row["id"],
+            "account_id": row["account_id"],
+            "envelope_id": row["envelope_id"],
+            "payee_id": row["payee_id"],
+            "date": row["date"].isoformat(),
+            "amount": row["amount"],
+            "cleared": row["cleared"],
+            "in_inbox": row["in_inbox"],
+            "deleted": row["deleted"],
+        }
+    for row in changes["accounts"]:
+        yield "account", {
+            "id": row["id"],
+            "balance": row["balance"],
+            "cleared_balance": row["cleared_balance"],
+        }
+    for row in changes["envelopes"]:
+        yield "envelope", {"id": row["id"], "balance": row["balance"]}
+    for row in changes["categories"]:
+        yield "category", {"id": row["id"], "balance": row["balance"]}
+    for row in changes["deleted"]:
+        yield "deleted", row
+
+
+async def budget_events(
+    budget_id,
+    since,
+    lifetime=STREAM_LIFETIME,
+    poll_interval=POLL_INTERVAL,
+    keepalive_interval=KEEPALIVE_INTERVAL,
+):
+    """
+    Stream the changes of a budget after version ``since``.
+
+    Args:
+        budget_id (str): The ID of the budget
+        since (int): The budget version the client is up to date with
+        lifetime (float): Seconds after which the stream ends; with 0 it
+            reports what is there and ends straight away
+        poll_interval (float): Seconds between checks of the version
+        keepalive_interval (float): Seconds of quiet after which a comment
+            is sent, which also lets the server notice closed connections
+
+    Yields:
+        str: Chunks of a text/event-stream response
+    """
+    # pylint: disable=import-outside-toplevel
+    from .models import BudgetVersion
+
+    current_version = sync_to_async(BudgetVersion.current)
+    read_changes = sync_to_async(changes_since)
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + lifetime
+    quiet_since = loop.time()
+    yield f"retry: {int(RECONNECT_DELAY * 1000)}\n\n"
+
+    while True:
+        if await current_version(budget_id) > since:
+            has_more = True
+            while has_more:
+                changes = await read_changes(budget_id, since=since)
+                for event, data in change_events(changes):
+                    yield format_event(event, data)
+                since, has_more = changes["version"], changes["has_more"]
+                yield format_event("sync", {"version": since}, event_id=since)
+            quiet_since = loop.time()
+        elif loop.time() - quiet_since >= keepalive_interval:
+            yield ": keepalive\n\n"
+            quiet_since = loop.time()
+
+        if loop.time() >= deadline:
+            return
+        await asyncio.sleep(poll_interval)
@@ -0,0 +1,91 @@
+from datetime import date
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from accounts.models import Account
+from budgets.events import budget_events
+from budgets.models import Budget, BudgetVersion
+from transactions.models import Transaction
+
+
+class BudgetEventTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="events", password="events"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.account = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.url = f"/budgets/{self.budget.id}/events"
+        self.client.force_login(self.user)
+
+    def add_transaction(self):
+        return Transaction.objects.create(
+            budget=self.budget,
+            account=self.account,
+            amount=-2_500,
+            date=date(2025, 7, 1),
+        )
+
+    def stream(self, **kwargs):
+        response = self.client.get(self.url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return response.content.decode()
+
+    def test_reports_changes_after_a_version(self):
+        """Test that events carry the changes and end with the new version"""
+        since = BudgetVersion.current(self.budget.id)
+        transaction = self.add_transaction()
+        version = BudgetVersion.current(self.budget.id)
+
+        body = self.stream(data={"since": since})
+        self.assertIn("event: transaction\n", body)
+        self.assertIn(f'"id":"{transaction.id}"', body)
+        self.assertIn(f'event: account\ndata: {{"id":"{self.account.id}"', body)
+        self.assertTrue(
+            body.endswith(
+                f'id: {version}\nevent: sync\ndata: {{"version":{version}}}\n\n'
+            )
+        )
+
+        # Reconnecting with the last event ID has nothing new to report
+        body = self.stream(HTTP_LAST_EVENT_ID=str(version))
+        self.assertNotIn("event:", body)
+
+    def test_starts_from_the_current_version(self):
+        """Test that a new stream only reports what happens after it opens"""
+        self.add_transaction()
+        self.assertNotIn("event:", self.stream())
+
+    def test_stream_picks_up_new_writes(self):
+        """Test that an open stream sends writes made while it polls"""
+
+        async def collect():
+            since = await sync_to_async(BudgetVersion.current)(self.budget.id)
+            stream = budget_events(
+                self.budget.id, since, lifetime=0.2, poll_interval=0.01
+            )
+            chunks = [await anext(stream)]
+            await sync_to_async(self.add_transaction)()
+            chunks.extend([chunk async for chunk in stream])
+            return "".join(chunks)
+
+        body = async_to_sync(collect)()
+        self.assertTrue(body.startswith("retry: "))
+        self.assertEqual(body.count("event: transaction\n"), 1)
+        self.assertEqual(body.count("event: sync\n"), 1)
+
+    def test_other_budgets_are_not_streamed(self):
+        """Test that only the owner of a budget can open its stream"""
+        other = get_user_model().objects.create_user(username="other", password="x")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+        self.client.force_login(self.user)
+        response = self.client.get(self.url, {"since": "x"})
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,65 @@
+from django.db import migrations, models
+
+# Tables whose rows make up the data of a budget; each has a budget_id column
+VERSIONED_TABLES = [
+    "accounts_account",
+    "envelopes_category",
+    "envelopes_envelope",
+    "transactions_payee",
+    "transactions_transaction",
+]
+
+BUMP = """
+    INSERT INTO budgets_budgetversion (budget_id, version) VALUES ({row}.budget_id, 1)
+    ON CONFLICT (budget_id) DO UPDATE SET version = version + 1;
+"""
+
+
+def create_triggers():
+    statements = []
+    for table in VERSIONED_TABLES:
+        for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD")):
+            statements.append(
+                f"CREATE TRIGGER {table}_version_{event.lower()} "
+                f"AFTER {event} ON {table} FOR EACH ROW BEGIN"
+                f"{BUMP.format(row=row)}END;"
+            )
+    statements.append(
+        "CREATE TRIGGER budgets_budget_version_delete "
+        "AFTER DELETE ON budgets_budget FOR EACH ROW BEGIN "
+        "DELETE FROM budgets_budgetversion WHERE budget_id = OLD.id; END;"
+    )
+    return statements
+
+
+def drop_triggers():
+    statements = [
+        f"DROP TRIGGER IF EXISTS {table}_version_{event}"
+        for table in VERSIONED_TABLES
+        for event in ("insert", "update", "delete")
+    ]
+    statements.append("DROP TRIGGER IF EXISTS budgets_budget_version_delete")
+    return statements
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("budgets", "0001_initial"),
+        ("accounts", "0010_plaiditem"),
+        ("envelopes", "0004_auto_20250605_1113"),
+        ("transactions", "0012_transaction_query_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="BudgetVersion",
+            fields=[
+                (
+                    "budget_id",
+                    models.CharField(max_length=32, primary_key=True, serialize=False),
+                ),
+                ("version", models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunSQL(create_triggers(), reverse_sql=drop_triggers()),
+    ]
@@ -0,0 +1,143 @@
+from django.db import migrations, models
+
+# Tables whose rows make up the data of a budget, with the key of their rows
+# in the delta sync response; each has budget_id and sync_version columns
+VERSIONED_TABLES = {
+    "accounts_account": "accounts",
+    "envelopes_category": "categories",
+    "envelopes_envelope": "envelopes",
+    "transactions_payee": "payees",
+    "transactions_transaction": "transactions",
+}
+
+BUMP = """
+    INSERT INTO budgets_budgetversion (budget_id, version) VALUES ({row}.budget_id, 1)
+    ON CONFLICT (budget_id) DO UPDATE SET version = version + 1;
+"""
+
+CURRENT_VERSION = (
+    "(SELECT version FROM budgets_budgetversion WHERE budget_id = {row}.budget_id)"
+)
+
+# Recursive triggers are off in SQLite, so the stamping UPDATE does not fire
+# the update trigger again
+STAMP = f"""
+    UPDATE {{table}} SET sync_version = {CURRENT_VERSION.format(row="NEW")}
+    WHERE id = NEW.id;
+"""
+
+BURY = f"""
+    INSERT INTO budgets_tombstone (budget_id, kind, object_id, version)
+    VALUES (OLD.budget_id, '{{kind}}', OLD.id, {CURRENT_VERSION.format(row="OLD")});
+"""
+
+
+def trigger(table, event, body):
+    return (
+        f"CREATE TRIGGER {table}_version_{event.lower()} "
+        f"AFTER {event} ON {table} FOR EACH ROW BEGIN{body}END;"
+    )
+
+
+def drop_triggers():
+    statements = [
+        f"DROP TRIGGER IF EXISTS {table}_version_{event}"
+        for table in VERSIONED_TABLES
+        for event in ("insert", "update", "delete")
+    ]
+    statements.append("DROP TRIGGER IF EXISTS budgets_budget_version_delete")
+    return statements
+
+
+def create_triggers():
+    statements = []
+    for table, kind in VERSIONED_TABLES.items():
+        stamp = STAMP.format(table=table)
+        statements += [
+            trigger(table, "INSERT", BUMP.format(row="NEW") + stamp),
+            trigger(table, "UPDATE", BUMP.format(row="NEW") + stamp),
+            trigger(table, "DELETE", BUMP.format(row="OLD") + BURY.format(kind=kind)),
+        ]
+    statements.append(
+        "CREATE TRIGGER budgets_budget_version_delete "
+        "AFTER DELETE ON budgets_budget FOR EACH ROW BEGIN "
+        "DELETE FROM budgets_budgetversion WHERE budget_id = OLD.id; "
+        "DELETE FROM budgets_tombstone WHERE budget_id = OLD.id; END;"
+    )
+    return statements
+
+
+def create_version_triggers():
+    """The triggers of 0002_budgetversion, which only bump the version."""
+    statements = [
+        trigger(table, event, BUMP.format(row=row))
+        for table in VERSIONED_TABLES
+        for event, row in (("INSERT", "NEW"), ("UPDATE", "NEW"), ("DELETE", "OLD"))
+    ]
+    statements.append(
+        "CREATE TRIGGER budgets_budget_version_delete "
+        "AFTER DELETE ON budgets_budget FOR EACH ROW BEGIN "
+        "DELETE FROM budgets_budgetversion WHERE budget_id = OLD.id; END;"
+    )
+    return statements
+
+
+def stamp_existing_rows():
+    """
+    Give every budget a new version and stamp all of its rows with it, so a
+    first sync from version 0 returns them.
+    """
+    statements = [
+        # WHERE true keeps SQLite from reading ON CONFLICT as a join clause
+        "INSERT INTO budgets_budgetversion (budget_id, version) "
+        "SELECT id, 1 FROM budgets_budget WHERE true "
+        "ON CONFLICT (budget_id) DO UPDATE SET version = version + 1"
+    ]
+    statements += [
+        f"UPDATE {table} SET sync_version = COALESCE("
+        f"{CURRENT_VERSION.format(row=table)}, 0)"
+        for table in VERSIONED_TABLES
+    ]
+    return statements
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("budgets", "0002_budgetversion"),
+        ("accounts", "0011_account_sync_version"),
+        ("envelopes", "0005_sync_version"),
+        ("transactions", "0013_sync_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Tombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("budget_id", models.CharField(max_length=32)),
+                ("kind", models.CharField(max_length=32)),
+                ("object_id", models.CharField(max_length=32)),
+                ("version", models.PositiveBigIntegerField()),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["budget_id", "version"], name="tombstone_sync_idx"
+                    )
+                ],
+            },
+        ),
+        # The old triggers go first so the backfill does not bump versions
+        # once per row
+        migrations.RunSQL(drop_triggers(), reverse_sql=create_version_triggers()),
+        migrations.RunSQL(stamp_existing_rows(), reverse_sql=migrations.RunSQL.noop),
+        migrations.RunSQL(create_triggers(), reverse_sql=drop_triggers()),
+    ]
@@ -90,3 +90,63 @@ class Budget(models.Model):
             # Assuming envelopes is a method or a property
             category.envelopes = category.envelopes()
         return [CategorySchema.from_orm(category) for category in categories]
+
+
+class BudgetVersion(models.Model):
+    """
+    A counter that goes up with every write to a budget's data.
+
+    It is kept by database triggers on the transaction, envelope, category,
+    account and payee tables (see migration ``0002_budgetversion``), so bulk
+    creates, ``update()`` calls and balance ``F()`` updates bump it as well as
+    ``save()`` does. The same triggers stamp the written row's
+    ``sync_version`` with the new version, which is what delta sync reads.
+    Nothing in Python writes to either.
+    """
+
+    # Not a foreign key: the triggers still fire while a budget is being
+    # deleted, after its own row may already be gone
+    budget_id = models.CharField(primary_key=True, max_length=32)
+    version = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.budget_id}@{self.version}"
+
+    @classmethod
+    def current(cls, budget_id):
+        """
+        Get the data version of a budget.
+
+        Returns:
+            int: The version, 0 for a budget that was never written to
+        """
+        version = (
+            cls.objects.filter(budget_id=budget_id)
+            .values_list("version", flat=True)
+            .first()
+        )
+        return version or 0
+
+
+class Tombstone(models.Model):
+    """
+    A hard-deleted row of a budget's data, recorded by the same triggers as
+    ``BudgetVersion`` so delta sync can report it.
+
+    Soft-deleted rows need no tombstone; they stay in their table with
+    ``deleted`` set and a new ``sync_version``.
+    """
+
+    budget_id = models.CharField(max_length=32)
+    # Key of the row's kind in the delta sync response, e.g. "transactions"
+    kind = models.CharField(max_length=32)
+    object_id = models.CharField(max_length=32)
+    version = models.PositiveBigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["budget_id", "version"], name="tombstone_sync_idx")
+        ]
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}@{self.version}"
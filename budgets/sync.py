@@ -0,0 +1,141 @@
+"""
+Delta sync: the rows of a budget that changed since a version.
+
+Every write to a budget's accounts, categories, envelopes, payees and
+transactions stamps the row's ``sync_version`` with the budget's new
+``BudgetVersion`` (hard deletes leave a ``Tombstone`` instead), and each
+row write gets a version of its own. A client keeps the ``version`` of its
+last sync and asks for what came after it; soft-deleted rows come back with
+``deleted`` set, hard-deleted ones are listed in ``deleted``.
+"""
+
+from django.db import transaction as db_transaction
+
+DEFAULT_LIMIT = 1000
+
+# Columns sent for each kind of row; secrets such as Plaid tokens stay out
+SYNCED_COLUMNS = {
+    "accounts": (
+        "id",
+        "name",
+        "type",
+        "on_budget",
+        "closed",
+        "note",
+        "balance",
+        "cleared_balance",
+        "last_reconciled_at",
+        "deleted",
+    ),
+    "categories": ("id", "name", "balance", "sort_order", "hidden", "deleted"),
+    "envelopes": (
+        "id",
+        "category_id",
+        "name",
+        "sort_order",
+        "balance",
+        "note",
+        "hidden",
+        "monthly_budget_amount",
+        "linked_account_id",
+        "deleted",
+    ),
+    "payees": ("id", "name", "deleted"),
+    "transactions": (
+        "id",
+        "account_id",
+        "payee_id",
+        "envelope_id",
+        "date",
+        "amount",
+        "memo",
+        "cleared",
+        "pending",
+        "reconciled",
+        "import_id",
+        "sfin_id",
+        "import_payee_name",
+        "in_inbox",
+        "is_transfer",
+        "transfer_account_id",
+        "transfer_transaction_id",
+        "deleted",
+    ),
+}
+
+
+def synced_querysets(budget_id):
+    """Every row of a budget by kind, soft-deleted ones included."""
+    # pylint: disable=import-outside-toplevel
+    from accounts.models import Account
+    from envelopes.models import Category, Envelope
+    from transactions.models import Payee, Transaction
+
+    return {
+        "accounts": Account.objects.filter(budget_id=budget_id),
+        "categories": Category.objects.include_deleted().filter(budget_id=budget_id),
+        "envelopes": Envelope.objects.include_all().filter(budget_id=budget_id),
+        "payees": Payee.objects.filter(budget_id=budget_id),
+        "transactions": Transaction.objects.include_deleted().filter(
+            budget_id=budget_id
+        ),
+    }
+
+
+def changes_since(budget_id, since=0, limit=DEFAULT_LIMIT):
+    """
+    Collect the changes of a budget after version ``since``.
+
+    At most ``limit`` changes are returned, oldest first; when more are left
+    ``has_more`` is set and ``version`` is that of the last change returned,
+    so asking again from it picks up the rest.
+
+    Args:
+        budget_id (str): The ID of the budget
+        since (int): The ``version`` of the client's last sync, 0 for all rows
+        limit (int): The most changes to return
+
+    Returns:
+        dict: ``version``, ``has_more``, a list of rows per kind and
+        ``deleted``, a list of ``{"kind", "id"}`` for hard-deleted rows
+    """
+    # pylint: disable=import-outside-toplevel
+    from .models import BudgetVersion, Tombstone
+
+    # One read transaction, so the version and the rows come from the same
+    # snapshot even while another request writes
+    with db_transaction.atomic():
+        version = BudgetVersion.current(budget_id)
+        # Each source can fill the page on its own, so take up to limit + 1
+        # from each and keep the oldest across all of them
+        changes = []
+        for kind, queryset in synced_querysets(budget_id).items():
+            rows = (
+                queryset.filter(sync_version__gt=since, sync_version__lte=version)
+                .order_by("sync_version")
+                .values("sync_version", *SYNCED_COLUMNS[kind])[: limit + 1]
+            )
+            changes.extend((row.pop("sync_version"), kind, row) for row in rows)
+        tombstones = (
+            Tombstone.objects.filter(
+                budget_id=budget_id, version__gt=since, version__lte=version
+            )
+            .order_by("version")
+            .values_list("version", "kind", "object_id")[: limit + 1]
+        )
+        changes.extend(
+            (row_version, "deleted", {"kind": kind, "id": object_id})
+            for row_version, kind, object_id in tombstones
+        )
+
+    changes.sort(key=lambda change: change[0])
+    has_more = len(changes) > limit
+    if has_more:
+        changes = changes[:limit]
+        version = changes[-1][0]
+
+    result = {"version": version, "has_more": has_more, "deleted": []}
+    result.update((kind, []) for kind in SYNCED_COLUMNS)
+    for _, kind, row in changes:
+        result[kind].append(row)
+    return result
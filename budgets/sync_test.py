@@ -0,0 +1,124 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from accounts.models import Account
+from budgetapp.models import APIKey
+from budgets.models import Budget
+from budgets.sync import changes_since
+from envelopes.models import Category, Envelope
+from transactions.models import Payee, Transaction
+
+
+class DeltaSyncTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="sync", password="sync"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.account = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.category = Category.objects.create(budget=self.budget, name="Bills")
+        self.envelope = Envelope.objects.create(
+            budget=self.budget, category=self.category, name="Power"
+        )
+        self.payee = Payee.get_or_create_one(self.budget.id, "Utility")
+        self.transactions = [
+            Transaction.objects.create(
+                budget=self.budget,
+                account=self.account,
+                payee=self.payee,
+                envelope=self.envelope,
+                amount=-1_000 * day,
+                date=date(2025, 4, day),
+            )
+            for day in range(1, 4)
+        ]
+        self.key = APIKey.create_new_key(self.user).key
+        self.url = f"/api/budgets/{self.budget.id}/changes"
+
+    def ids(self, changes, kind):
+        return {row["id"] for row in changes[kind]}
+
+    def test_first_sync_returns_every_row(self):
+        """Test that syncing from 0 returns the whole budget, then nothing"""
+        changes = changes_since(self.budget.id)
+        self.assertFalse(changes["has_more"])
+        self.assertEqual(self.ids(changes, "accounts"), {self.account.id})
+        self.assertEqual(self.ids(changes, "categories"), {self.category.id})
+        self.assertIn(self.envelope.id, self.ids(changes, "envelopes"))
+        self.assertEqual(self.ids(changes, "payees"), {self.payee.id})
+        self.assertEqual(
+            self.ids(changes, "transactions"), {t.id for t in self.transactions}
+        )
+
+        again = changes_since(self.budget.id, since=changes["version"])
+        self.assertEqual(again["version"], changes["version"])
+        for kind in ("accounts", "categories", "envelopes", "payees", "transactions"):
+            self.assertEqual(again[kind], [])
+
+    def test_updates_and_deletes(self):
+        """Test that updates, soft deletes and hard deletes are all reported"""
+        since = changes_since(self.budget.id)["version"]
+        edited, soft_deleted, hard_deleted = self.transactions
+        edited.memo = "Edited"
+        edited.save()
+        soft_deleted.soft_delete()
+        hard_deleted_id = hard_deleted.id
+        hard_deleted.delete()
+
+        changes = changes_since(self.budget.id, since=since)
+        rows = {row["id"]: row for row in changes["transactions"]}
+        self.assertEqual(set(rows), {edited.id, soft_deleted.id})
+        self.assertEqual(rows[edited.id]["memo"], "Edited")
+        self.assertTrue(rows[soft_deleted.id]["deleted"])
+        self.assertEqual(
+            changes["deleted"], [{"kind": "transactions", "id": hard_deleted_id}]
+        )
+        # The balance changes made by the writes come along as well
+        self.assertIn(self.envelope.id, self.ids(changes, "envelopes"))
+        self.assertIn(self.account.id, self.ids(changes, "accounts"))
+        self.assertEqual(changes["payees"], [])
+
+    def test_pages_cover_every_change_once(self):
+        """Test that following has_more returns each change exactly once"""
+        since, seen, pages = 0, [], 0
+        while True:
+            changes = changes_since(self.budget.id, since=since, limit=2)
+            pages += 1
+            self.assertLessEqual(
+                sum(
+                    len(changes[kind])
+                    for kind in ("accounts", "categories", "envelopes", "payees")
+                )
+                + len(changes["transactions"])
+                + len(changes["deleted"]),
+                2,
+            )
+            seen.extend(row["id"] for row in changes["transactions"])
+            since = changes["version"]
+            if not changes["has_more"]:
+                break
+        self.assertGreater(pages, 2)
+        self.assertCountEqual(seen, [t.id for t in self.transactions])
+
+    def test_api_key_access(self):
+        """Test the endpoint with an X-API-Key and for someone else's budget"""
+        response = self.client.get(self.url, HTTP_X_API_KEY=self.key)
+        self.assertEqual(response.status_code, 200)
+        changes = response.json()
+        self.assertEqual(len(changes["transactions"]), 3)
+        self.assertEqual(changes["transactions"][0]["date"], "2025-04-01")
+
+        response = self.client.get(
+            self.url, {"since": changes["version"]}, HTTP_X_API_KEY=self.key
+        )
+        self.assertEqual(response.json()["transactions"], [])
+
+        other = get_user_model().objects.create_user(username="other", password="x")
+        other_key = APIKey.create_new_key(other).key
+        response = self.client.get(self.url, HTTP_X_API_KEY=other_key)
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
@@ -9,4 +9,9 @@ urlpatterns = [
         name="set_active_budget",
     ),
     path("create-budget", views.create_budget, name="create_budget"),
+    path(
+        "budgets/<str:budget_id>/events",
+        views.budget_event_stream,
+        name="budget_events",
+    ),
 ]
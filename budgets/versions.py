@@ -0,0 +1,106 @@
+"""
+Conditional GETs keyed on a budget's data version.
+
+Read endpoints that only depend on a budget's transactions, envelopes,
+categories, accounts and payees answer ``If-None-Match`` from
+``BudgetVersion`` alone: a client that already has the current
+representation gets a ``304 Not Modified`` without the endpoint's own
+queries running.
+"""
+
+from functools import wraps
+import hashlib
+
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.http import HttpResponseNotModified
+from django.utils.http import parse_etags
+
+
+def owned_budget_version(user, budget_id):
+    """
+    Get the data version of a budget, in one query that also checks access.
+
+    Returns:
+        int: The version, or None if the user has no such budget
+    """
+    # budgets.models imports envelopes.apis, which uses this module
+    # pylint: disable=import-outside-toplevel
+    from .models import Budget, BudgetVersion
+
+    if not budget_id or not user.is_authenticated:
+        return None
+    return (
+        Budget.objects.filter(id=budget_id, user=user)
+        .annotate(
+            data_version=Coalesce(
+                Subquery(
+                    BudgetVersion.objects.filter(budget_id=OuterRef("id")).values(
+                        "version"
+                    )
+                ),
+                Value(0),
+            )
+        )
+        .values_list("data_version", flat=True)
+        .first()
+    )
+
+
+def budget_etag(request, budget_id, version):
+    """Strong ETag for this request's URL at a budget's data version."""
+    key = f"{budget_id}:{version}:{request.get_full_path()}"
+    return f'"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+
+
+def path_budget_id(request, kwargs):
+    """Budget of an endpoint with a ``budget_id`` path parameter."""
+    return kwargs.get("budget_id")
+
+
+def session_budget_id(request, kwargs):
+    """Budget of a page-backing endpoint that works on the session's budget."""
+    return request.session.get("budget")
+
+
+def condition_on_budget_version(get_budget_id=path_budget_id):
+    """
+    Make a GET view answer ``If-None-Match`` from the budget's data version.
+
+    Unlike Django's ``etag`` decorator, nothing is answered for budgets the
+    user cannot see, and the ETag is only set on successful responses. Put
+    it below any authentication, e.g. under ``@router.get(...)`` or
+    ``@login_required``. The wrapped view has to return an ``HttpResponse``.
+
+    Args:
+        get_budget_id (callable): Gets the budget ID from the request and
+            the view's keyword arguments
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def view(request, *args, **kwargs):
+            budget_id = get_budget_id(request, kwargs)
+            version = owned_budget_version(request.user, budget_id)
+            if version is None:
+                return view_func(request, *args, **kwargs)
+
+            etag = budget_etag(request, budget_id, version)
+            # If-None-Match compares weakly, so a W/ the client added is fine
+            if_none_match = {
+                tag.removeprefix("W/")
+                for tag in parse_etags(request.headers.get("If-None-Match", ""))
+            }
+            if etag in if_none_match or "*" in if_none_match:
+                response = HttpResponseNotModified()
+                response["ETag"] = etag
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if response.status_code == 200:
+                response["ETag"] = etag
+            return response
+
+        return view
+
+    return decorator
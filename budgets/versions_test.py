@@ -0,0 +1,122 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Account
+from budgets.models import Budget, BudgetVersion
+from envelopes.models import Category, Envelope
+from transactions.models import Payee, Transaction
+
+
+class BudgetVersionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="versions", password="versions"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.other_budget = Budget.objects.create(user=self.user, name="Other")
+        self.account = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.category = Category.objects.create(budget=self.budget, name="Bills")
+        self.envelope = Envelope.objects.create(
+            budget=self.budget, category=self.category, name="Power"
+        )
+        self.client.force_login(self.user)
+        session = self.client.session
+        session["budget"] = self.budget.id
+        session.save()
+
+    def assertBumps(self, write):
+        before = BudgetVersion.current(self.budget.id)
+        other = BudgetVersion.current(self.other_budget.id)
+        write()
+        self.assertGreater(BudgetVersion.current(self.budget.id), before)
+        self.assertEqual(BudgetVersion.current(self.other_budget.id), other)
+
+    def test_writes_bump_the_version(self):
+        """Test that saves, bulk writes, F() updates and deletes all count"""
+        transaction = Transaction(
+            budget=self.budget, account=self.account, amount=-100, date=date.today()
+        )
+        self.assertBumps(transaction.save)
+        self.assertBumps(
+            lambda: Transaction.bulk_create_with_balances(
+                [
+                    Transaction(
+                        budget=self.budget,
+                        account=self.account,
+                        amount=-200,
+                        date=date.today(),
+                    )
+                ]
+            )
+        )
+        self.assertBumps(
+            lambda: Transaction.objects.filter(budget=self.budget).update(memo="x")
+        )
+        self.assertBumps(
+            lambda: Envelope.objects.filter(id=self.envelope.id).update(
+                balance=F("balance") + 1
+            )
+        )
+        self.assertBumps(lambda: Payee.get_or_create_one(self.budget.id, "Utility"))
+        self.assertBumps(lambda: Payee.objects.filter(budget=self.budget).delete())
+        self.assertBumps(self.category.save)
+        self.assertBumps(transaction.delete)
+
+    def test_conditional_gets(self):
+        """Test that each endpoint answers 304 until the budget changes"""
+        urls = [
+            "/envelopes/categorized_envelopes.json",
+            "/transactions/payees.json",
+            f"/api/envelopes/{self.budget.id}",
+            f"/api/transactions/{self.budget.id}",
+            f"/api/transactions/{self.budget.id}?account_id={self.account.id}",
+        ]
+        etags = {}
+        for url in urls:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            etags[url] = response["ETag"]
+            self.assertTrue(etags[url].startswith('"'))
+        self.assertEqual(len(set(etags.values())), len(urls))
+
+        for url in urls:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response["ETag"], etags[url])
+            self.assertFalse(response.content)
+            data_queries = [
+                query["sql"]
+                for query in queries
+                if "budgets_budget" not in query["sql"]
+                and "django_session" not in query["sql"]
+                and "auth_user" not in query["sql"]
+            ]
+            self.assertEqual(data_queries, [])
+
+        Payee.get_or_create_one(self.budget.id, "Utility")
+        for url in urls:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response["ETag"], etags[url])
+
+    def test_no_etag_for_other_users(self):
+        """Test that budgets of other users are never answered with a 304"""
+        url = f"/api/transactions/{self.budget.id}"
+        etag = self.client.get(url)["ETag"]
+
+        intruder = get_user_model().objects.create_user(
+            username="intruder", password="intruder"
+        )
+        self.client.force_login(intruder)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertEqual(response.json()["items"], [])
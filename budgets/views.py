@@ -1,10 +1,19 @@
+from asgiref.sync import sync_to_async
 from django.core.cache import cache
 
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseBadRequest,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render, redirect
 
-from budgets.models import Budget
+from budgets.events import budget_events
+from budgets.models import Budget, BudgetVersion
 from budgetapp.models import UserProfile
 
 
@@ -29,3 +38,39 @@ def create_budget(request):
 
     request.session["budget"] = str(budget.id)
     return redirect("home")
+
+
+@login_required
+async def budget_event_stream(request, budget_id):
+    """
+    Stream a budget's changes as server-sent events.
+
+    The stream starts from ``Last-Event-ID`` when the browser reconnects,
+    from ``?since=`` when given, and from the current version otherwise.
+    Under WSGI a long-lived stream would hold a worker, so each request only
+    reports what is there and the browser polls by reconnecting.
+    """
+    user = await request.auser()
+    if not await Budget.objects.filter(id=budget_id, user=user).aexists():
+        raise Http404("Budget not found")
+
+    since = request.headers.get("Last-Event-ID") or request.GET.get("since")
+    if since is None:
+        since = await sync_to_async(BudgetVersion.current)(budget_id)
+    else:
+        try:
+            since = int(since)
+        except ValueError:
+            return HttpResponseBadRequest("Invalid version")
+
+    if isinstance(request, ASGIRequest):
+        response = StreamingHttpResponse(
+            budget_events(budget_id, since), content_type="text/event-stream"
+        )
+    else:
+        events = [event async for event in budget_events(budget_id, since, lifetime=0)]
+        response = HttpResponse("".join(events), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Keep nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
@@ -26,6 +26,20 @@ python manage.py compress --force
 echo "📦 Collecting static files..."
 python manage.py collectstatic --noinput
 
+# Start the background SimpleFIN sync worker, restarting it whenever it exits
+echo "🔄 Starting SimpleFIN sync worker..."
+(
+  while true; do
+    python manage.py simplefin_worker || echo "⚠️ SimpleFIN sync worker exited with $?"
+    sleep 5
+  done
+) &
+
+# Serve the budget event streams from Uvicorn, so a long-lived stream never
+# holds one of the Gunicorn sync workers; Nginx routes them here
+echo "📡 Starting Uvicorn for budget event streams..."
+uvicorn budgetapp.asgi:application --host 127.0.0.1 --port 8001 --log-level info &
+
 # Start Nginx and Gunicorn
 echo "🚀 Starting Nginx and Gunicorn..."
 service nginx start
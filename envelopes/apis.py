@@ -2,8 +2,11 @@ from typing import List, Optional
 
 from ninja import Router, Schema
 from ninja.security import django_auth
+from django.http import JsonResponse
 from django.shortcuts import get_object_or_404
 
+from budgets.versions import condition_on_budget_version
+
 from .models import Envelope, Category
 
 router = Router()
@@ -115,11 +118,16 @@ class UpdateCategorySchema(Schema):
     auth=django_auth,
     tags=["Envelopes"],
 )
+@condition_on_budget_version()
 def list_envelopes(request, budget_id: str):
     from budgets.models import Budget
 
     budget = get_object_or_404(Budget, id=budget_id)
-    return budget.categorized_envelopes()
+    # Rendered here so the conditional GET wrapper can set its ETag
+    return JsonResponse(
+        [category.dict() for category in budget.categorized_envelopes()],
+        safe=False,
+    )
 
 
 @router.get(
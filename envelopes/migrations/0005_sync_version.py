@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("envelopes", "0004_auto_20250605_1113"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="category",
+            name="sync_version",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="envelope",
+            name="sync_version",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="category",
+            index=models.Index(
+                fields=["budget", "sync_version"], name="category_sync_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="envelope",
+            index=models.Index(
+                fields=["budget", "sync_version"], name="envelope_sync_idx"
+            ),
+        ),
+    ]
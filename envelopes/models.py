@@ -7,6 +7,10 @@ class CategoryManager(models.Manager):
     def get_queryset(self):
         return super().get_queryset().exclude(deleted=True).order_by("sort_order")
 
+    def include_deleted(self):
+        """Return a queryset that includes deleted categories."""
+        return super().get_queryset()
+
 
 class Category(models.Model):
     id = models.CharField(
@@ -21,6 +25,9 @@ class Category(models.Model):
     sort_order = models.IntegerField(default=99)
     hidden = models.BooleanField(default=False)
     deleted = models.BooleanField(default=False)
+    # Set by database triggers to the budget's version on every write, see
+    # budgets.models.BudgetVersion
+    sync_version = models.PositiveBigIntegerField(default=0, editable=False)
 
     objects = CategoryManager()
 
@@ -29,6 +36,9 @@ class Category(models.Model):
 
     class Meta:
         verbose_name_plural = "categories"
+        indexes = [
+            models.Index(fields=["budget", "sync_version"], name="category_sync_idx")
+        ]
 
     def envelopes(self):
         return Envelope.objects.filter(category=self)
@@ -107,9 +117,17 @@ class Envelope(models.Model):
         blank=True,
         related_name="linked_envelope",
     )
+    # Set by database triggers to the budget's version on every write, see
+    # budgets.models.BudgetVersion
+    sync_version = models.PositiveBigIntegerField(default=0, editable=False)
 
     objects = EnvelopeManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["budget", "sync_version"], name="envelope_sync_idx")
+        ]
+
     def __str__(self):
         return str(self.name)
 
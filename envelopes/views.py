@@ -2,6 +2,7 @@ from django.http import JsonResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 
+from budgets.versions import condition_on_budget_version, session_budget_id
 from .models import Category, Envelope
 
 
@@ -15,6 +16,7 @@ def envelopes(request):
 
 
 @login_required
+@condition_on_budget_version(session_budget_id)
 def category_and_envelopes_json(request):
     categories = Category.objects.filter(
         budget=request.session.get("budget"), hidden=False
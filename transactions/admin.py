@@ -1,6 +1,13 @@
 from django.contrib import admin
 
-from .models import Payee, Transaction, SubTransaction, TransactionMerge
+from .models import (
+    Payee,
+    PayeeNameMapping,
+    PayeeRule,
+    Transaction,
+    SubTransaction,
+    TransactionMerge,
+)
 
 
 @admin.register(Payee)
@@ -9,6 +16,19 @@ class PayeeAdmin(admin.ModelAdmin):
     list_filter = ("budget",)
 
 
+@admin.register(PayeeRule)
+class PayeeRuleAdmin(admin.ModelAdmin):
+    list_display = ("pattern", "replacement", "position", "budget")
+    list_filter = ("budget",)
+
+
+@admin.register(PayeeNameMapping)
+class PayeeNameMappingAdmin(admin.ModelAdmin):
+    list_display = ("raw_name", "clean_name", "source", "budget")
+    list_filter = ("budget", "source")
+    search_fields = ("raw_name", "clean_name")
+
+
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ("id", "date", "payee", "amount", "budget", "account", "deleted")
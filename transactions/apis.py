@@ -1,20 +1,28 @@
 from datetime import date, datetime
-from typing import List, Optional
+from typing import List, Literal, Optional, Union
 import logging
 
 from django.core.exceptions import ValidationError
-from django.db import DatabaseError, transaction
+from django.db import DatabaseError
+from django.http import Http404
 from django.shortcuts import get_object_or_404
-from ninja import File, Router, Schema, UploadedFile
-from ninja.pagination import paginate
+from ninja import File, Query, Router, Schema, UploadedFile
 from ninja.security import django_auth
 
 from accounts.models import Account
+from budgetapp.utils import chunked
 from budgets.models import Budget
+from budgets.versions import condition_on_budget_version, owned_budget_version
 from envelopes.models import Envelope
-from transactions.search import parse_search_query
-from .models import Payee, Transaction, TransactionMerge
-
+from transactions.search import parse_search_query, search_rank
+from .duplicates import DEFAULT_MIN_SCORE, DEFAULT_TOLERANCE_DAYS
+from .facets import transaction_facets
+from .models import Payee, PayeeRule, Transaction, TransactionMerge
+from .ofx import iter_statement_files
+from .pagination import ORDERING, TransactionPagination
+from .payee_clusters import MIN_SIMILARITY
+from .serializers import json_response, transaction_dict, transaction_rows
+from .typeahead import DEFAULT_LIMIT as TYPEAHEAD_LIMIT, suggest
 
 logger = logging.getLogger(__name__)
 router = Router()
@@ -34,6 +42,26 @@ class PayeeUpdateSchema(Schema):
     deleted: bool = False
 
 
+class PayeeClusterSchema(Schema):
+    payees: List[PayeeSchema]
+    suggested_name: str
+    similarity: float
+    transaction_count: int
+
+
+class PayeeRuleSchema(Schema):
+    id: str
+    pattern: str
+    replacement: str
+    position: int
+
+
+class PayeeRuleCreateSchema(Schema):
+    pattern: str
+    replacement: str = ""
+    position: int = 0
+
+
 class EnvelopeSchema(Schema):
     id: str
     name: str
@@ -90,40 +118,84 @@ class BulkDeleteSchema(Schema):
     transaction_ids: List[str]
 
 
+class BulkTransactionResponse(Schema):
+    transactions: List[TransactionSchema]
+    duplicate_import_ids: List[str]
+
+
 class Error(Schema):
     message: str
 
 
+class FacetSchema(Schema):
+    # An envelope or account ID, a YYYY-MM month or a cleared status; None
+    # for transactions without an envelope
+    value: Optional[Union[bool, str]]
+    count: int
+    amount: int
+
+
+class TransactionFacets(Schema):
+    envelopes: List[FacetSchema]
+    accounts: List[FacetSchema]
+    months: List[FacetSchema]
+    cleared: List[FacetSchema]
+
+
+# list_transactions encodes its pages itself for speed, so this schema only
+# documents them; the tests check that the two stay the same shape
+class TransactionPage(Schema):
+    items: List[TransactionSchema]
+    count: Optional[int] = None
+    next_cursor: Optional[str] = None
+    facets: Optional[TransactionFacets] = None
+
+
 @router.get(
     "/transactions/{budget_id}",
-    response=List[TransactionSchema],
+    response=TransactionPage,
     auth=django_auth,
     tags=["Transactions"],
 )
-@paginate
+@condition_on_budget_version()
 def list_transactions(
     request,
     budget_id: str,
     account_id: Optional[str] = None,
     in_inbox: Optional[bool] = None,
     search: Optional[str] = None,
+    sort: Literal["date", "relevance"] = "date",
+    facets: bool = False,
+    pagination: TransactionPagination.Input = Query(...),
 ):
     """
-    List all transactions with pagination.
-
-    Supports filtering by account, inbox status, and search query.
+    List all transactions with pagination, newest first.
+
+    Supports filtering by account, inbox status, and search query. Pass
+    ``cursor`` (empty for the first page, then each page's ``next_cursor``)
+    to page by keyset instead of offset, which skips the count and costs the
+    same however deep the page is. With ``sort=relevance`` the best matches
+    for the free text of ``search`` come first; that order is paged by
+    offset only. With ``facets=true`` the response also has ``facets``:
+    the count and sum of all matches per envelope, account, month and
+    cleared status, from one extra grouped query.
     """
     # Ensure the budget belongs to the authenticated user
     if not Budget.objects.filter(id=budget_id, user=request.user).exists():
-        return []  # Return an empty list if the budget does not belong to the user
+        # Nothing to list if the budget does not belong to the user
+        return {"items": [], "count": 0}
 
     # Start with base query
     transactions_query = Transaction.objects.filter(budget_id=budget_id, deleted=False)
+    ordering = ORDERING
+    rank = None
 
     # Apply search filter if provided
     if search:
         search_filter = parse_search_query(search, budget_id)
         transactions_query = transactions_query.filter(search_filter)
+        if sort == "relevance":
+            rank = search_rank(search)
     # Only apply in_inbox filter if search is not provided or if explicitly requested
     elif in_inbox is not None:
         transactions_query = transactions_query.filter(in_inbox=in_inbox)
@@ -132,10 +204,21 @@ def list_transactions(
     if account_id:
         transactions_query = transactions_query.filter(account_id=account_id)
 
-    # Order by date descending
-    transactions_query = transactions_query.order_by("-date")
+    facet_counts = transaction_facets(transactions_query) if facets else None
 
-    return transactions_query
+    if rank is not None:
+        transactions_query = transactions_query.annotate(search_rank=rank)
+        ordering = ("search_rank", *ORDERING)
+
+    # One joined query for the page, encoded without building model
+    # instances or validating them again; TransactionPagination orders it
+    page = TransactionPagination().paginate_queryset(
+        transaction_rows(transactions_query), pagination, ordering=ordering
+    )
+    page["items"] = [transaction_dict(row) for row in page["items"]]
+    if facet_counts is not None:
+        page["facets"] = facet_counts
+    return json_response(page)
 
 
 @router.post(
@@ -298,35 +381,192 @@ def list_transaction_merges(request, budget_id: str):
     ]
 
 
+class TransferMatchSchema(Schema):
+    outflow: TransactionSchema
+    inflow: TransactionSchema
+    score: float
+    days_apart: int
+
+
+class TransferPairSchema(Schema):
+    outflow_id: str
+    inflow_id: str
+
+
+class TransferLinkRequest(Schema):
+    pairs: List[TransferPairSchema]
+
+
 @router.get(
-    "/transactions/{budget_id}/{transaction_id}",
-    response=TransactionSchema,
+    "/transactions/{budget_id}/transfers/matches",
+    response=List[TransferMatchSchema],
     auth=django_auth,
     tags=["Transactions"],
 )
-def get_transaction(request, budget_id: str, transaction_id: str):
+def list_transfer_matches(
+    request, budget_id: str, window_days: int = 1, inbox_only: bool = True
+):
     """
-    Retrieves a transaction by its ID and budget ID.
+    Suggest pairs of unlinked transactions that look like the two sides of a
+    transfer, best match first.
     """
-    # ensure the transaction belongs to the user
-    transaction = get_object_or_404(Transaction, id=transaction_id, budget_id=budget_id)
-    return TransactionSchema.from_orm(transaction)
+    get_object_or_404(Budget, id=budget_id, user=request.user)
+    window_days = min(max(window_days, 0), 14)
+
+    pairs = Transaction.find_transfer_pairs(budget_id, window_days, inbox_only)
+    transactions = {}
+    ids = [transaction_id for pair in pairs for transaction_id in pair[:2]]
+    for batch in chunked(ids):
+        transactions.update(
+            (transaction.id, transaction)
+            for transaction in Transaction.objects.filter(id__in=batch).select_related(
+                "account", "payee", "envelope"
+            )
+        )
+    return [
+        {
+            "outflow": transactions[outflow_id],
+            "inflow": transactions[inflow_id],
+            "score": score,
+            "days_apart": days_apart,
+        }
+        for outflow_id, inflow_id, score, days_apart in pairs
+    ]
+
+
+@router.post(
+    "/transactions/{budget_id}/transfers/link",
+    response={200: dict, 400: Error},
+    auth=django_auth,
+    tags=["Transactions"],
+)
+def link_transfers(request, budget_id: str, data: TransferLinkRequest):
+    """
+    Link accepted pairs of existing transactions as transfers.
+    """
+    get_object_or_404(Budget, id=budget_id, user=request.user)
+
+    try:
+        linked = Transaction.link_transfers(
+            budget_id, [(pair.outflow_id, pair.inflow_id) for pair in data.pairs]
+        )
+    except ValidationError as e:
+        return 400, {"message": e.messages[0]}
+    return {"linked_count": linked}
+
+
+class DuplicateGroupSchema(Schema):
+    transactions: List[TransactionSchema]
+    score: float
+
+
+class DuplicateMergeRequest(Schema):
+    groups: List[List[str]]
+
+
+class DuplicateMergeResponse(Schema):
+    merges: List[TransactionMergeResponse]
+
+
+@router.get(
+    "/transactions/{budget_id}/duplicates",
+    response=List[DuplicateGroupSchema],
+    auth=django_auth,
+    tags=["Transactions"],
+)
+def list_duplicate_transactions(
+    request,
+    budget_id: str,
+    account_id: Optional[str] = None,
+    tolerance_days: int = DEFAULT_TOLERANCE_DAYS,
+    min_score: float = DEFAULT_MIN_SCORE,
+):
+    """
+    List groups of transactions that look like the same transaction recorded
+    more than once, most likely first.
+    """
+    get_object_or_404(Budget, id=budget_id, user=request.user)
+    tolerance_days = min(max(tolerance_days, 0), 14)
+
+    groups = Transaction.find_duplicates(
+        budget_id, tolerance_days, min_score, account_id=account_id
+    )
+    transactions = {}
+    ids = [transaction_id for group, _ in groups for transaction_id in group]
+    for batch in chunked(ids):
+        transactions.update(
+            (transaction.id, transaction)
+            for transaction in Transaction.objects.filter(id__in=batch).select_related(
+                "account", "payee", "envelope"
+            )
+        )
+    return [
+        {
+            "transactions": [transactions[transaction_id] for transaction_id in group],
+            "score": score,
+        }
+        for group, score in groups
+    ]
 
 
-def get_or_create_payee(name: str, budget: Budget) -> Payee:
+@router.post(
+    "/transactions/{budget_id}/duplicates/merge",
+    response={200: DuplicateMergeResponse, 400: MergeError},
+    auth=django_auth,
+    tags=["Transactions"],
+)
+def merge_duplicate_transactions(
+    request, budget_id: str, merge_data: DuplicateMergeRequest
+):
     """
-    Helper function to get or create a payee, handling the case where
-    multiple payees with the same name exist (including deleted ones).
+    Merge several groups of duplicate transactions at once. Either every
+    group is merged or none is.
     """
+    get_object_or_404(Budget, id=budget_id, user=request.user)
+
     try:
-        # First try to get an active (non-deleted) payee
-        return Payee.objects.get(name=name, budget=budget, deleted=False)
-    except Payee.DoesNotExist:
-        # If no active payee exists, create a new one
-        return Payee.objects.create(name=name, budget=budget, deleted=False)
-    except Payee.MultipleObjectsReturned:
-        # If multiple active payees exist, return the first one
-        return Payee.objects.filter(name=name, budget=budget, deleted=False).first()
+        merged = Transaction.merge_duplicate_groups(budget_id, merge_data.groups)
+    except ValidationError as e:
+        return 400, {"message": e.messages[0]}
+    return {
+        "merges": [
+            {
+                "merged_transaction": merged_transaction,
+                "merge_id": merge.id,
+                "source_transaction_ids": group,
+            }
+            for group, (merged_transaction, merge) in zip(merge_data.groups, merged)
+        ]
+    }
+
+
+class SuggestionSchema(Schema):
+    display: str
+    description: str
+    type: str
+    value: str
+
+
+@router.get(
+    "/transactions/{budget_id}/typeahead",
+    response=List[SuggestionSchema],
+    auth=django_auth,
+    tags=["Transactions"],
+)
+def search_typeahead(
+    request,
+    budget_id: str,
+    q: str = "",
+    limit: int = Query(TYPEAHEAD_LIMIT, ge=1, le=50),
+):
+    """
+    Suggest completions for the section of a search query being typed:
+    envelope, account and payee names, most used first, and filters.
+    """
+    version = owned_budget_version(request.user, budget_id)
+    if version is None:
+        raise Http404
+    return json_response(suggest(budget_id, version, q, limit))
 
 
 @router.post(
@@ -343,7 +583,7 @@ def create_transaction(
     budget = get_object_or_404(Budget, id=budget_id, user=request.user)
 
     account = get_object_or_404(Account, id=transaction.account_id)
-    payee = get_or_create_payee(transaction.payee, budget)
+    payee = Payee.get_or_create_one(budget.id, transaction.payee)
     if transaction.envelope_id:
         envelope = get_object_or_404(Envelope, id=transaction.envelope_id)
     else:
@@ -374,85 +614,104 @@ def create_transaction(
 # post multiple transactions
 @router.post(
     "/transactions/{budget_id}/bulk",
-    response={200: List[TransactionSchema], 404: Error},
+    response={200: BulkTransactionResponse, 404: Error},
     auth=django_auth,
     tags=["Transactions"],
 )
 def create_transactions(
     request, budget_id: str, transactions: List[TransactionPostPatchSchema]
 ):
-    """Create multiple transactions"""
+    """
+    Create multiple transactions.
+
+    Duplicates are resolved with one query, payees are created in bulk and the
+    rows are inserted with one aggregated balance update per account, envelope
+    and category.
+    """
     # Ensure the budget belongs to the user
     budget = get_object_or_404(Budget, id=budget_id, user=request.user)
 
-    # Cache accounts, payees, and envelopes
+    # Cache accounts and envelopes
     account_ids = set(t.account_id for t in transactions)
-    accounts = {a.id: a for a in Account.objects.filter(id__in=account_ids)}
-
-    payee_names = set(t.payee for t in transactions)
-    payees = {
-        p.name: p
-        for p in Payee.objects.filter(
-            name__in=payee_names, budget=budget, deleted=False
-        )
+    accounts = {
+        a.id: a for a in Account.objects.filter(id__in=account_ids, budget=budget)
     }
 
     envelope_ids = set(t.envelope_id for t in transactions if t.envelope_id)
-    envelopes = {e.id: e for e in Envelope.objects.filter(id__in=envelope_ids)}
+    envelopes = {
+        e.id: e for e in Envelope.objects.filter(id__in=envelope_ids, budget=budget)
+    }
 
-    new_transactions = []
-    duplicate_import_ids = []
     for transaction in transactions:
-        account = accounts.get(transaction.account_id)
-        if not account:
+        if transaction.account_id not in accounts:
             return 404, {
                 "message": f"Account with id {transaction.account_id} not found",
             }
+        if transaction.envelope_id and transaction.envelope_id not in envelopes:
+            return 404, {
+                "message": f"Envelope with id {transaction.envelope_id} not found"
+            }
 
-        payee = payees.get(transaction.payee)
-        if not payee:
-            payee = get_or_create_payee(transaction.payee, budget)
-            payees[transaction.payee] = payee
+    # Check which import_ids already exist with one query per batch
+    import_ids = set(t.import_id for t in transactions if t.import_id)
+    existing_import_ids = set()
+    for batch in chunked(import_ids):
+        existing_import_ids.update(
+            Transaction.objects.filter(import_id__in=batch, budget=budget).values_list(
+                "import_id", flat=True
+            )
+        )
 
-        envelope = None
-        if transaction.envelope_id:
-            envelope = envelopes.get(transaction.envelope_id)
-            if not envelope:
-                return 404, {
-                    "message": f"Envelope with id {transaction.envelope_id} not found"
-                }
-
-        # Check if import_id already exists
-        if (
-            transaction.import_id
-            and Transaction.objects.filter(
-                import_id=transaction.import_id, budget=budget
-            ).exists()
-        ):
-            duplicate_import_ids.append(transaction.import_id)
-            continue
-
-        new_transaction = Transaction.objects.create(
-            budget=budget,
-            account=account,
-            envelope=envelope,
-            payee=payee,
-            date=transaction.date,
-            amount=transaction.amount,
-            memo=transaction.memo,
-            cleared=transaction.cleared,
-            reconciled=transaction.reconciled,
-            import_id=transaction.import_id,
+    payees = Payee.get_or_create_many(budget.id, (t.payee for t in transactions))
+
+    new_transactions = []
+    duplicate_import_ids = []
+    for transaction in transactions:
+        if transaction.import_id:
+            if transaction.import_id in existing_import_ids:
+                duplicate_import_ids.append(transaction.import_id)
+                continue
+            # Later rows with the same import_id in this request are duplicates
+            existing_import_ids.add(transaction.import_id)
+
+        new_transactions.append(
+            Transaction(
+                budget=budget,
+                account=accounts[transaction.account_id],
+                envelope=envelopes.get(transaction.envelope_id),
+                payee=payees.get(transaction.payee),
+                date=transaction.date,
+                amount=transaction.amount,
+                memo=transaction.memo,
+                cleared=transaction.cleared,
+                reconciled=transaction.reconciled,
+                import_id=transaction.import_id,
+            )
         )
-        new_transactions.append(new_transaction)
 
-    response_data = {
-        "transactions": [
-            TransactionSchema.from_orm(transaction) for transaction in new_transactions
-        ],
+    Transaction.bulk_create_with_balances(new_transactions)
+
+    # Ninja serializes the instances through the response schema; converting
+    # them here first would validate every row twice.
+    return {
+        "transactions": new_transactions,
         "duplicate_import_ids": duplicate_import_ids,
     }
-    return response_data
+
+
+@router.get(
+    "/transactions/{budget_id}/{transaction_id}",
+    response=TransactionSchema,
+    auth=django_auth,
+    tags=["Transactions"],
+)
+def get_transaction(request, budget_id: str, transaction_id: str):
+    """
+    Retrieves a transaction by its ID and budget ID.
+    """
+    # ensure the transaction belongs to the user
+    transaction = get_object_or_404(Transaction, id=transaction_id, budget_id=budget_id)
+    return TransactionSchema.from_orm(transaction)
 
 
 @router.put(
@@ -479,7 +738,7 @@ def update_transaction(
 
     # Update transaction fields
     trans.account = get_object_or_404(Account, id=transaction_data.account_id)
-    trans.payee = get_or_create_payee(transaction_data.payee, budget)
+    trans.payee = Payee.get_or_create_one(budget.id, transaction_data.payee)
     if transaction_data.envelope_id is not None:
         trans.envelope = get_object_or_404(Envelope, id=transaction_data.envelope_id)
     else:
@@ -536,20 +795,51 @@ def delete_transaction(request, budget_id: str, transaction_id: str):
 
 
 @router.post(
-    "/transactions/{budget_id}/{account_id}/import/ofx/file", tags=["Transactions"]
+    "/transactions/{budget_id}/{account_id}/import/ofx/file",
+    response={200: dict, 400: Error},
+    tags=["Transactions"],
 )
 def import_ofx_file(
     request, budget_id: str, account_id: str, ofx_file: UploadedFile = File(...)
 ):
-    """Import transactions from an OFX file"""
+    """
+    Import transactions from an OFX/QFX file, or from a ZIP archive of them.
+
+    The upload is spooled to a temporary file instead of read into memory and
+    the encoding of each statement is detected. Statements in an archive are
+    imported one after another; a statement that fails to import is reported
+    in its ``files`` entry without affecting the others.
+    """
     # ensure the account belongs to the user
     account = get_object_or_404(Account, id=account_id, budget__user=request.user)
 
-    # Read the OFX file content
-    ofx_data = ofx_file.file.read().decode("utf-8")
-
-    # Call the class method to import transactions
-    return Transaction.import_ofx(budget_id, account.id, ofx_data)
+    summary = {"created_ids": [], "duplicate_ids": [], "files": []}
+    for name, statement in iter_statement_files(ofx_file):
+        file_summary = {
+            "file": name,
+            "created_ids": [],
+            "duplicate_ids": [],
+            "error": None,
+        }
+        try:
+            with statement:
+                file_summary.update(
+                    Transaction.import_ofx(budget_id, account.id, statement)
+                )
+        except Exception as e:
+            logger.exception("Failed to import OFX statement %s", name)
+            file_summary["error"] = str(e) or e.__class__.__name__
+        summary["created_ids"].extend(file_summary["created_ids"])
+        summary["duplicate_ids"].extend(file_summary["duplicate_ids"])
+        summary["files"].append(file_summary)
+
+    if not summary["files"]:
+        return 400, {"message": "No OFX or QFX files found in the upload"}
+    if all(file_summary["error"] for file_summary in summary["files"]):
+        return 400, {
+            "message": f"Failed to import OFX file: {summary['files'][0]['error']}"
+        }
+    return summary
 
 
 @router.post(
@@ -574,6 +864,111 @@ def list_payees(request, budget_id: str):
     return [PayeeSchema.from_orm(payee) for payee in payees]
 
 
+@router.post(
+    "/payees/{budget_id}/clean-names",
+    response={200: dict, 400: Error},
+    auth=django_auth,
+    tags=["Payees"],
+)
+def clean_payee_names(request, budget_id: str):
+    """
+    Clean payee names with the budget's payee rules and the built-in ones.
+
+    Payees that clean to the same name are merged.
+    """
+    user = request.auth
+    get_object_or_404(Budget, id=budget_id, user=user)
+
+    try:
+        result = Payee.clean_names(budget_id)
+    except DatabaseError as e:
+        logger.error("Error cleaning payee names: %s", str(e))
+        return 400, {"message": f"Failed to clean payee names: {str(e)}"}
+
+    cleaned_count = result["renamed"] + result["merged"]
+    return {
+        "count": cleaned_count,
+        "renamed": result["renamed"],
+        "merged": result["merged"],
+        "message": f"Successfully cleaned {cleaned_count} payee names",
+    }
+
+
+@router.get(
+    "/payees/{budget_id}/duplicates",
+    response=List[PayeeClusterSchema],
+    auth=django_auth,
+    tags=["Payees"],
+)
+def list_duplicate_payees(request, budget_id: str, threshold: float = 0.5):
+    """
+    Propose clusters of payees that look like duplicates, largest first.
+
+    Each cluster's payee IDs and suggested name can be sent to the batch
+    merge endpoint as they are.
+    """
+    get_object_or_404(Budget, id=budget_id, user=request.auth)
+    threshold = min(max(threshold, MIN_SIMILARITY), 1.0)
+
+    clusters = Payee.duplicate_clusters(budget_id, threshold)
+    counts = Payee.transaction_counts(
+        budget_id, [payee_id for payees, _ in clusters for payee_id, _ in payees]
+    )
+    results = []
+    for payees, similarity in clusters:
+        # Suggest the name of the payee with the most transactions
+        _, suggested_name = min(
+            payees, key=lambda p: (-counts.get(p[0], 0), p[1].lower())
+        )
+        results.append(
+            {
+                "payees": [{"id": payee_id, "name": name} for payee_id, name in payees],
+                "suggested_name": suggested_name,
+                "similarity": round(similarity, 3),
+                "transaction_count": sum(counts.get(p[0], 0) for p in payees),
+            }
+        )
+    results.sort(key=lambda c: (-len(c["payees"]), c["suggested_name"].lower()))
+    return results
+
+
+@router.get(
+    "/payees/{budget_id}/rules",
+    response=List[PayeeRuleSchema],
+    auth=django_auth,
+    tags=["Payees"],
+)
+def list_payee_rules(request, budget_id: str):
+    """List the budget's payee cleaning rules in the order they run"""
+    budget = get_object_or_404(Budget, id=budget_id, user=request.auth)
+    return list(PayeeRule.objects.filter(budget=budget))
+
+
+@router.post(
+    "/payees/{budget_id}/rules",
+    response={200: PayeeRuleSchema, 400: Error},
+    auth=django_auth,
+    tags=["Payees"],
+)
+def create_payee_rule(request, budget_id: str, rule_in: PayeeRuleCreateSchema):
+    """Add a payee cleaning rule; it runs before the built-in rules"""
+    budget = get_object_or_404(Budget, id=budget_id, user=request.auth)
+    rule = PayeeRule(budget=budget, **rule_in.dict())
+    try:
+        rule.full_clean()
+    except ValidationError as e:
+        return 400, {"message": "; ".join(e.messages)}
+    rule.save()
+    return rule
+
+
+@router.delete("/payees/{budget_id}/rules/{rule_id}", auth=django_auth, tags=["Payees"])
+def delete_payee_rule(request, budget_id: str, rule_id: str):
+    budget = get_object_or_404(Budget, id=budget_id, user=request.auth)
+    get_object_or_404(PayeeRule, id=rule_id, budget=budget).delete()
+    return {"detail": "Payee rule deleted successfully"}
+
+
 @router.get(
     "/payees/{budget_id}/{payee_id}",
     response=PayeeSchema,
@@ -645,47 +1040,6 @@ def delete_unused_payees(request, budget_id: str):
     }
 
 
-@router.post(
-    "/payees/{budget_id}/clean-names",
-    response={200: dict, 400: Error},
-    auth=django_auth,
-    tags=["Payees"],
-)
-def clean_payee_names(request, budget_id: str):
-    """
-    Clean payee names using AI or predefined rules.
-    This is a placeholder - implement your actual cleaning logic.
-    """
-    user = request.auth
-    get_object_or_404(Budget, id=budget_id, user=user)
-
-    try:
-        # Implement your payee name cleaning logic here
-        # For now, return a mock response
-        cleaned_count = 0
-
-        # Example: Get all payees and apply cleaning rules
-        payees = Payee.objects.filter(budget_id=budget_id, deleted=False)
-
-        for payee in payees:
-            # Apply your cleaning logic here
-            # This is just a placeholder
-            original_name = payee.name
-            cleaned_name = payee.name.strip().title()  # Simple example
-
-            if original_name != cleaned_name:
-                payee.name = cleaned_name
-                payee.save()
-                cleaned_count += 1
-
-        return {
-            "count": cleaned_count,
-            "message": f"Successfully cleaned {cleaned_count} payee names",
-        }
-    except Exception as e:
-        return 400, {"message": f"Failed to clean payee names: {str(e)}"}
-
-
 def search_transactions(request, budget_id: str, query: str = ""):
     """
     Search transactions using a query language.
@@ -713,6 +1067,14 @@ class PayeeMergeRequest(Schema):
     new_payee_name: str
 
 
+class PayeeMergePreviewRequest(Schema):
+    payee_ids: List[str]
+
+
+class PayeeMergeBatchRequest(Schema):
+    merges: List[PayeeMergeRequest]
+
+
 class PayeeMergePreview(Schema):
     payee_ids: List[str]
     suggested_name: str
@@ -727,74 +1089,57 @@ class PayeeMergeResponse(Schema):
     deleted_payee_ids: List[str]
 
 
+class PayeeMergeBatchResponse(Schema):
+    merges: List[PayeeMergeResponse]
+    updated_transaction_count: int
+
+
 @router.post(
     "/payees/{budget_id}/merge/preview",
     response={200: PayeeMergePreview, 400: Error},
     auth=django_auth,
     tags=["Payees"],
 )
-def preview_payee_merge(request, budget_id: str):
+def preview_payee_merge(request, budget_id: str, preview: PayeeMergePreviewRequest):
     """Preview what will happen when merging payees"""
     # Ensure the budget belongs to the user
     get_object_or_404(Budget, id=budget_id, user=request.user)
 
-    # Get data from request body
-    try:
-        import json
-
-        data = json.loads(request.body)
-    except (json.JSONDecodeError, AttributeError):
-        return 400, {"message": "Invalid JSON data"}
-
-    payee_ids = data.get("payee_ids", [])
-
+    payee_ids = preview.payee_ids
     if len(payee_ids) < 2:
         return 400, {"message": "At least 2 payees are required for merging"}
 
-    try:
-        # Get the payees to merge
-        payees = list(
-            Payee.objects.filter(id__in=payee_ids, budget_id=budget_id, deleted=False)
-        )
-
-        if len(payees) != len(payee_ids):
-            return 400, {"message": "One or more payees not found"}
-
-        # Get all transactions that will be affected
-        transactions = Transaction.objects.filter(
-            payee__in=payees, budget_id=budget_id, deleted=False
-        ).order_by("-date")
+    payees = list(
+        Payee.objects.filter(id__in=payee_ids, budget_id=budget_id, deleted=False)
+    )
+    if len(payees) != len(set(payee_ids)):
+        return 400, {"message": "One or more payees not found"}
 
-        transaction_count = transactions.count()
+    # One grouped query gives every payee's count and the total
+    counts = Payee.transaction_counts(budget_id, payee_ids)
+    sample_transactions = Transaction.objects.filter(
+        payee__in=payees, budget_id=budget_id
+    ).select_related("account", "payee", "envelope")[:10]
 
-        # Get sample transactions (first 10 for preview)
-        sample_transactions = transactions[:10]
+    # Suggest the name of the payee with the most transactions, or the
+    # first alphabetically if tied
+    suggested = min(payees, key=lambda p: (-counts.get(p.id, 0), p.name.lower()))
 
-        # Suggest a name - use the payee with the most transactions,
-        # or first alphabetically if tied
-        payee_transaction_counts = []
-        for payee in payees:
-            count = Transaction.objects.filter(
-                payee=payee, budget_id=budget_id, deleted=False
-            ).count()
-            payee_transaction_counts.append((payee, count))
-        # Sort by transaction count (desc) then by name (asc)
-        payee_transaction_counts.sort(key=lambda x: (-x[1], x[0].name.lower()))
-        suggested_name = payee_transaction_counts[0][0].name
+    return {
+        "payee_ids": payee_ids,
+        "suggested_name": suggested.name,
+        "payees_to_merge": payees,
+        "transaction_count": sum(counts.values()),
+        "sample_transactions": list(sample_transactions),
+    }
 
-        return {
-            "payee_ids": payee_ids,
-            "suggested_name": suggested_name,
-            "payees_to_merge": [PayeeSchema.from_orm(p) for p in payees],
-            "transaction_count": transaction_count,
-            "sample_transactions": [
-                TransactionSchema.from_orm(t) for t in sample_transactions
-            ],
-        }
 
-    except Exception as e:
-        logger.error("Error previewing payee merge: %s", str(e))
-        return 400, {"message": f"Failed to preview merge: {str(e)}"}
+def merge_response(merged_payee, deleted_payee_ids, updated_transaction_count):
+    return {
+        "merged_payee": merged_payee,
+        "updated_transaction_count": updated_transaction_count,
+        "deleted_payee_ids": deleted_payee_ids,
+    }
 
 
 @router.post(
@@ -806,81 +1151,57 @@ def preview_payee_merge(request, budget_id: str):
 def confirm_payee_merge(request, budget_id: str, merge_data: PayeeMergeRequest):
     """Actually perform the payee merge"""
     # Ensure the budget belongs to the user
-    budget = get_object_or_404(Budget, id=budget_id, user=request.user)
+    get_object_or_404(Budget, id=budget_id, user=request.user)
 
-    if len(merge_data.payee_ids) < 2:
-        return 400, {"message": "At least 2 payees are required for merging"}
+    try:
+        [result] = Payee.merge_groups(
+            budget_id, [(merge_data.payee_ids, merge_data.new_payee_name)]
+        )
+    except ValidationError as e:
+        return 400, {"message": e.messages[0]}
+    except DatabaseError as e:
+        logger.error("Error merging payees: %s", str(e))
+        return 400, {"message": f"Failed to merge payees: {str(e)}"}
 
-    if not merge_data.new_payee_name.strip():
-        return 400, {"message": "New payee name cannot be empty"}
+    logger.info(
+        "Merged %d payees into '%s', updated %d transactions",
+        len(merge_data.payee_ids),
+        result[0].name,
+        result[2],
+    )
+    return merge_response(*result)
 
-    try:
-        with transaction.atomic():
-            # Get the payees to merge
-            payees_to_merge = list(
-                Payee.objects.filter(
-                    id__in=merge_data.payee_ids, budget_id=budget_id, deleted=False
-                )
-            )
 
-            if len(payees_to_merge) != len(merge_data.payee_ids):
-                return 400, {"message": "One or more payees not found"}
-
-            new_name = merge_data.new_payee_name.strip()
-
-            # Check if a payee with the new name already exists
-            existing_payee = Payee.objects.filter(
-                name=new_name, budget=budget, deleted=False
-            ).first()
-
-            if existing_payee and existing_payee.id not in merge_data.payee_ids:
-                # If the target name exists and it's NOT one of the payees being merged
-                return 400, {
-                    "message": f"A payee named '{new_name}' already exists. Please choose a different name."
-                }
-
-            # Determine the target payee
-            if existing_payee and existing_payee.id in merge_data.payee_ids:
-                # Use the existing payee as target (it's one of the ones being merged)
-                target_payee = existing_payee
-                payees_to_delete = [
-                    p for p in payees_to_merge if p.id != target_payee.id
-                ]
-            else:
-                # Use the first payee as target and rename it
-                target_payee = payees_to_merge[0]
-                target_payee.name = new_name
-                target_payee.save()
-                payees_to_delete = payees_to_merge[1:]
-
-            # Get all transactions from payees that will be deleted
-            transactions_to_update = Transaction.objects.filter(
-                payee__in=payees_to_delete, budget_id=budget_id, deleted=False
-            )
+@router.post(
+    "/payees/{budget_id}/merge/batch",
+    response={200: PayeeMergeBatchResponse, 400: Error},
+    auth=django_auth,
+    tags=["Payees"],
+)
+def batch_payee_merge(request, budget_id: str, batch: PayeeMergeBatchRequest):
+    """
+    Perform many payee merges at once.
 
-            # Update transactions to point to the target payee
-            updated_count = transactions_to_update.update(payee=target_payee)
-
-            # Soft delete the old payees
-            deleted_payee_ids = []
-            for payee in payees_to_delete:
-                payee.deleted = True
-                payee.save()
-                deleted_payee_ids.append(str(payee.id))
-
-            logger.info(
-                "Merged %d payees into '%s', updated %d transactions",
-                len(merge_data.payee_ids),
-                target_payee.name,
-                updated_count,
-            )
+    Either every merge is applied or, if any of them is invalid, none is.
+    """
+    get_object_or_404(Budget, id=budget_id, user=request.user)
 
-            return {
-                "merged_payee": PayeeSchema.from_orm(target_payee),
-                "updated_transaction_count": updated_count,
-                "deleted_payee_ids": deleted_payee_ids,
-            }
+    if not batch.merges:
+        return 400, {"message": "No merges given"}
 
-    except Exception as e:
+    try:
+        results = Payee.merge_groups(
+            budget_id,
+            [(merge.payee_ids, merge.new_payee_name) for merge in batch.merges],
+        )
+    except ValidationError as e:
+        return 400, {"message": e.messages[0]}
+    except DatabaseError as e:
         logger.error("Error merging payees: %s", str(e))
         return 400, {"message": f"Failed to merge payees: {str(e)}"}
+
+    logger.info("Merged %d payee groups", len(results))
+    return {
+        "merges": [merge_response(*result) for result in results],
+        "updated_transaction_count": sum(result[2] for result in results),
+    }
@@ -0,0 +1,92 @@
+from collections import defaultdict
+
+from django.db.models import F
+
+
+class BalanceDelta:
+    """
+    Collects balance changes for accounts, envelopes and categories and applies
+    them as atomic ``F()`` updates.
+
+    Every affected row gets exactly one ``UPDATE ... SET balance = balance + n``,
+    so concurrent writers never overwrite each other's changes the way a
+    read-modify-write ``save()`` does.
+    """
+
+    def __init__(self):
+        self.accounts = defaultdict(int)
+        self.envelopes = defaultdict(int)
+        self.categories = defaultdict(int)
+
+    def add(self, amount, account_id=None, envelope_id=None, category_id=None):
+        """
+        Record ``amount`` against the given account, envelope and category.
+
+        Args:
+            amount (int): The change in milliunits (may be negative)
+            account_id (str, optional): The account the amount belongs to
+            envelope_id (str, optional): The envelope the amount belongs to
+            category_id (str, optional): The category of that envelope
+        """
+        if account_id:
+            self.accounts[account_id] += amount
+        if envelope_id:
+            self.envelopes[envelope_id] += amount
+        if category_id:
+            self.categories[category_id] += amount
+
+    def subtract(self, amount, account_id=None, envelope_id=None, category_id=None):
+        """Record the reversal of ``amount``; the opposite of ``add``."""
+        self.add(-amount, account_id, envelope_id, category_id)
+
+    def __bool__(self):
+        return any(
+            delta
+            for deltas in (self.accounts, self.envelopes, self.categories)
+            for delta in deltas.values()
+        )
+
+    def apply(self):
+        """
+        Write the collected deltas to the database, skipping rows whose net
+        change is zero.
+
+        Returns:
+            int: The number of UPDATE statements issued
+        """
+        # pylint: disable=import-outside-toplevel
+        from accounts.models import Account
+        from envelopes.models import Category, Envelope
+
+        statements = 0
+        for model, deltas in (
+            (Account, self.accounts),
+            (Envelope, self.envelopes),
+            (Category, self.categories),
+        ):
+            for pk, delta in deltas.items():
+                if not delta:
+                    continue
+                # The base manager skips the soft-delete filtering of the
+                # default managers; balances of archived rows still move.
+                # pylint: disable=protected-access
+                model._base_manager.filter(pk=pk).update(balance=F("balance") + delta)
+                statements += 1
+        return statements
+
+    def sync(self, *instances):
+        """
+        Mirror the applied deltas onto already-loaded model instances so that
+        callers holding them see the new balances without re-fetching.
+        """
+        # pylint: disable=import-outside-toplevel
+        from accounts.models import Account
+        from envelopes.models import Category, Envelope
+
+        for instance in instances:
+            if isinstance(instance, Account):
+                instance.balance += self.accounts.get(instance.pk, 0)
+            elif isinstance(instance, Envelope):
+                instance.balance += self.envelopes.get(instance.pk, 0)
+            elif isinstance(instance, Category):
+                instance.balance += self.categories.get(instance.pk, 0)
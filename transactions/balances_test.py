@@ -0,0 +1,420 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from accounts.models import Account
+from budgets.models import Budget
+from envelopes.models import Category, Envelope
+from transactions.balances import BalanceDelta
+from transactions.changes import TransactionChange
+from transactions.models import Transaction
+
+
+class BalanceDeltaTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="delta", password="delta")
+        self.budget = Budget.objects.create(user=user, name="Budget")
+        self.account = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.category = Category.objects.create(budget=self.budget, name="Everyday")
+        self.envelope = Envelope.objects.create(
+            budget=self.budget, category=self.category, name="Groceries"
+        )
+
+    def test_one_update_per_row_and_zero_nets_skipped(self):
+        """Test that deltas are summed per row and rows netting to zero are left alone"""
+        deltas = BalanceDelta()
+        deltas.add(-5_000, account_id=self.account.id, envelope_id=self.envelope.id)
+        deltas.add(-2_000, account_id=self.account.id, category_id=self.category.id)
+        deltas.subtract(-5_000, envelope_id=self.envelope.id)
+
+        with self.assertNumQueries(2):
+            self.assertEqual(deltas.apply(), 2)
+
+        self.account.refresh_from_db()
+        self.envelope.refresh_from_db()
+        self.category.refresh_from_db()
+        self.assertEqual(self.account.balance, -7_000)
+        self.assertEqual(self.envelope.balance, 0)
+        self.assertEqual(self.category.balance, -2_000)
+
+    def test_empty_delta(self):
+        """Test that a delta with nothing to apply is falsy and issues no queries"""
+        deltas = BalanceDelta()
+        deltas.add(1_000, account_id=self.account.id)
+        deltas.subtract(1_000, account_id=self.account.id)
+
+        self.assertFalse(deltas)
+        with self.assertNumQueries(0):
+            self.assertEqual(deltas.apply(), 0)
+
+    def test_sync_loaded_instances(self):
+        """Test that sync mirrors the deltas onto instances already in memory"""
+        deltas = BalanceDelta()
+        deltas.add(
+            -3_000,
+            account_id=self.account.id,
+            envelope_id=self.envelope.id,
+            category_id=self.category.id,
+        )
+        deltas.sync(self.account, self.envelope, self.category)
+
+        self.assertEqual(self.account.balance, -3_000)
+        self.assertEqual(self.envelope.balance, -3_000)
+        self.assertEqual(self.category.balance, -3_000)
+
+
+class TransactionBalanceTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username="balances", password="balances"
+        )
+        self.budget = Budget.objects.create(user=user, name="Budget")
+        self.checking = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.savings = Account.objects.create(
+            budget=self.budget, name="Savings", type="savings"
+        )
+        self.everyday = Category.objects.create(budget=self.budget, name="Everyday")
+        self.bills = Category.objects.create(budget=self.budget, name="Bills")
+        self.groceries = Envelope.objects.create(
+            budget=self.budget, category=self.everyday, name="Groceries"
+        )
+        self.power = Envelope.objects.create(
+            budget=self.budget, category=self.bills, name="Power"
+        )
+
+    def transaction(self, amount=-5_000, account=None, envelope=None, **kwargs):
+        return Transaction.objects.create(
+            budget=self.budget,
+            account=account or self.checking,
+            envelope=envelope,
+            amount=amount,
+            date=date(2025, 4, 1),
+            **kwargs,
+        )
+
+    def assertBalances(self, expected):
+        """Assert the stored balances of the given accounts, envelopes and categories"""
+        for obj, balance in expected.items():
+            obj.refresh_from_db()
+            self.assertEqual(obj.balance, balance, obj)
+
+    def test_create(self):
+        """Test that a new transaction moves its account, envelope and category"""
+        trans = self.transaction(envelope=self.groceries)
+
+        self.assertBalances(
+            {
+                self.checking: -5_000,
+                self.groceries: -5_000,
+                self.everyday: -5_000,
+                self.savings: 0,
+                self.power: 0,
+            }
+        )
+        # The loaded account follows the database
+        self.assertEqual(trans.account.balance, -5_000)
+
+    def test_amount_edit(self):
+        """Test that an amount edit applies only the difference"""
+        trans = self.transaction(envelope=self.groceries)
+
+        trans.amount = -8_000
+        trans.save()
+
+        self.assertBalances(
+            {self.checking: -8_000, self.groceries: -8_000, self.everyday: -8_000}
+        )
+
+    def test_unchanged_save_writes_no_balances(self):
+        """Test that saving without an amount or target change leaves balances alone"""
+        trans = self.transaction(envelope=self.groceries)
+        trans = Transaction.objects.get(pk=trans.pk)
+
+        trans.memo = "Weekly shop"
+        # The prior-state read and the row write in its savepoint
+        with self.assertNumQueries(4):
+            trans.save()
+
+        self.assertBalances({self.checking: -5_000, self.groceries: -5_000})
+
+    def test_cleared_toggle(self):
+        """Test that clearing clears pending and leaves every balance as it was"""
+        self.checking.cleared_balance = 12_000
+        self.checking.save()
+        trans = self.transaction(envelope=self.groceries, pending=True)
+
+        trans.cleared = True
+        trans.save()
+        trans.refresh_from_db()
+        self.assertTrue(trans.cleared)
+        self.assertFalse(trans.pending)
+
+        trans.cleared = False
+        trans.save()
+
+        self.assertBalances(
+            {self.checking: -5_000, self.groceries: -5_000, self.everyday: -5_000}
+        )
+        # The cleared balance is the one the bank reports, not a sum of rows
+        self.assertEqual(self.checking.cleared_balance, 12_000)
+
+    def test_account_move(self):
+        """Test that moving to another account moves the amount with it"""
+        trans = self.transaction(envelope=self.groceries)
+
+        trans.account = self.savings
+        trans.amount = -6_000
+        trans.save()
+
+        self.assertBalances(
+            {self.checking: 0, self.savings: -6_000, self.groceries: -6_000}
+        )
+
+    def test_envelope_move(self):
+        """Test that moving to another envelope moves its category balance too"""
+        trans = self.transaction(envelope=self.groceries)
+
+        trans.envelope = self.power
+        trans.save()
+
+        self.assertBalances(
+            {
+                self.checking: -5_000,
+                self.groceries: 0,
+                self.everyday: 0,
+                self.power: -5_000,
+                self.bills: -5_000,
+            }
+        )
+
+        trans.envelope = None
+        trans.save()
+
+        self.assertBalances({self.checking: -5_000, self.power: 0, self.bills: 0})
+
+    def test_soft_delete_and_restore(self):
+        """Test that a soft delete reverses the balances and a restore puts them back"""
+        self.transaction(amount=-1_000, envelope=self.groceries)
+        trans = self.transaction(envelope=self.groceries)
+
+        trans.soft_delete()
+
+        self.assertBalances(
+            {self.checking: -1_000, self.groceries: -1_000, self.everyday: -1_000}
+        )
+        self.assertEqual(trans.account.balance, -1_000)
+
+        # Edits to a deleted transaction don't count towards any balance
+        trans = Transaction.objects.include_deleted().get(pk=trans.pk)
+        trans.amount = -9_000
+        trans.save()
+        self.assertBalances({self.checking: -1_000, self.groceries: -1_000})
+
+        trans.deleted = False
+        trans.save()
+
+        self.assertBalances(
+            {self.checking: -10_000, self.groceries: -10_000, self.everyday: -10_000}
+        )
+
+    def test_hard_delete(self):
+        """Test that deleting the row reverses its balances"""
+        trans = self.transaction(envelope=self.groceries)
+
+        trans.delete()
+
+        self.assertFalse(Transaction.objects.include_deleted().exists())
+        self.assertBalances({self.checking: 0, self.groceries: 0, self.everyday: 0})
+
+    def test_hard_delete_after_soft_delete(self):
+        """Test that deleting a soft-deleted row doesn't reverse its balances twice"""
+        self.transaction(amount=-1_000, envelope=self.groceries)
+        trans = self.transaction(envelope=self.groceries)
+        trans.soft_delete()
+
+        trans.delete()
+
+        self.assertBalances(
+            {self.checking: -1_000, self.groceries: -1_000, self.everyday: -1_000}
+        )
+
+    def test_change_deltas(self):
+        """Test the deltas a change records against its prior state"""
+        trans = self.transaction(envelope=self.groceries)
+        trans.account = self.savings
+        trans.envelope = self.power
+        trans.amount = -7_000
+
+        change = TransactionChange.load(trans)
+        deltas = BalanceDelta()
+        change.add_balance_deltas(deltas)
+
+        self.assertEqual(
+            dict(deltas.accounts), {self.checking.id: 5_000, self.savings.id: -7_000}
+        )
+        self.assertEqual(
+            dict(deltas.envelopes), {self.groceries.id: 5_000, self.power.id: -7_000}
+        )
+        self.assertEqual(
+            dict(deltas.categories), {self.everyday.id: 5_000, self.bills.id: -7_000}
+        )
+
+
+class CreditCardBalanceTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="cards", password="cards")
+        self.budget = Budget.objects.create(user=user, name="Budget")
+        self.checking = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.card = Account.objects.create(
+            budget=self.budget, name="Visa", type="credit_card"
+        )
+        self.other_card = Account.objects.create(
+            budget=self.budget, name="Amex", type="credit_card"
+        )
+        # Debt accounts get their payment envelopes from the Account receiver
+        self.payment = Envelope.objects.get(linked_account=self.card)
+        self.other_payment = Envelope.objects.get(linked_account=self.other_card)
+        self.debt = self.payment.category
+        everyday = Category.objects.create(budget=self.budget, name="Everyday")
+        self.groceries = Envelope.objects.create(
+            budget=self.budget, category=everyday, name="Groceries"
+        )
+        self.dining = Envelope.objects.create(
+            budget=self.budget, category=everyday, name="Dining"
+        )
+
+    def purchase(self, amount=-5_000, account=None, envelope=None):
+        return Transaction.objects.create(
+            budget=self.budget,
+            account=account or self.card,
+            envelope=envelope or self.groceries,
+            amount=amount,
+            date=date(2025, 5, 1),
+        )
+
+    def assertBalances(self, expected):
+        """Assert the stored balances of the given accounts, envelopes and categories"""
+        for obj, balance in expected.items():
+            obj.refresh_from_db()
+            self.assertEqual(obj.balance, balance, obj)
+
+    def test_new_purchase_funds_payment_envelope(self):
+        """Test that card spending moves money into the card's payment envelope"""
+        self.purchase()
+
+        self.assertBalances(
+            {
+                self.card: -5_000,
+                self.groceries: -5_000,
+                self.payment: 5_000,
+                self.debt: 5_000,
+                self.other_payment: 0,
+            }
+        )
+
+    def test_payments_and_unassigned_spending_are_skipped(self):
+        """Test that payments, spending without an envelope and payment envelope spending fund nothing"""
+        self.purchase(amount=20_000)
+        Transaction.objects.create(
+            budget=self.budget,
+            account=self.card,
+            amount=-3_000,
+            date=date(2025, 5, 1),
+        )
+        self.purchase(envelope=self.payment, amount=-1_000)
+
+        self.assertBalances({self.card: 16_000, self.payment: -1_000})
+
+    def test_envelope_change_keeps_funding(self):
+        """Test that recategorising a purchase leaves the payment envelope alone"""
+        trans = self.purchase()
+
+        trans.envelope = self.dining
+        trans.save()
+
+        self.assertBalances(
+            {self.groceries: 0, self.dining: -5_000, self.payment: 5_000}
+        )
+
+    def test_amount_change_adjusts_funding(self):
+        """Test that the payment envelope follows the purchase amount"""
+        trans = self.purchase()
+
+        trans.amount = -8_000
+        trans.save()
+        self.assertBalances(
+            {self.card: -8_000, self.groceries: -8_000, self.payment: 8_000}
+        )
+
+        trans.amount = -2_000
+        trans.envelope = self.dining
+        trans.save()
+        self.assertBalances(
+            {self.groceries: 0, self.dining: -2_000, self.payment: 2_000}
+        )
+
+    def test_move_off_the_card(self):
+        """Test that moving a purchase to a non-debt account takes the funding back"""
+        trans = self.purchase()
+
+        trans.account = self.checking
+        trans.save()
+
+        self.assertBalances(
+            {
+                self.card: 0,
+                self.checking: -5_000,
+                self.groceries: -5_000,
+                self.payment: 0,
+                self.debt: 0,
+            }
+        )
+
+    def test_move_onto_the_card(self):
+        """Test that moving a purchase onto a card funds its payment envelope"""
+        trans = self.purchase(account=self.checking)
+        self.assertBalances({self.payment: 0})
+
+        trans.account = self.card
+        trans.save()
+
+        self.assertBalances({self.checking: 0, self.card: -5_000, self.payment: 5_000})
+
+    def test_move_between_cards(self):
+        """Test that moving a purchase between cards moves the funding with it"""
+        trans = self.purchase()
+
+        trans.account = self.other_card
+        trans.amount = -6_000
+        trans.save()
+
+        self.assertBalances(
+            {self.payment: 0, self.other_payment: 6_000, self.debt: 6_000}
+        )
+
+    def test_delete_takes_funding_back(self):
+        """Test that soft and hard deletes both reverse the payment envelope funding"""
+        soft = self.purchase()
+        hard = self.purchase(amount=-2_000)
+        self.assertBalances({self.payment: 7_000})
+
+        soft.soft_delete()
+        self.assertBalances(
+            {self.card: -2_000, self.groceries: -2_000, self.payment: 2_000}
+        )
+
+        soft.deleted = False
+        soft.save()
+        self.assertBalances({self.card: -7_000, self.payment: 7_000})
+
+        hard.delete()
+        self.assertBalances(
+            {self.card: -5_000, self.groceries: -5_000, self.payment: 5_000}
+        )
@@ -0,0 +1,164 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from accounts.models import Account
+from budgets.models import Budget
+from envelopes.models import Category, Envelope
+from transactions.models import Payee, Transaction
+
+
+class BulkCreateApiTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="bulk", password="bulk"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.checking = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.card = Account.objects.create(
+            budget=self.budget, name="Visa", type="credit_card"
+        )
+        self.payment = Envelope.objects.get(linked_account=self.card)
+        self.everyday = Category.objects.create(budget=self.budget, name="Everyday")
+        self.groceries = Envelope.objects.create(
+            budget=self.budget, category=self.everyday, name="Groceries"
+        )
+        self.dining = Envelope.objects.create(
+            budget=self.budget, category=self.everyday, name="Dining"
+        )
+        self.url = f"/api/transactions/{self.budget.id}/bulk"
+        self.client.force_login(self.user)
+
+    def post(self, transactions):
+        return self.client.post(self.url, transactions, content_type="application/json")
+
+    def test_mixed_batch(self):
+        """Test a batch across accounts and envelopes, with duplicate import IDs"""
+        Transaction.objects.create(
+            budget=self.budget,
+            account=self.checking,
+            amount=-1_000,
+            date=date(2025, 6, 1),
+            import_id="existing",
+        )
+        Payee.get_or_create_one(self.budget.id, "Corner Shop")
+
+        response = self.post(
+            [
+                {
+                    "account_id": self.checking.id,
+                    "envelope_id": self.groceries.id,
+                    "payee": "Corner Shop",
+                    "date": "2025-06-02",
+                    "amount": -4_000,
+                    "import_id": "a",
+                },
+                {
+                    "account_id": self.card.id,
+                    "envelope_id": self.dining.id,
+                    "payee": "Noodle Bar",
+                    "date": "2025-06-03",
+                    "amount": -2_500,
+                    "cleared": True,
+                },
+                {
+                    "account_id": self.card.id,
+                    "envelope_id": self.groceries.id,
+                    "payee": "Corner Shop",
+                    "date": "2025-06-04",
+                    "amount": -1_500,
+                },
+                {
+                    "account_id": self.checking.id,
+                    "payee": "Employer",
+                    "date": "2025-06-05",
+                    "amount": 100_000,
+                    "memo": "Pay",
+                },
+                # Already imported, and repeated within the batch
+                {
+                    "account_id": self.checking.id,
+                    "date": "2025-06-01",
+                    "amount": -1_000,
+                    "import_id": "existing",
+                },
+                {
+                    "account_id": self.checking.id,
+                    "date": "2025-06-02",
+                    "amount": -4_000,
+                    "import_id": "a",
+                },
+            ]
+        )
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual(body["duplicate_import_ids"], ["existing", "a"])
+        created = body["transactions"]
+        self.assertEqual(
+            [
+                (t["account"]["id"], t["envelope"] and t["envelope"]["id"], t["amount"])
+                for t in created
+            ],
+            [
+                (self.checking.id, self.groceries.id, -4_000),
+                (self.card.id, self.dining.id, -2_500),
+                (self.card.id, self.groceries.id, -1_500),
+                (self.checking.id, None, 100_000),
+            ],
+        )
+        self.assertEqual(
+            [t["payee"]["name"] for t in created],
+            ["Corner Shop", "Noodle Bar", "Corner Shop", "Employer"],
+        )
+        self.assertEqual(created[0]["import_id"], "a")
+        self.assertTrue(created[1]["cleared"])
+
+        rows = Transaction.objects.filter(id__in=[t["id"] for t in created])
+        self.assertEqual(rows.count(), 4)
+        self.assertEqual(Transaction.objects.filter(budget=self.budget).count(), 5)
+        self.assertEqual(
+            Payee.objects.filter(budget=self.budget, name="Corner Shop").count(), 1
+        )
+        self.assertEqual(Transaction.objects.get(id=created[3]["id"]).memo, "Pay")
+
+        for obj, balance in {
+            self.checking: -1_000 - 4_000 + 100_000,
+            self.card: -4_000,
+            self.groceries: -5_500,
+            self.dining: -2_500,
+            self.everyday: -8_000,
+            # Card spending funds its payment envelope
+            self.payment: 4_000,
+        }.items():
+            obj.refresh_from_db()
+            self.assertEqual(obj.balance, balance, obj)
+
+    def test_unknown_envelope(self):
+        """Test that an envelope from another budget fails the whole batch"""
+        other = Budget.objects.create(user=self.user, name="Other")
+        envelope = Envelope.objects.create(budget=other, name="Elsewhere")
+
+        response = self.post(
+            [
+                {
+                    "account_id": self.checking.id,
+                    "date": "2025-06-02",
+                    "amount": -4_000,
+                },
+                {
+                    "account_id": self.checking.id,
+                    "envelope_id": envelope.id,
+                    "date": "2025-06-02",
+                    "amount": -4_000,
+                },
+            ]
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Transaction.objects.exists())
+        self.checking.refresh_from_db()
+        self.assertEqual(self.checking.balance, 0)
@@ -0,0 +1,295 @@
+import logging
+
+from budgetapp.utils import chunked
+
+logger = logging.getLogger(__name__)
+
+
+class TransactionChange:
+    """
+    The before/after picture of a single ``Transaction.save()``.
+
+    The prior state is read once, as a ``values()`` projection that already
+    carries the account type and the account's linked debt envelope, and is then
+    shared by the balance logic in ``Transaction.save()`` and the credit card
+    debt envelope receiver. Neither has to re-fetch the row or lazily load its
+    account and envelopes.
+    """
+
+    PRIOR_FIELDS = (
+        "account_id",
+        "account__type",
+        "account__linked_envelope__id",
+        "account__linked_envelope__category_id",
+        "envelope_id",
+        "envelope__category_id",
+        "amount",
+        "deleted",
+        "import_id",
+        "sfin_id",
+    )
+
+    def __init__(self, instance, prior=None):
+        self.instance = instance
+        self.prior = prior
+
+    @classmethod
+    def load(cls, instance, is_new=False):
+        """
+        Build the change context for ``instance``, reading its stored row
+        unless it is being inserted.
+        """
+        prior = None
+        if not is_new:
+            prior = (
+                type(instance)
+                .objects.include_deleted()
+                .filter(pk=instance.pk)
+                .values(*cls.PRIOR_FIELDS)
+                .first()
+            )
+        return cls(instance, prior)
+
+    @classmethod
+    def load_many(cls, instances):
+        """
+        Build the change contexts for many saved instances with one prior-state
+        query per batch instead of one per instance.
+
+        Returns:
+            list: A TransactionChange per instance, in the same order
+        """
+        if not instances:
+            return []
+        model = type(instances[0])
+        priors = {}
+        for batch in chunked([instance.pk for instance in instances]):
+            for row in (
+                model.objects.include_deleted()
+                .filter(pk__in=batch)
+                .values("id", *cls.PRIOR_FIELDS)
+            ):
+                priors[row.pop("id")] = row
+        return [cls(instance, priors.get(instance.pk)) for instance in instances]
+
+    @property
+    def is_new(self):
+        return self.prior is None
+
+    def import_ids_changed(self):
+        """Whether the duplicate import check has anything new to look at."""
+        return (
+            self.is_new
+            or self.prior["import_id"] != self.instance.import_id
+            or self.prior["sfin_id"] != self.instance.sfin_id
+        )
+
+    def envelope_category_id(self):
+        """Category of the new envelope, taken from the prior state when unchanged."""
+        instance = self.instance
+        if not instance.envelope_id:
+            return None
+        if not self.is_new and self.prior["envelope_id"] == instance.envelope_id:
+            return self.prior["envelope__category_id"]
+        return instance.envelope.category_id
+
+    def add_balance_deltas(self, deltas):
+        """
+        Record the account, envelope and category changes of this save.
+
+        Args:
+            deltas (BalanceDelta): The collector to add the changes to
+        """
+        # Deleted rows no longer count towards any balance, so a restore adds
+        # the amount back and edits to a deleted row change nothing
+        if not self.is_new and not self.prior["deleted"]:
+            deltas.subtract(
+                self.prior["amount"],
+                account_id=self.prior["account_id"],
+                envelope_id=self.prior["envelope_id"],
+                category_id=self.prior["envelope__category_id"],
+            )
+        if not self.instance.deleted:
+            deltas.add(
+                self.instance.amount,
+                account_id=self.instance.account_id,
+                envelope_id=self.instance.envelope_id,
+                category_id=self.envelope_category_id(),
+            )
+
+    def add_removal_deltas(self, deltas):
+        """
+        Record taking the stored row out of every balance when it is deleted
+        for good, credit card payment envelope funding included.
+
+        Args:
+            deltas (BalanceDelta): The collector to add the changes to
+        """
+        # Soft-deleted rows were already taken out when they were deleted
+        if self.is_new or self.prior["deleted"]:
+            return
+        deltas.subtract(
+            self.prior["amount"],
+            account_id=self.prior["account_id"],
+            envelope_id=self.prior["envelope_id"],
+            category_id=self.prior["envelope__category_id"],
+        )
+        self._add_deletion_debt_deltas(deltas)
+
+    def _new_account_debt_envelope(self):
+        """
+        Return ``(account_type, debt_envelope_id, debt_category_id)`` for the
+        account the transaction now belongs to.
+        """
+        # pylint: disable=import-outside-toplevel
+        from envelopes.models import Envelope
+
+        instance = self.instance
+        if not self.is_new and self.prior["account_id"] == instance.account_id:
+            return (
+                self.prior["account__type"],
+                self.prior["account__linked_envelope__id"],
+                self.prior["account__linked_envelope__category_id"],
+            )
+
+        account_type = instance.account.type
+        debt_envelope = (
+            Envelope.objects.include_all()
+            .filter(linked_account_id=instance.account_id)
+            .values("id", "category_id")
+            .first()
+            or {}
+        )
+        return account_type, debt_envelope.get("id"), debt_envelope.get("category_id")
+
+    def add_debt_deltas(self, deltas):
+        """
+        Record the credit card payment envelope changes of this save.
+
+        Spending on a debt account moves money into the account's linked
+        payment envelope so the debt is covered. The spending envelope itself
+        is already reduced by the transaction's own balance change.
+
+        Args:
+            deltas (BalanceDelta): The collector to add the changes to
+        """
+        # pylint: disable=import-outside-toplevel
+        from accounts.models import DEBT_ACCOUNT_TYPES
+
+        instance = self.instance
+        prior = self.prior
+
+        # Changes to transactions that were already deleted are ignored, until
+        # a restore brings the spending back like a new purchase
+        restored = prior is not None and prior["deleted"] and not instance.deleted
+        if prior is not None and prior["deleted"] and not restored:
+            return
+
+        # Only process credit card transactions with an envelope
+        if instance.envelope_id or not self.is_new:
+            account_type, debt_envelope_id, debt_category_id = (
+                self._new_account_debt_envelope()
+            )
+        else:
+            account_type = debt_envelope_id = debt_category_id = None
+
+        is_debt_account = account_type in DEBT_ACCOUNT_TYPES
+
+        if self.is_new or restored:
+            if is_debt_account:
+                self._add_purchase_debt_deltas(
+                    deltas, debt_envelope_id, debt_category_id
+                )
+            return
+
+        # Moving between accounts takes the funding back from the old card and
+        # funds the new one, as a delete there and a purchase here would
+        if prior["account_id"] != instance.account_id:
+            self._add_deletion_debt_deltas(deltas)
+            if is_debt_account and not instance.deleted:
+                self._add_purchase_debt_deltas(
+                    deltas, debt_envelope_id, debt_category_id
+                )
+            return
+
+        if is_debt_account and instance.amount <= 0 and debt_envelope_id:
+            self._add_edit_debt_deltas(deltas, debt_envelope_id, debt_category_id)
+
+        if instance.deleted:
+            self._add_deletion_debt_deltas(deltas)
+
+    def _add_purchase_debt_deltas(self, deltas, debt_envelope_id, debt_category_id):
+        instance = self.instance
+        # Skip payments TO the credit card (positive amounts) and spending
+        # assigned to the debt payment envelope itself
+        if (
+            not instance.envelope_id
+            or instance.amount > 0
+            or not debt_envelope_id
+            or instance.envelope_id == debt_envelope_id
+        ):
+            return
+        deltas.add(
+            abs(instance.amount),
+            envelope_id=debt_envelope_id,
+            category_id=debt_category_id,
+        )
+        logger.info(
+            "Added $%.2f to debt envelope for credit card transaction",
+            abs(instance.amount) / 1000,
+        )
+
+    def _add_edit_debt_deltas(self, deltas, debt_envelope_id, debt_category_id):
+        old_envelope_id = self.prior["envelope_id"]
+        new_envelope_id = self.instance.envelope_id
+        old_amount = abs(self.prior["amount"])
+        new_amount = abs(self.instance.amount)
+
+        # Envelope changed but amount stayed the same: the debt hasn't changed,
+        # Transaction.save() moves the money between the spending envelopes
+        if old_amount == new_amount:
+            return
+
+        # Only adjust the debt envelope for spending envelopes
+        old_was_spending = old_envelope_id and old_envelope_id != debt_envelope_id
+        new_is_spending = new_envelope_id and new_envelope_id != debt_envelope_id
+
+        if old_was_spending and new_is_spending:
+            adjustment = new_amount - old_amount
+        elif old_was_spending:
+            adjustment = -old_amount
+        elif new_is_spending:
+            adjustment = new_amount
+        else:
+            return
+
+        deltas.add(
+            adjustment, envelope_id=debt_envelope_id, category_id=debt_category_id
+        )
+        logger.info(
+            "Adjusted debt envelope by $%.2f due to amount change",
+            adjustment / 1000,
+        )
+
+    def _add_deletion_debt_deltas(self, deltas):
+        # pylint: disable=import-outside-toplevel
+        from accounts.models import DEBT_ACCOUNT_TYPES
+
+        prior = self.prior
+        debt_envelope_id = prior["account__linked_envelope__id"]
+        if (
+            prior["account__type"] in DEBT_ACCOUNT_TYPES
+            and prior["envelope_id"]
+            and prior["amount"] < 0  # Negative amount (spending)
+            and debt_envelope_id
+            and prior["envelope_id"] != debt_envelope_id
+        ):
+            deltas.subtract(
+                abs(prior["amount"]),
+                envelope_id=debt_envelope_id,
+                category_id=prior["account__linked_envelope__category_id"],
+            )
+            logger.info(
+                "Reduced debt envelope by $%.2f for deleted transaction",
+                abs(prior["amount"]) / 1000,
+            )
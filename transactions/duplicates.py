@@ -0,0 +1,159 @@
+"""
+Find transactions that were recorded more than once, typically by different
+sources: an OFX upload, a SimpleFIN pull and a manual entry of the same
+purchase, or a pending SimpleFIN transaction and the posted one that
+replaced it.
+
+Candidates are blocked by (account, amount) and each block is sorted by
+date, so a transaction is only compared with its neighbours inside the date
+tolerance. The work grows with the number of transactions rather than the
+number of pairs, which keeps the detector cheap enough to run after every
+import.
+"""
+
+from collections import defaultdict
+
+from .payee_clusters import comparison_form, trigrams
+
+# Days apart two records of the same transaction can be
+DEFAULT_TOLERANCE_DAYS = 3
+
+# Pairs scoring below this are not reported
+DEFAULT_MIN_SCORE = 0.5
+
+# Weights of the signals that make up a pair's score; they add up to 1
+SOURCE_WEIGHT = 0.4
+PENDING_WEIGHT = 0.2
+DATE_WEIGHT = 0.2
+PAYEE_WEIGHT = 0.2
+
+
+def source(row):
+    """Where a transaction came from: ``ofx``, ``simplefin`` or ``manual``."""
+    if row["sfin_id"]:
+        return "simplefin"
+    if row["import_id"]:
+        return "ofx"
+    return "manual"
+
+
+def score_pair(first, second, tolerance_days, grams):
+    """
+    Score how likely two transactions of one block are the same one.
+
+    Two records from the same feed with their own IDs are distinct
+    transactions, unless one of them is a pending record the other replaced.
+    Records assigned to different envelopes are never reported, since they
+    could not be merged.
+
+    Args:
+        first (dict): A transaction row
+        second (dict): Another row with the same account and amount
+        tolerance_days (int): The most days apart the rows can be
+        grams (dict): Payee trigrams keyed by row ID
+
+    Returns:
+        float: From 0 to 1, or None if the rows cannot be duplicates
+    """
+    if (
+        first["envelope_id"]
+        and second["envelope_id"]
+        and first["envelope_id"] != second["envelope_id"]
+    ):
+        return None
+    pending_changed = first["pending"] != second["pending"]
+    same_source = source(first) == source(second)
+    if same_source and source(first) != "manual" and not pending_changed:
+        return None
+
+    score = 0.0
+    if not same_source:
+        score += SOURCE_WEIGHT
+    elif pending_changed:
+        score += SOURCE_WEIGHT / 2
+    if pending_changed:
+        score += PENDING_WEIGHT
+    elif first["cleared"] != second["cleared"]:
+        score += PENDING_WEIGHT / 2
+    days_apart = abs((second["date"] - first["date"]).days)
+    score += DATE_WEIGHT * (1 - days_apart / (tolerance_days + 1))
+    first_grams, second_grams = grams[first["id"]], grams[second["id"]]
+    if first_grams and second_grams:
+        shared = len(first_grams & second_grams)
+        score += PAYEE_WEIGHT * shared / len(first_grams | second_grams)
+    return round(score, 4)
+
+
+def find_duplicate_groups(
+    rows, tolerance_days=DEFAULT_TOLERANCE_DAYS, min_score=DEFAULT_MIN_SCORE
+):
+    """
+    Group transactions that are probably records of the same transaction.
+
+    Args:
+        rows (list): Dicts with ``id``, ``account_id``, ``envelope_id``,
+            ``amount``, ``date``, ``pending``, ``cleared``, ``import_id``,
+            ``sfin_id`` and ``payee_name``
+        tolerance_days (int): The most days apart two records can be
+        min_score (float): The lowest pair score that joins a group
+
+    Returns:
+        list: ``(transaction_ids, score)`` pairs, where ``score`` is the
+            lowest pair score that joined the group, best first
+    """
+    blocks = defaultdict(list)
+    for row in rows:
+        blocks[(row["account_id"], row["amount"])].append(row)
+
+    forms = {}
+    grams = {}
+    for row in rows:
+        name = row["payee_name"] or ""
+        if name not in forms:
+            forms[name] = trigrams(comparison_form(name)) if name else frozenset()
+        grams[row["id"]] = forms[name]
+
+    parent = {}
+    scores = {}
+    envelopes = {}
+
+    def find(row_id):
+        while parent[row_id] != row_id:
+            parent[row_id] = parent[parent[row_id]]
+            row_id = parent[row_id]
+        return row_id
+
+    for block in blocks.values():
+        if len(block) < 2:
+            continue
+        block.sort(key=lambda row: (row["date"], row["id"]))
+        for index, first in enumerate(block):
+            for second_index in range(index + 1, len(block)):
+                second = block[second_index]
+                if (second["date"] - first["date"]).days > tolerance_days:
+                    break
+                score = score_pair(first, second, tolerance_days, grams)
+                if score is None or score < min_score:
+                    continue
+                for row in (first, second):
+                    if row["id"] not in parent:
+                        parent[row["id"]] = row["id"]
+                        scores[row["id"]] = 1.0
+                        envelopes[row["id"]] = row["envelope_id"]
+                root, other_root = find(first["id"]), find(second["id"])
+                if root != other_root:
+                    envelope, other_envelope = envelopes[root], envelopes[other_root]
+                    if envelope and other_envelope and envelope != other_envelope:
+                        # Joining would make a group that cannot be merged
+                        continue
+                    parent[other_root] = root
+                    envelopes[root] = envelope or other_envelope
+                scores[root] = min(scores[root], scores[other_root], score)
+
+    groups = defaultdict(list)
+    for row_id in parent:
+        groups[find(row_id)].append(row_id)
+    return sorted(
+        ((sorted(ids), scores[root]) for root, ids in groups.items() if len(ids) > 1),
+        key=lambda group: (-group[1], group[0]),
+    )
@@ -0,0 +1,113 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from accounts.models import Account
+from budgets.models import Budget
+from transactions.models import Payee, Transaction, TransactionMerge
+
+
+class DuplicateDetectionTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="duplicates", password="duplicates"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.checking = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.savings = Account.objects.create(
+            budget=self.budget, name="Savings", type="savings"
+        )
+
+    def transaction(self, amount, day, payee="", account=None, **fields):
+        return Transaction.objects.create(
+            budget=self.budget,
+            account=account or self.checking,
+            payee=Payee.get_or_create_one(self.budget.id, payee),
+            amount=amount,
+            date=date(2025, 4, day),
+            **fields,
+        )
+
+    def test_cross_source_records_are_grouped(self):
+        """Test that one purchase seen by OFX, SimpleFIN and by hand is one group"""
+        manual = self.transaction(-12_340, 3, "Maverik")
+        ofx = self.transaction(-12_340, 4, "MAVERIK #61", import_id="FIT-1")
+        sfin = self.transaction(-12_340, 4, "Maverik 61", sfin_id="TRN-1")
+
+        with self.assertNumQueries(1):
+            groups = Transaction.find_duplicates(self.budget.id)
+
+        self.assertEqual(len(groups), 1)
+        self.assertEqual(groups[0][0], sorted([manual.id, ofx.id, sfin.id]))
+        self.assertGreaterEqual(groups[0][1], 0.5)
+
+    def test_pending_and_posted_records_are_grouped(self):
+        """Test that a pending SimpleFIN record pairs with the posted one"""
+        pending = self.transaction(-5_000, 1, "Cafe", sfin_id="P-1", pending=True)
+        posted = self.transaction(-5_000, 2, "Cafe", sfin_id="T-1", cleared=True)
+
+        groups = Transaction.find_duplicates(self.budget.id)
+
+        self.assertEqual(groups, [(sorted([pending.id, posted.id]), 0.75)])
+
+    def test_distinct_transactions_are_left_alone(self):
+        """Test that records that are clearly separate are not reported"""
+        # Two purchases of the same amount in one bank feed
+        self.transaction(-4_500, 1, "Cafe", import_id="FIT-1")
+        self.transaction(-4_500, 1, "Cafe", import_id="FIT-2")
+        # Two coffees entered by hand
+        self.transaction(-3_000, 2, "Cafe")
+        self.transaction(-3_000, 2, "Cafe")
+        # Same amount in another account, or too far apart
+        self.transaction(-7_000, 5, "Grocer")
+        self.transaction(-7_000, 5, "Grocer", account=self.savings, import_id="A")
+        self.transaction(-7_000, 20, "Grocer", import_id="B")
+
+        self.assertEqual(Transaction.find_duplicates(self.budget.id), [])
+
+    def test_merge_groups(self):
+        """Test that groups are merged together and balances count them once"""
+        first = [
+            self.transaction(-1_000, 1, "Cafe").id,
+            self.transaction(-1_000, 1, "Cafe", import_id="FIT-1").id,
+        ]
+        second = [
+            self.transaction(-2_000, 2, "Grocer").id,
+            self.transaction(-2_000, 2, "Grocer", sfin_id="TRN-2").id,
+        ]
+        self.client.force_login(self.user)
+
+        response = self.client.get(f"/api/transactions/{self.budget.id}/duplicates")
+        self.assertEqual(response.status_code, 200)
+        groups = [[t["id"] for t in g["transactions"]] for g in response.json()]
+        self.assertCountEqual(groups, [sorted(first), sorted(second)])
+
+        response = self.client.post(
+            f"/api/transactions/{self.budget.id}/duplicates/merge",
+            {"groups": groups},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["merges"]), 2)
+        self.checking.refresh_from_db()
+        self.assertEqual(self.checking.balance, -3_000)
+        self.assertEqual(Transaction.find_duplicates(self.budget.id), [])
+
+    def test_merge_groups_is_all_or_nothing(self):
+        """Test that one bad group stops every merge"""
+        good = [
+            self.transaction(-1_000, 1, "Cafe").id,
+            self.transaction(-1_000, 1, "Cafe", import_id="FIT-1").id,
+        ]
+        bad = [self.transaction(-2_000, 2).id, self.transaction(-3_000, 2).id]
+
+        with self.assertRaises(ValidationError):
+            Transaction.merge_duplicate_groups(self.budget.id, [good, bad])
+        with self.assertRaises(ValidationError):
+            Transaction.merge_duplicate_groups(self.budget.id, [good, good])
+        self.assertEqual(Transaction.objects.filter(budget=self.budget).count(), 4)
+        self.assertFalse(TransactionMerge.objects.exists())
@@ -0,0 +1,70 @@
+"""
+Facet counts and sums for a filtered transaction list.
+
+Each facet would naturally be its own ``GROUP BY`` over the search, so a
+result split by envelope, account, month and cleared status would repeat
+the search four times. Instead the rows are grouped once by all four keys
+together and each facet is rolled up from those groups in Python. A budget
+has far fewer (envelope, account, month, cleared) combinations than
+transactions, so the rollup is cheap next to the single scan.
+"""
+
+from collections import defaultdict
+
+from django.db.models import Count, Sum
+from django.db.models.functions import Substr
+
+# Facets in the order they are returned, and the key each is grouped by
+FACETS = (
+    ("envelopes", "envelope_id"),
+    ("accounts", "account_id"),
+    ("months", "month"),
+    ("cleared", "cleared"),
+)
+
+
+def transaction_facets(queryset):
+    """
+    Count and sum the transactions of a filtered queryset per envelope,
+    account, month and cleared status, with one grouped query.
+
+    Args:
+        queryset (QuerySet): Transactions, already filtered
+
+    Returns:
+        dict: For each facet a list of ``{"value", "count", "amount"}``,
+        largest count, then largest amount, first (months newest first).
+        ``amount`` is in milliunits and ``value`` is an ID, a ``YYYY-MM``
+        month or a boolean; transactions without an envelope are counted
+        under a ``value`` of None.
+    """
+    groups = (
+        queryset.order_by()
+        # Dates are stored as ISO text, so the month is a plain SUBSTR
+        .annotate(month=Substr("date", 1, 7))
+        .values("envelope_id", "account_id", "month", "cleared")
+        .annotate(count=Count("id"), amount=Sum("amount"))
+    )
+
+    totals = {name: defaultdict(lambda: [0, 0]) for name, _ in FACETS}
+    for group in groups:
+        for name, key in FACETS:
+            total = totals[name][group[key]]
+            total[0] += group["count"]
+            total[1] += group["amount"]
+
+    facets = {}
+    for name, _ in FACETS:
+        if name == "months":
+            # Newest month first, like the list itself
+            items = sorted(totals[name].items(), reverse=True)
+        else:
+            items = sorted(
+                totals[name].items(),
+                key=lambda item: (-item[1][0], -abs(item[1][1])),
+            )
+        facets[name] = [
+            {"value": value, "count": count, "amount": amount}
+            for value, (count, amount) in items
+        ]
+    return facets
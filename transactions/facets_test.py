@@ -0,0 +1,103 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from accounts.models import Account
+from budgets.models import Budget
+from envelopes.models import Category, Envelope
+from transactions.apis import TransactionPage
+from transactions.facets import transaction_facets
+from transactions.models import Transaction
+
+
+class TransactionFacetTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="facets", password="facets"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.checking = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.card = Account.objects.create(
+            budget=self.budget, name="Card", type="credit_card"
+        )
+        category = Category.objects.create(budget=self.budget, name="Everyday")
+        self.food = Envelope.objects.create(
+            budget=self.budget, category=category, name="Food"
+        )
+        for account, envelope, amount, day, cleared in (
+            (self.checking, self.food, -10_000, date(2025, 4, 30), True),
+            (self.checking, self.food, -5_000, date(2025, 5, 2), False),
+            (self.card, self.food, -2_000, date(2025, 5, 9), True),
+            (self.card, None, 50_000, date(2025, 5, 15), True),
+        ):
+            Transaction.objects.create(
+                budget=self.budget,
+                account=account,
+                envelope=envelope,
+                amount=amount,
+                date=day,
+                cleared=cleared,
+            )
+        self.url = f"/api/transactions/{self.budget.id}"
+        self.client.force_login(self.user)
+
+    def test_facets_in_one_query(self):
+        """Test that every facet is rolled up from a single grouped query"""
+        queryset = Transaction.objects.filter(budget=self.budget)
+        with self.assertNumQueries(1):
+            facets = transaction_facets(queryset)
+
+        self.assertEqual(
+            facets["envelopes"],
+            [
+                {"value": self.food.id, "count": 3, "amount": -17_000},
+                {"value": None, "count": 1, "amount": 50_000},
+            ],
+        )
+        self.assertEqual(
+            facets["accounts"],
+            [
+                {"value": self.card.id, "count": 2, "amount": 48_000},
+                {"value": self.checking.id, "count": 2, "amount": -15_000},
+            ],
+        )
+        self.assertEqual(
+            facets["months"],
+            [
+                {"value": "2025-05", "count": 3, "amount": 43_000},
+                {"value": "2025-04", "count": 1, "amount": -10_000},
+            ],
+        )
+        self.assertEqual(
+            facets["cleared"],
+            [
+                {"value": True, "count": 3, "amount": 38_000},
+                {"value": False, "count": 1, "amount": -5_000},
+            ],
+        )
+
+    def test_search_api_facets(self):
+        """Test that facets cover every match, not only the page"""
+        response = self.client.get(
+            self.url, {"search": "is:cleared", "facets": "true", "limit": 1}
+        )
+        page = response.json()
+        self.assertEqual(len(page["items"]), 1)
+        self.assertEqual(page["count"], 3)
+        self.assertEqual(
+            page["facets"]["months"],
+            [
+                {"value": "2025-05", "count": 2, "amount": 48_000},
+                {"value": "2025-04", "count": 1, "amount": -10_000},
+            ],
+        )
+        self.assertEqual(
+            TransactionPage.model_validate(page).model_dump(
+                mode="json", exclude_unset=True
+            ),
+            page,
+        )
+        self.assertNotIn("facets", self.client.get(self.url).json())
@@ -0,0 +1,63 @@
+import json
+import random
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+from budgetapp.benchmarks import benchmark_database, measure, seed_budget
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark POST /api/transactions/{budget_id}/bulk against a throwaway "
+        "database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000)
+        parser.add_argument("--payees", type=int, default=300)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self._run(options["rows"], options["payees"])
+
+    def _run(self, row_count, payee_count):
+        budget, accounts, envelopes = seed_budget()
+        client = Client()
+        client.force_login(budget.user)
+
+        rng = random.Random(42)
+        start = date.today() - timedelta(days=365)
+        rows = [
+            {
+                "account_id": rng.choice(accounts).id,
+                "payee": f"Payee {rng.randint(0, payee_count)}",
+                "envelope_id": rng.choice(envelopes).id,
+                "date": str(start + timedelta(days=rng.randint(0, 365))),
+                "amount": rng.randint(-250_000, 50_000),
+                "memo": f"Bulk row {index}",
+                "cleared": True,
+                "import_id": f"bulk-{index}",
+            }
+            for index in range(row_count)
+        ]
+        # Repost a slice so the duplicate detection is exercised as well
+        rows += rows[: row_count // 10]
+
+        # Warm up URL resolution and schema building outside the measurement
+        client.get(f"/api/transactions/{budget.id}")
+
+        with measure() as result:
+            response = client.post(
+                f"/api/transactions/{budget.id}/bulk",
+                data=json.dumps(rows),
+                content_type="application/json",
+            )
+
+        self.stdout.write(f"status: {response.status_code}")
+        self.stdout.write(
+            f"rows: {len(rows)} in {result['seconds']:.3f}s, "
+            f"{result['queries']} queries, "
+            f"{len(rows) / result['seconds']:.0f} rows/sec"
+        )
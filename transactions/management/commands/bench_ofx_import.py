@@ -0,0 +1,95 @@
+import io
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from ofxparse import OfxParser
+
+from budgetapp.benchmarks import benchmark_database, measure, seed_budget
+
+OFX_HEADER = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+SECURITY:NONE
+ENCODING:USASCII
+CHARSET:1252
+COMPRESSION:NONE
+OLDFILEUID:NONE
+NEWFILEUID:NONE
+
+<OFX>
+<SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS>
+<DTSERVER>20240101000000<LANGUAGE>ENG</SONRS></SIGNONMSGSRSV1>
+<BANKMSGSRSV1><STMTTRNRS><TRNUID>1
+<STATUS><CODE>0<SEVERITY>INFO</STATUS>
+<STMTRS><CURDEF>USD
+<BANKACCTFROM><BANKID>000000000<ACCTID>123456789<ACCTTYPE>CHECKING</BANKACCTFROM>
+<BANKTRANLIST><DTSTART>20000101<DTEND>20240101
+"""
+
+OFX_FOOTER = """</BANKTRANLIST>
+<LEDGERBAL><BALAMT>0.00<DTASOF>20240101</LEDGERBAL>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+
+def build_ofx(line_count, payee_count, seed=42):
+    """Build a checking account statement with ``line_count`` lines."""
+    rng = random.Random(seed)
+    start = date.today() - timedelta(days=365 * 5)
+    lines = []
+    for index in range(line_count):
+        amount = rng.randint(-250_000, 50_000) / 100
+        posted = start + timedelta(days=rng.randint(0, 365 * 5))
+        lines.append(
+            "<STMTTRN>"
+            f"<TRNTYPE>{'CREDIT' if amount > 0 else 'DEBIT'}"
+            f"<DTPOSTED>{posted:%Y%m%d}"
+            f"<TRNAMT>{amount:.2f}"
+            f"<FITID>FIT{index:08d}"
+            f"<NAME>PAYEE {rng.randint(0, payee_count)}"
+            f"<MEMO>Statement line {index}"
+            "</STMTTRN>"
+        )
+    return OFX_HEADER + "\n".join(lines) + "\n" + OFX_FOOTER
+
+
+class Command(BaseCommand):
+    help = "Benchmark Transaction.import_ofx against a throwaway database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lines", type=int, default=10000)
+        parser.add_argument("--payees", type=int, default=500)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self._run(options["lines"], options["payees"])
+
+    def _run(self, line_count, payee_count):
+        # pylint: disable=import-outside-toplevel
+        from transactions.models import Transaction
+
+        budget, accounts, _ = seed_budget(envelope_count=1)
+        ofx_data = build_ofx(line_count, payee_count)
+
+        start = time.perf_counter()
+        OfxParser.parse(io.StringIO(ofx_data))
+        self.stdout.write(
+            f"parse only: {line_count} lines in {time.perf_counter() - start:.3f}s"
+        )
+
+        with measure() as first:
+            result = Transaction.import_ofx(budget.id, accounts[0].id, ofx_data)
+        self.stdout.write(
+            f"import: {line_count} lines in {first['seconds']:.3f}s, "
+            f"{first['queries']} queries, created {len(result['created_ids'])}"
+        )
+
+        with measure() as again:
+            result = Transaction.import_ofx(budget.id, accounts[0].id, ofx_data)
+        self.stdout.write(
+            f"re-import: {line_count} lines in {again['seconds']:.3f}s, "
+            f"{again['queries']} queries, duplicates {len(result['duplicate_ids'])}"
+        )
@@ -0,0 +1,77 @@
+import json
+
+from django.core.management.base import BaseCommand
+from ninja.responses import NinjaJSONEncoder
+
+from budgetapp.benchmarks import (
+    benchmark_database,
+    measure,
+    random_transactions,
+    seed_budget,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark serializing pages of the transaction list through the "
+        "response schema and through the values() projection, against a "
+        "throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--transactions", type=int, default=20_000)
+        parser.add_argument("--page-size", type=int, default=1_000)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self._run(options["transactions"], options["page_size"], options["rounds"])
+
+    def _run(self, count, page_size, rounds):
+        # pylint: disable=import-outside-toplevel
+        from transactions.apis import TransactionSchema
+        from transactions.models import Payee, Transaction
+        from transactions.serializers import dumps, transaction_dict, transaction_rows
+
+        budget, accounts, envelopes = seed_budget()
+        payees = Payee.objects.bulk_create(
+            [Payee(budget=budget, name=f"Payee {index}") for index in range(200)]
+        )
+        Transaction.objects.bulk_create(
+            random_transactions(budget, accounts, envelopes, count, payees=payees),
+            batch_size=500,
+        )
+        queryset = Transaction.objects.filter(budget=budget).order_by("-date", "-id")
+
+        def schema_page(transactions=queryset):
+            items = [
+                TransactionSchema.from_orm(transaction).model_dump()
+                for transaction in transactions[:page_size]
+            ]
+            return json.dumps({"items": items}, cls=NinjaJSONEncoder).encode()
+
+        def joined_schema_page():
+            return schema_page(queryset.select_related("account", "payee", "envelope"))
+
+        def projected_page():
+            items = [
+                transaction_dict(row) for row in transaction_rows(queryset)[:page_size]
+            ]
+            return dumps({"items": items})
+
+        self.stdout.write(f"{page_size}-row pages, best of {rounds}")
+        for label, build in (
+            ("schema from instances", schema_page),
+            ("schema, select_related", joined_schema_page),
+            ("values() projection", projected_page),
+        ):
+            best = None
+            for _ in range(rounds):
+                with measure() as result:
+                    build()
+                if best is None or result["seconds"] < best["seconds"]:
+                    best = result
+            self.stdout.write(
+                f"{label}: {best['seconds'] * 1000:.1f}ms, {best['queries']} queries, "
+                f"{best['seconds'] / page_size * 1_000_000:.1f}us per row"
+            )
@@ -0,0 +1,120 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from budgetapp.benchmarks import (
+    benchmark_database,
+    measure,
+    random_transactions,
+    seed_budget,
+)
+
+MEMO_WORDS = (
+    "lunch dinner groceries coffee rent refund gift fuel parking tickets "
+    "books pharmacy hardware subscription insurance tuition haircut repair "
+    "flowers birthday vacation hotel taxi train laundry pet supplies"
+).split()
+
+# (label, free text, structured filters)
+QUERIES = (
+    ("common term", "market", ""),
+    ("frequent term", "tuition", ""),
+    ("rare term", "warranty", ""),
+    ("two terms", "coffee lunch", ""),
+    ("quoted phrase", '"pet supplies"', ""),
+    ("text and filters", "grocer", "is:cleared, amount:<-50"),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark transaction search with icontains lookups and with the "
+        "full-text index, against a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--transactions", type=int, default=250_000)
+        parser.add_argument("--page-size", type=int, default=50)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self._run(options["transactions"], options["page_size"], options["rounds"])
+
+    def _run(self, count, page_size, rounds):
+        # pylint: disable=import-outside-toplevel
+        from transactions import search
+        from transactions.models import Payee, Transaction
+
+        budget, accounts, envelopes = seed_budget()
+        names = ["Farmers Market", "Corner Coffee", "Grocery Outlet", "City Transit"]
+        payees = Payee.objects.bulk_create(
+            [Payee(budget=budget, name=name) for name in names]
+            + [Payee(budget=budget, name=f"Payee {index}") for index in range(400)]
+        )
+        rng = random.Random(7)
+        transactions = random_transactions(
+            budget, accounts, envelopes, count, payees=payees
+        )
+        for index, transaction in enumerate(transactions):
+            transaction.memo = " ".join(rng.sample(MEMO_WORDS, 2))
+            if index % 5_000 == 0:
+                transaction.memo += " warranty claim"
+        Transaction.objects.bulk_create(transactions, batch_size=500)
+
+        def icontains_filter(terms):
+            text_filter = Q()
+            for term in terms:
+                text_filter &= (
+                    Q(payee__name__icontains=term)
+                    | Q(envelope__name__icontains=term)
+                    | Q(memo__icontains=term)
+                    | Q(import_payee_name__icontains=term)
+                )
+            return text_filter
+
+        self.stdout.write(
+            f"{count} transactions, count + first {page_size}-row page, "
+            f"best of {rounds}"
+        )
+        for label, text, filters in QUERIES:
+            terms = []
+            search._extract_search_terms(text, terms)
+            structured = Transaction.objects.filter(
+                search.parse_search_query(filters, budget.id)
+            ).order_by("-date", "-id")
+            timings = {}
+            for strategy, queryset in (
+                ("icontains", structured.filter(icontains_filter(terms))),
+                (
+                    "fts5",
+                    structured.filter(search._build_text_search_filter(terms)),
+                ),
+            ):
+                best = None
+                for _ in range(rounds):
+                    with measure() as result:
+                        matches = queryset.count()
+                        list(queryset.values_list("id", flat=True)[:page_size])
+                    if best is None or result["seconds"] < best["seconds"]:
+                        best = result
+                timings[strategy] = best["seconds"]
+                self.stdout.write(
+                    f"{label} ({text}), {strategy}: "
+                    f"{best['seconds'] * 1000:.1f}ms, {matches} matches"
+                )
+            self.stdout.write(
+                f"{label}: {timings['icontains'] / timings['fts5']:.1f}x faster"
+            )
+
+        ranked = (
+            Transaction.objects.filter(search.parse_search_query("coffee", budget.id))
+            .annotate(rank=search.search_rank("coffee"))
+            .order_by("rank", "-date", "-id")
+        )
+        with measure() as result:
+            list(ranked.values_list("id", flat=True)[:page_size])
+        self.stdout.write(
+            f"relevance-ordered page (coffee): {result['seconds'] * 1000:.1f}ms"
+        )
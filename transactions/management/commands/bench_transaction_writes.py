@@ -0,0 +1,83 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db.models import Sum
+
+from budgetapp.benchmarks import (
+    benchmark_database,
+    measure,
+    random_transactions,
+    seed_budget,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark single-transaction edits (queries per edit and edits/sec) "
+        "against a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--transactions", type=int, default=500)
+        parser.add_argument("--edits", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self._run(options["transactions"], options["edits"])
+
+    def _run(self, transaction_count, edit_count):
+        # pylint: disable=import-outside-toplevel
+        from accounts.models import Account
+        from envelopes.models import Envelope
+        from transactions.models import Transaction
+
+        budget, accounts, envelopes = seed_budget()
+        transactions = []
+        with measure() as created:
+            for trans in random_transactions(
+                budget, accounts, envelopes, transaction_count
+            ):
+                trans.save(force_insert=True)
+                transactions.append(trans)
+
+        rng = random.Random(7)
+        with measure() as edited:
+            for index in range(edit_count):
+                trans = rng.choice(transactions)
+                if index % 3 == 0:
+                    trans.envelope = rng.choice(envelopes)
+                elif index % 3 == 1:
+                    trans.amount = rng.randint(-250_000, 50_000)
+                else:
+                    trans.memo = f"Edited {index}"
+                trans.save()
+
+        self.stdout.write(
+            f"creates: {transaction_count} in {created['seconds']:.3f}s, "
+            f"{created['queries'] / transaction_count:.2f} queries/create, "
+            f"{transaction_count / created['seconds']:.0f} creates/sec"
+        )
+        self.stdout.write(
+            f"edits:   {edit_count} in {edited['seconds']:.3f}s, "
+            f"{edited['queries'] / edit_count:.2f} queries/edit, "
+            f"{edit_count / edited['seconds']:.0f} edits/sec"
+        )
+
+        drift = 0
+        for account in Account.objects.filter(budget=budget):
+            expected = (
+                Transaction.objects.filter(account=account).aggregate(
+                    total=Sum("amount")
+                )["total"]
+                or 0
+            )
+            drift += abs(account.balance - expected)
+        for envelope in Envelope.objects.filter(budget=budget, linked_account=None):
+            expected = (
+                Transaction.objects.filter(envelope=envelope).aggregate(
+                    total=Sum("amount")
+                )["total"]
+                or 0
+            )
+            drift += abs(envelope.balance - expected)
+        self.stdout.write(f"balance drift vs. ledger: {drift}")
@@ -0,0 +1,87 @@
+from datetime import date, timedelta
+import random
+
+from django.core.management.base import BaseCommand
+
+from budgetapp.benchmarks import benchmark_database, measure, seed_budget
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark finding and linking transfers across a large inbox against "
+        "a throwaway database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--inbox", type=int, default=2_000)
+        parser.add_argument("--history", type=int, default=20_000)
+        parser.add_argument("--transfer-share", type=float, default=0.3)
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            self._run(options["inbox"], options["history"], options["transfer_share"])
+
+    def _run(self, inbox_size, history_size, transfer_share):
+        # pylint: disable=import-outside-toplevel
+        from transactions.models import Transaction
+
+        budget, accounts, _ = seed_budget(envelope_count=1)
+        rng = random.Random(42)
+        start = date.today() - timedelta(days=90)
+
+        def transaction(account, amount, day, in_inbox):
+            return Transaction(
+                budget=budget,
+                account=account,
+                amount=amount,
+                date=start + timedelta(days=day),
+                in_inbox=in_inbox,
+            )
+
+        inbox = []
+        while len(inbox) < inbox_size:
+            day = rng.randint(0, 90)
+            amount = rng.randint(1, 5_000) * 100
+            if rng.random() < transfer_share:
+                source, target = rng.sample(accounts, 2)
+                inbox.append(transaction(source, -amount, day, True))
+                inbox.append(transaction(target, amount, day + rng.randint(0, 1), True))
+            else:
+                inbox.append(transaction(rng.choice(accounts), -amount, day, True))
+        history = [
+            transaction(
+                rng.choice(accounts),
+                rng.choice([-1, 1]) * rng.randint(1, 5_000) * 100,
+                rng.randint(-365 * 3, 90),
+                False,
+            )
+            for _ in range(history_size)
+        ]
+        Transaction.objects.bulk_create(inbox + history, batch_size=500)
+        inbox = list(Transaction.objects.filter(budget=budget, in_inbox=True))
+
+        with measure() as naive:
+            naive_matches = sum(
+                1
+                for item in inbox
+                if Transaction.find_potential_transfer_matches(item).exists()
+            )
+        with measure() as batch:
+            pairs = Transaction.find_transfer_pairs(budget.id)
+        with measure() as link:
+            Transaction.link_transfers(budget.id, [pair[:2] for pair in pairs])
+
+        self.stdout.write(
+            f"inbox: {len(inbox)}, history: {history_size}, "
+            f"pairs found: {len(pairs)}"
+        )
+        self.stdout.write(
+            f"per-transaction queries: {naive['seconds']:.3f}s, "
+            f"{naive['queries']} queries ({naive_matches} with a candidate)"
+        )
+        self.stdout.write(
+            f"batch matcher: {batch['seconds']:.3f}s, {batch['queries']} queries"
+        )
+        self.stdout.write(
+            f"bulk link: {link['seconds']:.3f}s, {link['queries']} queries"
+        )
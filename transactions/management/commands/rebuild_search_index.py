@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from transactions.search import SEARCH_INDEX, SEARCH_ROWS
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild the full-text index used by transaction search from the "
+        "transactions. Triggers keep it up to date; this repairs an index "
+        "that was changed by hand or restored from elsewhere."
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_ROWS}")
+            cursor.execute(f"""
+                INSERT INTO {SEARCH_ROWS}
+                    (transaction_id, payee, memo, envelope, import_payee)
+                SELECT t.id, p.name, t.memo, e.name, t.import_payee_name
+                FROM transactions_transaction t
+                LEFT JOIN transactions_payee p ON p.id = t.payee_id
+                LEFT JOIN envelopes_envelope e ON e.id = t.envelope_id
+                """)
+            indexed = cursor.rowcount
+            cursor.execute(
+                f"INSERT INTO {SEARCH_INDEX} ({SEARCH_INDEX}) VALUES ('rebuild')"
+            )
+            cursor.execute(
+                f"INSERT INTO {SEARCH_INDEX} ({SEARCH_INDEX}) VALUES ('optimize')"
+            )
+        self.stdout.write(f"Indexed {indexed} transactions")
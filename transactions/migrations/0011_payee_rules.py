@@ -0,0 +1,78 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:12
+
+import budgetapp.utils
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("budgets", "0001_initial"),
+        ("transactions", "0010_payee_unique_budget_payee_name"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PayeeRule",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=budgetapp.utils.generate_uuid_hex,
+                        editable=False,
+                        max_length=32,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("pattern", models.CharField(max_length=255)),
+                (
+                    "replacement",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("position", models.IntegerField(default=0)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "budget",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="budgets.budget"
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["position", "created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="PayeeNameMapping",
+            fields=[
+                (
+                    "id",
+                    models.CharField(
+                        default=budgetapp.utils.generate_uuid_hex,
+                        editable=False,
+                        max_length=32,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                ("raw_name", models.CharField(max_length=255)),
+                ("clean_name", models.CharField(max_length=255)),
+                (
+                    "budget",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE, to="budgets.budget"
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("budget", "raw_name"),
+                        name="unique_budget_payee_raw_name",
+                    )
+                ],
+            },
+        ),
+    ]
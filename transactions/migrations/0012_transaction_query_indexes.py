@@ -0,0 +1,77 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0010_plaiditem"),
+        ("budgets", "0001_initial"),
+        ("envelopes", "0004_auto_20250605_1113"),
+        ("transactions", "0011_payee_rules"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="transaction_cleared_aea048_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="transaction_in_inbo_06faaf_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="transaction_pending_e8fc5d_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="transaction",
+            name="transaction_deleted_1f8979_idx",
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("deleted", False)),
+                fields=["budget", "date", "id"],
+                name="transaction_budget_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("deleted", False)),
+                fields=["account", "date", "id"],
+                name="transaction_account_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("deleted", False), ("in_inbox", True)),
+                fields=["budget", "date", "id"],
+                name="transaction_inbox_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                condition=models.Q(("deleted", False)),
+                fields=["budget", "amount", "date"],
+                name="transaction_budget_amount_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["budget", "account", "import_id"],
+                name="transaction_import_id_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["budget", "account", "sfin_id"], name="transaction_sfin_id_idx"
+            ),
+        ),
+    ]
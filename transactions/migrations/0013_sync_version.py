@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-18 04:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0012_transaction_query_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payee",
+            name="sync_version",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="transaction",
+            name="sync_version",
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name="payee",
+            index=models.Index(
+                fields=["budget", "sync_version"], name="payee_sync_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="transaction",
+            index=models.Index(
+                fields=["budget", "sync_version"], name="transaction_sync_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,99 @@
+from django.db import migrations
+
+# Full-text index over the text a transaction is searched by. Its rowid is
+# the transaction's rowid. The trigram tokenizer matches any substring of
+# three or more characters, case-insensitively, like the icontains lookups
+# it replaces. It needs SQLite 3.34 or later.
+CREATE_INDEX = """
+    CREATE VIRTUAL TABLE transactions_transaction_fts USING fts5(
+        payee, memo, envelope, import_payee, tokenize = 'trigram'
+    )
+"""
+
+INDEXED_ROW = """
+    INSERT INTO transactions_transaction_fts (rowid, payee, memo, envelope, import_payee)
+    SELECT {row}.rowid,
+        (SELECT name FROM transactions_payee WHERE id = {row}.payee_id),
+        {row}.memo,
+        (SELECT name FROM envelopes_envelope WHERE id = {row}.envelope_id),
+        {row}.import_payee_name
+"""
+
+BACKFILL = """
+    INSERT INTO transactions_transaction_fts (rowid, payee, memo, envelope, import_payee)
+    SELECT t.rowid, p.name, t.memo, e.name, t.import_payee_name
+    FROM transactions_transaction t
+    LEFT JOIN transactions_payee p ON p.id = t.payee_id
+    LEFT JOIN envelopes_envelope e ON e.id = t.envelope_id
+"""
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER transactions_transaction_fts_insert
+    AFTER INSERT ON transactions_transaction FOR EACH ROW BEGIN
+        {INDEXED_ROW.format(row="NEW")};
+    END
+    """,
+    # Most updates, including the sync_version stamp, leave the text alone
+    f"""
+    CREATE TRIGGER transactions_transaction_fts_update
+    AFTER UPDATE OF payee_id, memo, envelope_id, import_payee_name
+    ON transactions_transaction FOR EACH ROW
+    WHEN OLD.payee_id IS NOT NEW.payee_id
+        OR OLD.memo IS NOT NEW.memo
+        OR OLD.envelope_id IS NOT NEW.envelope_id
+        OR OLD.import_payee_name IS NOT NEW.import_payee_name
+    BEGIN
+        DELETE FROM transactions_transaction_fts WHERE rowid = OLD.rowid;
+        {INDEXED_ROW.format(row="NEW")};
+    END
+    """,
+    """
+    CREATE TRIGGER transactions_transaction_fts_delete
+    AFTER DELETE ON transactions_transaction FOR EACH ROW BEGIN
+        DELETE FROM transactions_transaction_fts WHERE rowid = OLD.rowid;
+    END
+    """,
+    """
+    CREATE TRIGGER transactions_payee_fts_rename
+    AFTER UPDATE OF name ON transactions_payee FOR EACH ROW
+    WHEN OLD.name IS NOT NEW.name
+    BEGIN
+        UPDATE transactions_transaction_fts SET payee = NEW.name
+        WHERE rowid IN (
+            SELECT rowid FROM transactions_transaction WHERE payee_id = NEW.id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER envelopes_envelope_fts_rename
+    AFTER UPDATE OF name ON envelopes_envelope FOR EACH ROW
+    WHEN OLD.name IS NOT NEW.name
+    BEGIN
+        UPDATE transactions_transaction_fts SET envelope = NEW.name
+        WHERE rowid IN (
+            SELECT rowid FROM transactions_transaction WHERE envelope_id = NEW.id
+        );
+    END
+    """,
+]
+
+DROP = [
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_insert",
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_update",
+    "DROP TRIGGER IF EXISTS transactions_transaction_fts_delete",
+    "DROP TRIGGER IF EXISTS transactions_payee_fts_rename",
+    "DROP TRIGGER IF EXISTS envelopes_envelope_fts_rename",
+    "DROP TABLE IF EXISTS transactions_transaction_fts",
+]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("envelopes", "0005_sync_version"),
+        ("transactions", "0013_sync_version"),
+    ]
+
+    operations = [
+        migrations.RunSQL([CREATE_INDEX, BACKFILL, *TRIGGERS], reverse_sql=DROP),
+    ]
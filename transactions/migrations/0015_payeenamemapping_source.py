@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-18 05:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0014_transaction_search_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payeenamemapping",
+            name="source",
+            field=models.CharField(
+                choices=[("rule", "Payee rules"), ("merge", "Payee merge")],
+                default="rule",
+                max_length=8,
+            ),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations, models
+
+
+def name_key(name):
+    # Frozen copy of transactions.payees.payee_name_key as of this migration
+    return " ".join(name.split()).casefold() if name else ""
+
+
+def fill_name_keys(apps, schema_editor):
+    """Key the stored payees the way new names are matched."""
+    Payee = apps.get_model("transactions", "Payee")
+    payees = list(Payee.objects.only("id", "name"))
+    for payee in payees:
+        payee.name_key = name_key(payee.name)
+    Payee.objects.bulk_update(payees, ["name_key"], batch_size=300)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("transactions", "0015_payeenamemapping_source"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="payee",
+            name="name_key",
+            field=models.CharField(editable=False, max_length=255, null=True),
+        ),
+        migrations.RunPython(fill_name_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="payee",
+            index=models.Index(
+                fields=["budget", "name_key"], name="payee_name_key_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,157 @@
+from importlib import import_module
+
+from django.db import migrations
+
+# The index from 0014 was keyed on the implicit rowid of
+# transactions_transaction, which a VACUUM may renumber. The indexed text now
+# lives in a table of its own, with an INTEGER PRIMARY KEY that VACUUM keeps
+# and the transaction's real primary key beside it, and the full-text index
+# reads it as external content keyed on that stable rowid.
+initial_index = import_module("transactions.migrations.0014_transaction_search_index")
+
+CREATE_ROWS = """
+    CREATE TABLE transactions_transaction_search (
+        id INTEGER PRIMARY KEY,
+        transaction_id VARCHAR(32) NOT NULL UNIQUE,
+        payee TEXT,
+        memo TEXT,
+        envelope TEXT,
+        import_payee TEXT
+    )
+"""
+
+CREATE_INDEX = """
+    CREATE VIRTUAL TABLE transactions_transaction_fts USING fts5(
+        payee, memo, envelope, import_payee,
+        content = 'transactions_transaction_search', content_rowid = 'id',
+        tokenize = 'trigram'
+    )
+"""
+
+BACKFILL = [
+    """
+    INSERT INTO transactions_transaction_search
+        (transaction_id, payee, memo, envelope, import_payee)
+    SELECT t.id, p.name, t.memo, e.name, t.import_payee_name
+    FROM transactions_transaction t
+    LEFT JOIN transactions_payee p ON p.id = t.payee_id
+    LEFT JOIN envelopes_envelope e ON e.id = t.envelope_id
+    """,
+    "INSERT INTO transactions_transaction_fts (transactions_transaction_fts) "
+    "VALUES ('rebuild')",
+]
+
+# An external-content index is told the old text of the rows it forgets
+UNINDEX_ROWS = """
+    INSERT INTO transactions_transaction_fts
+        (transactions_transaction_fts, rowid, payee, memo, envelope, import_payee)
+    SELECT 'delete', id, payee, memo, envelope, import_payee
+    FROM transactions_transaction_search WHERE {where}
+"""
+
+INDEX_ROWS = """
+    INSERT INTO transactions_transaction_fts
+        (rowid, payee, memo, envelope, import_payee)
+    SELECT id, payee, memo, envelope, import_payee
+    FROM transactions_transaction_search WHERE {where}
+"""
+
+ONE_ROW = "transaction_id = {row}.id"
+PAYEE_ROWS = (
+    "transaction_id IN "
+    "(SELECT id FROM transactions_transaction WHERE payee_id = NEW.id)"
+)
+ENVELOPE_ROWS = (
+    "transaction_id IN "
+    "(SELECT id FROM transactions_transaction WHERE envelope_id = NEW.id)"
+)
+
+TRIGGERS = [
+    f"""
+    CREATE TRIGGER transactions_transaction_fts_insert
+    AFTER INSERT ON transactions_transaction FOR EACH ROW BEGIN
+        INSERT INTO transactions_transaction_search
+            (transaction_id, payee, memo, envelope, import_payee)
+        VALUES (
+            NEW.id,
+            (SELECT name FROM transactions_payee WHERE id = NEW.payee_id),
+            NEW.memo,
+            (SELECT name FROM envelopes_envelope WHERE id = NEW.envelope_id),
+            NEW.import_payee_name
+        );
+        {INDEX_ROWS.format(where=ONE_ROW.format(row="NEW"))};
+    END
+    """,
+    # Most updates, including the sync_version stamp, leave the text alone
+    f"""
+    CREATE TRIGGER transactions_transaction_fts_update
+    AFTER UPDATE OF payee_id, memo, envelope_id, import_payee_name
+    ON transactions_transaction FOR EACH ROW
+    WHEN OLD.payee_id IS NOT NEW.payee_id
+        OR OLD.memo IS NOT NEW.memo
+        OR OLD.envelope_id IS NOT NEW.envelope_id
+        OR OLD.import_payee_name IS NOT NEW.import_payee_name
+    BEGIN
+        {UNINDEX_ROWS.format(where=ONE_ROW.format(row="NEW"))};
+        UPDATE transactions_transaction_search SET
+            payee = (SELECT name FROM transactions_payee WHERE id = NEW.payee_id),
+            memo = NEW.memo,
+            envelope = (SELECT name FROM envelopes_envelope WHERE id = NEW.envelope_id),
+            import_payee = NEW.import_payee_name
+        WHERE transaction_id = NEW.id;
+        {INDEX_ROWS.format(where=ONE_ROW.format(row="NEW"))};
+    END
+    """,
+    f"""
+    CREATE TRIGGER transactions_transaction_fts_delete
+    AFTER DELETE ON transactions_transaction FOR EACH ROW BEGIN
+        {UNINDEX_ROWS.format(where=ONE_ROW.format(row="OLD"))};
+        DELETE FROM transactions_transaction_search WHERE transaction_id = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER transactions_payee_fts_rename
+    AFTER UPDATE OF name ON transactions_payee FOR EACH ROW
+    WHEN OLD.name IS NOT NEW.name
+    BEGIN
+        {UNINDEX_ROWS.format(where=PAYEE_ROWS)};
+        UPDATE transactions_transaction_search SET payee = NEW.name
+        WHERE {PAYEE_ROWS};
+        {INDEX_ROWS.format(where=PAYEE_ROWS)};
+    END
+    """,
+    f"""
+    CREATE TRIGGER envelopes_envelope_fts_rename
+    AFTER UPDATE OF name ON envelopes_envelope FOR EACH ROW
+    WHEN OLD.name IS NOT NEW.name
+    BEGIN
+        {UNINDEX_ROWS.format(where=ENVELOPE_ROWS)};
+        UPDATE transactions_transaction_search SET envelope = NEW.name
+        WHERE {ENVELOPE_ROWS};
+        {INDEX_ROWS.format(where=ENVELOPE_ROWS)};
+    END
+    """,
+]
+
+DROP = [
+    *initial_index.DROP,
+    "DROP TABLE IF EXISTS transactions_transaction_search",
+]
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("transactions", "0016_payee_name_key"),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            [*initial_index.DROP, CREATE_ROWS, CREATE_INDEX, *BACKFILL, *TRIGGERS],
+            reverse_sql=[
+                *DROP,
+                initial_index.CREATE_INDEX,
+                initial_index.BACKFILL,
+                *initial_index.TRIGGERS,
+            ],
+        ),
+    ]
@@ -0,0 +1,155 @@
+import codecs
+import os
+import re
+import tempfile
+import zipfile
+
+# Uploads are read and rewritten in chunks of this size
+CHUNK_SIZE = 64 * 1024
+
+# Statements larger than this are spooled to disk instead of kept in memory
+SPOOL_MAX_SIZE = 5 * 1024 * 1024
+
+OFX_EXTENSIONS = (".ofx", ".qfx")
+
+_CHARSET_HEADER = re.compile(rb"^\s*CHARSET:\s*(\S+)", re.IGNORECASE | re.MULTILINE)
+_XML_ENCODING = re.compile(rb"<\?xml[^>]*encoding=[\"']([\w.-]+)[\"']", re.IGNORECASE)
+
+
+def spool(chunks):
+    """
+    Copy a stream of byte chunks into a spooled temporary file.
+
+    Args:
+        chunks (iterable): Byte strings, e.g. ``UploadedFile.chunks()``
+
+    Returns:
+        SpooledTemporaryFile: The data, rewound to the start
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    for chunk in chunks:
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def iter_statement_files(upload):
+    """
+    Yield the OFX/QFX statements contained in an upload.
+
+    A plain statement yields itself. A ZIP archive yields each ``.ofx`` or
+    ``.qfx`` member in archive order; every member is spooled on its own so
+    only one statement is held at a time.
+
+    Args:
+        upload (UploadedFile): The uploaded statement or archive
+
+    Yields:
+        tuple: (filename, spooled binary file)
+    """
+    spooled = spool(upload.chunks(CHUNK_SIZE))
+    if not zipfile.is_zipfile(spooled):
+        spooled.seek(0)
+        yield upload.name, spooled
+        return
+
+    with zipfile.ZipFile(spooled) as archive:
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if (
+                info.is_dir()
+                or name.startswith(".")
+                or info.filename.startswith("__MACOSX/")
+                or not name.lower().endswith(OFX_EXTENSIONS)
+            ):
+                continue
+            with archive.open(info) as member:
+                statement = spool(iter(lambda: member.read(CHUNK_SIZE), b""))
+            yield info.filename, statement
+
+
+def _iter_chunks(fh):
+    fh.seek(0)
+    for chunk in iter(lambda: fh.read(CHUNK_SIZE), b""):
+        yield chunk
+
+
+def _declared_encoding(head):
+    """Return the encoding named in an OFX 1.x or 2.x header, if any."""
+    match = _XML_ENCODING.search(head)
+    if match:
+        return match.group(1).decode("ascii")
+
+    match = _CHARSET_HEADER.search(head)
+    if match:
+        charset = match.group(1).decode("ascii").upper()
+        if charset == "8859-1":
+            return "iso-8859-1"
+        if charset.isdigit():
+            return f"cp{charset}"
+    return None
+
+
+def _decodes_cleanly(fh, encoding):
+    try:
+        decoder = codecs.getincrementaldecoder(encoding)()
+    except LookupError:
+        return False
+    try:
+        for chunk in _iter_chunks(fh):
+            decoder.decode(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def detect_encoding(fh):
+    """
+    Work out the text encoding of an OFX statement.
+
+    Valid UTF-8 wins, since legacy single-byte text almost never happens to
+    form valid UTF-8 sequences. Otherwise the charset declared in the header
+    is used, then cp1252 (what most OFX 1.x SGML exports really are), and
+    finally latin-1, which accepts any byte.
+
+    Args:
+        fh: A seekable binary file
+
+    Returns:
+        str: A codec name
+    """
+    fh.seek(0)
+    head = fh.read(CHUNK_SIZE)
+    for encoding in ("utf-8-sig", _declared_encoding(head), "cp1252"):
+        if encoding and _decodes_cleanly(fh, encoding):
+            return encoding
+    return "latin-1"
+
+
+def to_ascii(fh, encoding=None):
+    """
+    Rewrite a statement as ASCII, with every other character turned into an
+    XML character reference.
+
+    ``ofxparse`` picks its codec from the statement header, which is often
+    wrong and fails outright on OFX 2.x files without one. ASCII reads the
+    same under every codec it may pick, and the parser turns the character
+    references back into text.
+
+    Args:
+        fh: A seekable binary file
+        encoding (str, optional): The source encoding; detected when omitted
+
+    Returns:
+        SpooledTemporaryFile: The rewritten statement, rewound to the start
+    """
+    encoding = encoding or detect_encoding(fh)
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    def ascii_chunks():
+        for chunk in _iter_chunks(fh):
+            yield decoder.decode(chunk).encode("ascii", "xmlcharrefreplace")
+        yield decoder.decode(b"", final=True).encode("ascii", "xmlcharrefreplace")
+
+    return spool(ascii_chunks())
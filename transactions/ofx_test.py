@@ -0,0 +1,259 @@
+import io
+import zipfile
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Account
+from budgets.models import Budget
+from transactions.models import Payee, PayeeRule, Transaction
+from transactions.ofx import detect_encoding, iter_statement_files, to_ascii
+
+OFX_TEMPLATE = """OFXHEADER:100
+DATA:OFXSGML
+VERSION:102
+SECURITY:NONE
+ENCODING:{encoding}
+CHARSET:{charset}
+COMPRESSION:NONE
+OLDFILEUID:NONE
+NEWFILEUID:NONE
+
+<OFX>
+<SIGNONMSGSRSV1><SONRS><STATUS><CODE>0<SEVERITY>INFO</STATUS>
+<DTSERVER>20240101000000<LANGUAGE>ENG</SONRS></SIGNONMSGSRSV1>
+<BANKMSGSRSV1><STMTTRNRS><TRNUID>1
+<STATUS><CODE>0<SEVERITY>INFO</STATUS>
+<STMTRS><CURDEF>USD
+<BANKACCTFROM><BANKID>000000000<ACCTID>123456789<ACCTTYPE>CHECKING</BANKACCTFROM>
+<BANKTRANLIST><DTSTART>20240101<DTEND>20240131
+{lines}
+</BANKTRANLIST>
+<LEDGERBAL><BALAMT>0.00<DTASOF>20240131</LEDGERBAL>
+</STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+"""
+
+
+def build_statement(lines, encoding="USASCII", charset="1252"):
+    """Build an OFX 1.x statement from (fitid, payee, amount) tuples."""
+    return OFX_TEMPLATE.format(
+        encoding=encoding,
+        charset=charset,
+        lines="\n".join(
+            f"<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20240115<TRNAMT>{amount}"
+            f"<FITID>{fitid}<NAME>{payee}<MEMO>Memo {fitid}</STMTTRN>"
+            for fitid, payee, amount in lines
+        ),
+    )
+
+
+class OFXEncodingTests(TestCase):
+    def test_cp1252_statement(self):
+        """Test that single-byte statements fall back to cp1252"""
+        data = build_statement([("1", "Café Olé", "-4.50")]).encode("cp1252")
+        self.assertEqual(detect_encoding(io.BytesIO(data)), "cp1252")
+
+    def test_utf8_statement_with_wrong_header(self):
+        """Test that valid UTF-8 wins over a legacy charset header"""
+        data = build_statement([("1", "Café", "-4.50")]).encode("utf-8")
+        self.assertEqual(detect_encoding(io.BytesIO(data)), "utf-8-sig")
+
+    def test_declared_charset(self):
+        """Test that the header charset is used when UTF-8 does not fit"""
+        data = build_statement([("1", "Łódź", "-4.50")], charset="1250")
+        self.assertEqual(detect_encoding(io.BytesIO(data.encode("cp1250"))), "cp1250")
+
+    def test_to_ascii(self):
+        """Test that non-ASCII text becomes character references"""
+        data = build_statement([("1", "Café", "-4.50")]).encode("cp1252")
+        converted = to_ascii(io.BytesIO(data)).read()
+        self.assertIn(b"Caf&#233;", converted)
+        converted.decode("ascii")
+
+
+class OFXImportTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(username="ofx", password="ofx")
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.account = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+
+    def test_import_cp1252_file(self):
+        """Test that a cp1252 statement keeps its accented payee names"""
+        data = build_statement([("1", "CAFÉ OLÉ", "-4.50")]).encode("cp1252")
+        result = Transaction.import_ofx(
+            self.budget.id, self.account.id, io.BytesIO(data)
+        )
+
+        transaction = Transaction.objects.get(id=result["created_ids"][0])
+        self.assertEqual(transaction.payee.name, "Café Olé")
+        self.assertEqual(transaction.amount, -4500)
+        self.assertEqual(transaction.date, date(2024, 1, 15))
+
+    def test_import_zip_archive(self):
+        """Test that every statement in an archive is imported and reported"""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, "w") as zipped:
+            zipped.writestr(
+                "january.ofx",
+                build_statement([("1", "Store", "-1.00"), ("2", "Store", "-2.00")]),
+            )
+            zipped.writestr(
+                "statements/february.QFX",
+                build_statement(
+                    [("2", "Store", "-2.00"), ("3", "Café", "-3.00")]
+                ).encode("cp1252"),
+            )
+            zipped.writestr("broken.ofx", "not an ofx file")
+            zipped.writestr("readme.txt", "ignored")
+
+        self.client.force_login(self.user)
+        response = self.client.post(
+            f"/api/transactions/{self.budget.id}/{self.account.id}/import/ofx/file",
+            {
+                "ofx_file": SimpleUploadedFile(
+                    "statements.zip", archive.getvalue(), "application/zip"
+                )
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        summary = response.json()
+        files = {entry["file"]: entry for entry in summary["files"]}
+        self.assertEqual(
+            set(files), {"january.ofx", "statements/february.QFX", "broken.ofx"}
+        )
+        self.assertEqual(len(files["january.ofx"]["created_ids"]), 2)
+        self.assertEqual(len(files["statements/february.QFX"]["created_ids"]), 1)
+        self.assertEqual(len(files["statements/february.QFX"]["duplicate_ids"]), 1)
+        self.assertIsNotNone(files["broken.ofx"]["error"])
+        self.assertEqual(len(summary["created_ids"]), 3)
+
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, -6000)
+
+    def imported(self, import_id, amount=-1_000, **kwargs):
+        return Transaction.objects.create(
+            budget=self.budget,
+            account=self.account,
+            amount=amount,
+            date=date(2024, 1, 10),
+            import_id=import_id,
+            **kwargs,
+        )
+
+    def test_duplicates_of_earlier_imports(self):
+        """Test that FITIDs seen before, deleted or repeated in the file are skipped"""
+        earlier = self.imported("1")
+        deleted = self.imported("2")
+        deleted.soft_delete()
+        other_account = Account.objects.create(
+            budget=self.budget, name="Savings", type="savings"
+        )
+        Transaction.objects.create(
+            budget=self.budget,
+            account=other_account,
+            amount=-3_000,
+            date=date(2024, 1, 10),
+            import_id="3",
+        )
+
+        result = Transaction.import_ofx(
+            self.budget.id,
+            self.account.id,
+            build_statement(
+                [
+                    ("1", "Store", "-1.00"),
+                    ("2", "Store", "-2.00"),
+                    ("3", "Store", "-3.00"),
+                    ("3", "Store", "-3.00"),
+                ]
+            ),
+        )
+
+        self.assertEqual(len(result["created_ids"]), 1)
+        created = Transaction.objects.get(id=result["created_ids"][0])
+        self.assertEqual(created.import_id, "3")
+        self.assertEqual(result["duplicate_ids"], [earlier.id, deleted.id, created.id])
+        self.account.refresh_from_db()
+        # The earlier import and the new row; the deleted one no longer counts
+        self.assertEqual(self.account.balance, -1_000 - 3_000)
+
+    def test_payee_resolution(self):
+        """Test that raw payees are cleaned and matched to existing payees"""
+        shop = Payee.get_or_create_one(self.budget.id, "Corner Shop")
+        PayeeRule.objects.create(
+            budget=self.budget, pattern=r"^amzn mktp.*", replacement="Amazon"
+        )
+
+        result = Transaction.import_ofx(
+            self.budget.id,
+            self.account.id,
+            build_statement(
+                [
+                    ("1", "CORNER SHOP #1234", "-1.00"),
+                    ("2", "corner  shop", "-2.00"),
+                    ("3", "AMZN Mktp US*2K4", "-3.00"),
+                    ("4", "AMZN MKTP CA", "-4.00"),
+                ]
+            ),
+        )
+
+        transactions = Transaction.objects.filter(id__in=result["created_ids"])
+        payees = {t.import_id: t.payee for t in transactions}
+        self.assertEqual(payees["1"], shop)
+        self.assertEqual(payees["2"], shop)
+        self.assertEqual(payees["3"].name, "Amazon")
+        self.assertEqual(payees["3"], payees["4"])
+        self.assertEqual(
+            {t.import_id: t.import_payee_name for t in transactions}["1"],
+            "CORNER SHOP #1234",
+        )
+        self.assertEqual(Payee.objects.filter(budget=self.budget).count(), 2)
+
+    def test_statement_larger_than_a_batch(self):
+        """Test a statement crossing the 900-row batch size for dedup and balances"""
+        lines = [
+            (str(index), f"Store {index % 7} #{index}", f"-{index % 5 + 1}.00")
+            for index in range(1, 1001)
+        ]
+        # Every tenth row was imported before
+        for fitid, _, amount in lines[::10]:
+            self.imported(fitid, amount=int(float(amount) * 1000))
+        self.account.refresh_from_db()
+        earlier_balance = self.account.balance
+
+        with CaptureQueriesContext(connection) as queries:
+            result = Transaction.import_ofx(
+                self.budget.id, self.account.id, build_statement(lines)
+            )
+
+        self.assertEqual(len(result["created_ids"]), 900)
+        self.assertEqual(len(result["duplicate_ids"]), 100)
+        # Batched lookups and inserts, not a query per row; bulk_create still
+        # splits the insert at SQLite's parameter limit
+        self.assertLess(len(queries), len(lines) // 10)
+
+        new_lines = [line for index, line in enumerate(lines) if index % 10]
+        expected = sum(int(float(amount) * 1000) for _, _, amount in new_lines)
+        self.account.refresh_from_db()
+        self.assertEqual(self.account.balance, earlier_balance + expected)
+        self.assertEqual(Transaction.objects.filter(account=self.account).count(), 1000)
+        self.assertEqual(
+            Payee.objects.filter(budget=self.budget, name__startswith="Store").count(),
+            7,
+        )
+
+    def test_iter_statement_files_plain_upload(self):
+        """Test that a plain statement is yielded as a single file"""
+        upload = SimpleUploadedFile("statement.ofx", b"OFXHEADER:100")
+        files = list(iter_statement_files(upload))
+        self.assertEqual(len(files), 1)
+        self.assertEqual(files[0][0], "statement.ofx")
+        self.assertEqual(files[0][1].read(), b"OFXHEADER:100")
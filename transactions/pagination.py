@@ -0,0 +1,87 @@
+"""
+Pagination for transaction lists.
+
+Offset pagination counts every matching row and skips ``offset`` rows on
+each page, so deep pages of a large account get slower and slower. Passing
+``cursor`` (empty for the first page) switches to keyset pagination
+instead: rows are read in (date, id) order starting right after the last
+row of the previous page, and no count is made.
+"""
+
+import base64
+import binascii
+from datetime import date
+from typing import Optional
+
+from django.db.models import Q
+from ninja import Field
+from ninja.errors import HttpError
+from ninja.pagination import LimitOffsetPagination
+
+# Newest first, with the ID breaking ties between rows on the same date
+ORDERING = ("-date", "-id")
+
+
+def encode_cursor(day, transaction_id):
+    """Opaque cursor pointing just after the given row in list order."""
+    key = f"{day.isoformat()}|{transaction_id}"
+    return base64.urlsafe_b64encode(key.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Read a cursor made by ``encode_cursor``.
+
+    Returns:
+        tuple: (date, transaction ID)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        key = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        day, transaction_id = key.split("|")
+        return date.fromisoformat(day), transaction_id
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+class TransactionPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination with an opt-in keyset mode, over querysets of
+    rows such as ``serializers.transaction_rows`` returns.
+
+    Rows are ordered by ``ORDERING`` unless another ``ordering`` is given,
+    which only offset mode supports. In keyset mode ``count`` is null and
+    ``next_cursor`` is null on the last page.
+    """
+
+    class Input(LimitOffsetPagination.Input):
+        cursor: Optional[str] = Field(
+            None, description="Use keyset pagination; empty for the first page"
+        )
+
+    def paginate_queryset(self, queryset, pagination, ordering=ORDERING, **params):
+        queryset = queryset.order_by(*ordering)
+        if pagination.cursor is None:
+            page = super().paginate_queryset(queryset, pagination, **params)
+            return {**page, "next_cursor": None}
+        if tuple(ordering) != ORDERING:
+            raise HttpError(400, "Cursors only page through rows in date order")
+
+        if pagination.cursor:
+            try:
+                after_date, after_id = decode_cursor(pagination.cursor)
+            except ValueError as e:
+                raise HttpError(400, str(e)) from e
+            # The bare date bound lets the index seek straight to the page
+            queryset = queryset.filter(
+                Q(date__lt=after_date) | Q(id__lt=after_id), date__lte=after_date
+            )
+
+        items = list(queryset[: pagination.limit + 1])
+        next_cursor = None
+        if len(items) > pagination.limit:
+            items = items[: pagination.limit]
+            next_cursor = encode_cursor(items[-1]["date"], items[-1]["id"])
+        return {"items": items, "count": None, "next_cursor": next_cursor}
@@ -0,0 +1,161 @@
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Account
+from budgets.models import Budget
+from envelopes.models import Category, Envelope
+from transactions.apis import TransactionPage
+from transactions.models import Payee, Transaction
+from transactions.pagination import decode_cursor, encode_cursor
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="pages", password="pages"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.checking = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.savings = Account.objects.create(
+            budget=self.budget, name="Savings", type="savings"
+        )
+        # Several rows share each date, so the date alone cannot order them
+        Transaction.bulk_create_with_balances(
+            [
+                Transaction(
+                    budget=self.budget,
+                    account=self.checking if index % 3 else self.savings,
+                    amount=-index,
+                    date=date(2025, 6, 1) + timedelta(days=index // 4),
+                    in_inbox=index % 2 == 0,
+                )
+                for index in range(25)
+            ]
+        )
+        self.url = f"/api/transactions/{self.budget.id}"
+        self.client.force_login(self.user)
+
+    def pages(self, params, limit=4):
+        ids, cursor = [], ""
+        while cursor is not None:
+            response = self.client.get(
+                self.url, {**params, "limit": limit, "cursor": cursor}
+            )
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertIsNone(page["count"])
+            ids.extend(item["id"] for item in page["items"])
+            cursor = page["next_cursor"]
+        return ids
+
+    def expected(self, **filters):
+        return list(
+            Transaction.objects.filter(budget=self.budget, **filters)
+            .order_by("-date", "-id")
+            .values_list("id", flat=True)
+        )
+
+    def test_cursor_pages_cover_every_row_once(self):
+        """Test that walking the cursors returns every row in list order"""
+        self.assertEqual(self.pages({}), self.expected())
+        self.assertEqual(self.pages({}, limit=25), self.expected())
+
+    def test_cursor_pages_with_filters(self):
+        """Test that the account, inbox and search filters still apply"""
+        self.assertEqual(
+            self.pages({"account_id": self.checking.id}),
+            self.expected(account=self.checking),
+        )
+        self.assertEqual(
+            self.pages({"in_inbox": "true"}, limit=3), self.expected(in_inbox=True)
+        )
+        self.assertEqual(
+            self.pages({"search": "account:Savings"}),
+            self.expected(account=self.savings),
+        )
+
+    def test_cursor_page_skips_count(self):
+        """Test that a cursor page is one query, without COUNT or OFFSET"""
+        first = self.client.get(self.url, {"limit": 5, "cursor": ""}).json()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url, {"limit": 5, "cursor": first["next_cursor"]})
+        pages = [q["sql"] for q in queries if "transactions_transaction" in q["sql"]]
+        self.assertEqual(len(pages), 1)
+        self.assertNotIn("COUNT(", pages[0])
+        self.assertNotIn("OFFSET", pages[0])
+
+    def test_offset_mode_is_unchanged(self):
+        """Test that requests without a cursor still page by offset"""
+        page = self.client.get(self.url, {"limit": 10, "offset": 20}).json()
+        self.assertEqual(page["count"], 25)
+        self.assertIsNone(page["next_cursor"])
+        self.assertEqual([item["id"] for item in page["items"]], self.expected()[20:])
+
+    def test_page_shape_and_query_count(self):
+        """Test that pages match TransactionSchema in one query at any size"""
+        category = Category.objects.create(budget=self.budget, name="Bills")
+        envelope = Envelope.objects.create(
+            budget=self.budget, category=category, name="Power"
+        )
+        transaction = Transaction.objects.create(
+            budget=self.budget,
+            account=self.checking,
+            payee=Payee.get_or_create_one(self.budget.id, "Utility"),
+            envelope=envelope,
+            amount=-5_000,
+            date=date(2025, 12, 1),
+            memo="December",
+        )
+        for limit in (5, 26):
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(self.url, {"limit": limit}).json()
+            listed = [q for q in queries if "transactions_transaction" in q["sql"]]
+            self.assertEqual(len(listed), 2)  # the page and its count
+
+        self.assertEqual(
+            page["items"][0],
+            {
+                "id": transaction.id,
+                "budget_id": self.budget.id,
+                "account": {"id": self.checking.id, "name": "Checking"},
+                "payee": {"id": transaction.payee_id, "name": "Utility"},
+                "import_payee_name": None,
+                "envelope": {"id": envelope.id, "name": "Power"},
+                "date": "2025-12-01",
+                "amount": -5_000,
+                "memo": "December",
+                "cleared": False,
+                "pending": False,
+                "reconciled": False,
+                "import_id": None,
+                "sfin_id": None,
+            },
+        )
+        self.assertIsNone(page["items"][1]["payee"])
+        # The page is encoded without the response schema, so check that it
+        # still has the documented shape
+        self.assertEqual(
+            TransactionPage.model_validate(page).model_dump(
+                mode="json", exclude_unset=True
+            ),
+            page,
+        )
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = self.client.get(self.url, {"cursor": "not a cursor"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_cursor_round_trip(self):
+        """Test that cursors decode to the row they were made from"""
+        transaction = Transaction.objects.filter(budget=self.budget).first()
+        self.assertEqual(
+            decode_cursor(encode_cursor(transaction.date, transaction.id)),
+            (transaction.date, transaction.id),
+        )
@@ -0,0 +1,207 @@
+"""
+Find clusters of payees that are probably the same, such as "Maverik 61"
+and "Maverik 37".
+
+Names are reduced to a comparison form (lower case, letters only) and the
+forms are indexed by character trigram. Candidate pairs come from the
+posting lists of each form's rarest trigrams instead of comparing every name
+with every other, and each budget's index is kept in memory and updated only
+for the payees that changed since it was last used.
+"""
+
+from collections import OrderedDict, defaultdict
+import math
+import re
+import threading
+
+# Budgets whose index is kept in memory
+MAX_CACHED_BUDGETS = 16
+
+# Pairs at least this similar are remembered, so clusters can be asked for at
+# any threshold from here up without probing the index again
+MIN_SIMILARITY = 0.5
+
+_NON_LETTERS = re.compile(r"[\W\d_]+")
+
+
+def comparison_form(name):
+    """
+    Reduce a payee name to what identifies the business: lower case letters
+    with store numbers and punctuation removed.
+    """
+    form = " ".join(_NON_LETTERS.sub(" ", name.lower()).split())
+    return form or name.lower()
+
+
+def trigrams(form):
+    """Character trigrams of a form, padded so short words still get some."""
+    padded = f"  {form} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+class PayeeIndex:
+    """
+    A trigram inverted index over one budget's active payee names, with the
+    similar pairs found so far.
+
+    Payees with the same comparison form share one entry. Each form's
+    similar forms are found when the form is added and kept until it is
+    removed, so a refresh only probes the index for forms that are new.
+    """
+
+    def __init__(self):
+        self.names = {}
+        self.forms = {}
+        self.members = defaultdict(set)
+        self.grams = {}
+        self.postings = defaultdict(set)
+        self.edges = defaultdict(dict)
+        self.lock = threading.Lock()
+
+    def refresh(self, payees):
+        """
+        Bring the index in line with the budget's current payees.
+
+        Only payees that were added, renamed or removed since the last
+        refresh are re-indexed.
+
+        Args:
+            payees (dict): Names of the active payees keyed by ID
+
+        Returns:
+            int: The number of payees that changed
+        """
+        changed = 0
+        new_forms = set()
+        for payee_id in self.names.keys() - payees.keys():
+            self._remove(payee_id)
+            changed += 1
+        for payee_id, name in payees.items():
+            if self.names.get(payee_id) != name:
+                self._remove(payee_id)
+                new_forms.add(self._add(payee_id, name))
+                changed += 1
+        for form in new_forms:
+            if form in self.members:
+                self._link(form)
+        return changed
+
+    def clusters(self, threshold):
+        """
+        Group payees whose forms are at least ``threshold`` similar.
+
+        Similarity is the Jaccard index of the forms' trigrams. Payees with
+        the same form are always grouped. Clusters use complete linkage:
+        starting from the most similar pairs, two clusters are joined only
+        if every form of one is at least ``threshold`` similar to every form
+        of the other, so "Shell Gas" ~ "Shell Gas Station" ~ "Gas Station"
+        does not chain the first and last together.
+
+        Args:
+            threshold (float): At least ``MIN_SIMILARITY``
+
+        Returns:
+            list: ``(payee_ids, score)`` pairs, where ``score`` is the lowest
+                similarity between two forms of the cluster
+        """
+        pairs = sorted(
+            (
+                (similarity, form, other)
+                for form, neighbours in self.edges.items()
+                for other, similarity in neighbours.items()
+                if form < other and similarity >= threshold
+            ),
+            key=lambda pair: (-pair[0], pair[1], pair[2]),
+        )
+        cluster_of = {form: form for form in self.members}
+        clusters = {form: [form] for form in self.members}
+        score = {form: 1.0 for form in self.members}
+
+        for _, form, other in pairs:
+            left, right = cluster_of[form], cluster_of[other]
+            if left == right:
+                continue
+            # Pairs below MIN_SIMILARITY were never stored and count as 0
+            lowest = min(
+                self.edges[a].get(b, 0.0)
+                for a in clusters[left]
+                for b in clusters[right]
+            )
+            if lowest < threshold:
+                continue
+            for joined in clusters[right]:
+                cluster_of[joined] = left
+            clusters[left].extend(clusters.pop(right))
+            score[left] = min(score[left], score.pop(right), lowest)
+
+        groups = []
+        for root, forms in clusters.items():
+            payee_ids = [payee_id for form in forms for payee_id in self.members[form]]
+            if len(payee_ids) > 1:
+                groups.append((sorted(payee_ids), score[root]))
+        return groups
+
+    def _link(self, form):
+        """Find the forms similar to ``form`` and remember the pairs."""
+        grams = self.grams[form]
+        # Any form at least MIN_SIMILARITY similar shares at least
+        # ceil(MIN_SIMILARITY * len(grams)) trigrams with this one, so it
+        # must contain one of any len(grams) - that + 1 of them. Probing the
+        # rarest ones keeps the posting lists walked short.
+        probe_count = len(grams) - math.ceil(MIN_SIMILARITY * len(grams)) + 1
+        probes = sorted(grams, key=lambda gram: len(self.postings[gram]))
+        candidates = set()
+        for gram in probes[:probe_count]:
+            candidates.update(self.postings[gram])
+        candidates.discard(form)
+
+        for other in candidates:
+            other_grams = self.grams[other]
+            shared = len(grams & other_grams)
+            similarity = shared / (len(grams) + len(other_grams) - shared)
+            if similarity >= MIN_SIMILARITY:
+                self.edges[form][other] = similarity
+                self.edges[other][form] = similarity
+
+    def _add(self, payee_id, name):
+        form = comparison_form(name)
+        self.names[payee_id] = name
+        self.forms[payee_id] = form
+        if not self.members[form]:
+            self.grams[form] = trigrams(form)
+            for gram in self.grams[form]:
+                self.postings[gram].add(form)
+        self.members[form].add(payee_id)
+        return form
+
+    def _remove(self, payee_id):
+        if payee_id not in self.names:
+            return
+        del self.names[payee_id]
+        form = self.forms.pop(payee_id)
+        self.members[form].discard(payee_id)
+        if not self.members[form]:
+            del self.members[form]
+            for gram in self.grams.pop(form):
+                self.postings[gram].discard(form)
+                if not self.postings[gram]:
+                    del self.postings[gram]
+            for other in self.edges.pop(form, {}):
+                self.edges[other].pop(form, None)
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_index(budget_id):
+    """Return the budget's cached index, creating an empty one if needed."""
+    with _indexes_lock:
+        index = _indexes.get(budget_id)
+        if index is None:
+            index = _indexes[budget_id] = PayeeIndex()
+            while len(_indexes) > MAX_CACHED_BUDGETS:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(budget_id)
+        return index
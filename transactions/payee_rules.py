@@ -0,0 +1,110 @@
+"""
+Rules that turn raw bank payee strings such as "Visa - 07/06 Nintendo
+Ca12331038" into clean payee names.
+
+A budget's own rules and the built-in rules are joined into a single
+alternation so a name is cleaned with one regex scan, however many rules
+there are. Compiled matchers are cached by rule content, so a budget's rules
+are only compiled again after they change.
+"""
+
+from functools import lru_cache
+import re
+
+from .payees import normalize_payee_name
+
+# (pattern, replacement) pairs matched case-insensitively. They run after the
+# budget's own rules, which therefore win where both match.
+BUILTIN_RULES = (
+    # Card and date prefixes: "Visa - 07/06 ", "POS 12/31 ", "Debit Card 05/03 "
+    (
+        r"^(?:visa|mastercard|mc|debit(?:\s+card)?(?:\s+purchase)?|pos|"
+        r"checkcard|purchase)\s*-?\s*\d{1,2}/\d{1,2}(?:/\d{2,4})?\s+",
+        "",
+    ),
+    # Wallet and processor markers: "Sp ", "Aplpay ", "TST* ", "SQ *", "PP*"
+    (r"(?<!\S)(?:(?:sp|aplpay|apl\s+pay)\b|(?:tst|sq|pp|paypal)\s?\*)\s*", ""),
+    # Store numbers and reference codes: "#1234", " 000123", " Ca12331038"
+    (r"\s*#\s*\d+|\s+[a-z]{0,2}\d{4,}\w*", ""),
+)
+
+_TRAILING_PUNCTUATION = " -*#,.:;/"
+_WORD_START = re.compile(r"(?:^|(?<=[-/]))[a-z]")
+
+
+def validate_pattern(pattern):
+    """
+    Check that a user pattern can join the combined matcher.
+
+    The pattern is checked inside a cleaner of its own: some patterns that
+    compile alone, such as ones with a global inline flag like ``(?i)``, do
+    not compile once joined into the alternation.
+
+    Raises:
+        ValueError: If the pattern does not compile or uses named groups
+    """
+    try:
+        compiled = re.compile(pattern, re.IGNORECASE)
+        if not compiled.groupindex:
+            PayeeNameCleaner(((pattern, ""),))
+    except re.error as e:
+        raise ValueError(f"Invalid pattern: {e}") from e
+    if compiled.groupindex:
+        raise ValueError("Patterns cannot use named groups")
+
+
+class PayeeNameCleaner:
+    """
+    Cleans payee names with a budget's rules followed by the built-in ones.
+
+    Args:
+        rules (tuple): The budget's (pattern, replacement) pairs in order
+    """
+
+    def __init__(self, rules=()):
+        rules = tuple(rules) + BUILTIN_RULES
+        self.matcher = re.compile(
+            "|".join(
+                f"(?P<r{index}>{pattern})" for index, (pattern, _) in enumerate(rules)
+            ),
+            re.IGNORECASE,
+        )
+        self.replacements = {
+            f"r{index}": replacement for index, (_, replacement) in enumerate(rules)
+        }
+
+    def clean(self, name):
+        """
+        Clean one raw payee name.
+
+        Matches are replaced in a single left-to-right scan, then whitespace
+        is collapsed and all-upper or all-lower words are capitalized. Mixed
+        case words such as "eBay" are left alone. A name that would clean to
+        nothing is kept as it was.
+
+        Returns:
+            str: The clean name
+        """
+        raw = normalize_payee_name(name)
+        cleaned = self.matcher.sub(
+            lambda match: self.replacements[match.lastgroup], raw
+        )
+        cleaned = normalize_payee_name(cleaned).strip(_TRAILING_PUNCTUATION)
+        if not cleaned:
+            cleaned = raw
+        return " ".join(_capitalize(word) for word in cleaned.split())
+
+
+def _capitalize(word):
+    if word.isupper() or word.islower():
+        return _WORD_START.sub(lambda match: match.group().upper(), word.lower())
+    return word
+
+
+@lru_cache(maxsize=256)
+def get_cleaner(rules):
+    """
+    Return the cleaner for a tuple of (pattern, replacement) rules, compiling
+    it only the first time these exact rules are seen.
+    """
+    return PayeeNameCleaner(rules)
@@ -0,0 +1,111 @@
+from collections import OrderedDict
+import threading
+import time
+
+from django.conf import settings
+
+
+def normalize_payee_name(name):
+    """
+    Collapse runs of whitespace and trim the ends of a payee name so that
+    "Corner  Store " and "Corner Store" resolve to the same payee.
+    """
+    return " ".join(name.split()) if name else ""
+
+
+def payee_name_key(name):
+    """
+    The key payee names are matched by: the normalized name, casefolded, so
+    "CORNER  STORE" resolves to the stored "Corner Store".
+    """
+    return normalize_payee_name(name).casefold()
+
+
+class PayeeCache:
+    """
+    A per-process, bounded LRU of ``(budget_id, name key)`` to the
+    ``(id, name)`` of the active payee with that name, see ``payee_name_key``.
+
+    Importers resolve the same recurring payees over and over; with the cache
+    only names not seen recently reach the database. Entries are dropped when
+    their payee is renamed, merged or deleted in this process, and expire
+    after ``PAYEE_CACHE_TTL`` seconds so changes made by other processes are
+    picked up.
+    """
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._keys_by_id = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, budget_id, names):
+        """
+        Look up name keys in the cache.
+
+        Args:
+            budget_id (str): The ID of the budget
+            names (iterable): Payee name keys
+
+        Returns:
+            tuple: (hits, misses) where ``hits`` maps keys to ``(id, name)``
+                and ``misses`` is the set of keys that were not cached
+        """
+        hits, misses = {}, set()
+        now = time.monotonic()
+        with self._lock:
+            for name in names:
+                key = (budget_id, name)
+                entry = self._entries.get(key)
+                if entry is None or entry[2] < now:
+                    if entry is not None:
+                        self._discard(key)
+                    misses.add(name)
+                    continue
+                self._entries.move_to_end(key)
+                hits[name] = entry[:2]
+        return hits, misses
+
+    def put_many(self, budget_id, payees):
+        """
+        Cache active payees, evicting the least recently used entries once
+        ``PAYEE_CACHE_SIZE`` is reached.
+
+        Args:
+            budget_id (str): The ID of the budget
+            payees (iterable): Payee instances
+        """
+        expires = time.monotonic() + settings.PAYEE_CACHE_TTL
+        with self._lock:
+            for payee in payees:
+                key = (budget_id, payee_name_key(payee.name))
+                self._discard(key)
+                self._discard_id(payee.id)
+                self._entries[key] = (payee.id, payee.name, expires)
+                self._keys_by_id[payee.id] = key
+            while len(self._entries) > settings.PAYEE_CACHE_SIZE:
+                _, (payee_id, _, _) = self._entries.popitem(last=False)
+                self._keys_by_id.pop(payee_id, None)
+
+    def invalidate(self, payee_ids):
+        """Drop the entries of renamed, merged or deleted payees."""
+        with self._lock:
+            for payee_id in payee_ids:
+                self._discard_id(payee_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_id.clear()
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._keys_by_id.pop(entry[0], None)
+
+    def _discard_id(self, payee_id):
+        key = self._keys_by_id.pop(payee_id, None)
+        if key is not None:
+            self._entries.pop(key, None)
+
+
+payee_cache = PayeeCache()
@@ -0,0 +1,396 @@
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase, override_settings
+
+from accounts.models import Account
+from budgets.models import Budget
+from transactions.models import Payee, PayeeNameMapping, PayeeRule, Transaction
+from transactions.payee_rules import get_cleaner
+from transactions.payees import payee_cache
+
+
+class PayeeCacheTests(TestCase):
+    def setUp(self):
+        payee_cache.clear()
+        user = get_user_model().objects.create_user(username="payee", password="payee")
+        self.budget = Budget.objects.create(user=user, name="Budget")
+
+    def tearDown(self):
+        payee_cache.clear()
+
+    def test_repeated_names_are_cached(self):
+        """Test that resolving known names again does not query"""
+        first = Payee.get_or_create_many(self.budget.id, ["Grocer", "Cafe"])
+        with self.assertNumQueries(0):
+            again = Payee.get_or_create_many(self.budget.id, ["Grocer", "Cafe"])
+        self.assertEqual(again["Grocer"].pk, first["Grocer"].pk)
+        self.assertEqual(again["Cafe"].name, "Cafe")
+
+    def test_names_are_normalized(self):
+        """Test that whitespace variants resolve to the same payee"""
+        payees = Payee.get_or_create_many(
+            self.budget.id, ["Corner Store", " Corner  Store "]
+        )
+        self.assertEqual(payees["Corner Store"].pk, payees[" Corner  Store "].pk)
+        self.assertEqual(Payee.objects.filter(budget=self.budget).count(), 1)
+
+    def test_stored_names_are_normalized(self):
+        """Test that stored names match whatever their whitespace and case"""
+        stored = Payee.objects.create(budget=self.budget, name=" Corner  STORE")
+        payees = Payee.get_or_create_many(
+            self.budget.id, ["corner store", "CORNER STORE "]
+        )
+        self.assertEqual({payee.pk for payee in payees.values()}, {stored.pk})
+
+        created = Payee.get_or_create_many(self.budget.id, ["Cafe", "CAFE"])
+        self.assertEqual(created["Cafe"].pk, created["CAFE"].pk)
+        self.assertEqual(created["Cafe"].name, "Cafe")
+        self.assertEqual(Payee.objects.filter(budget=self.budget).count(), 2)
+
+    def test_rename_invalidates(self):
+        """Test that a renamed payee is no longer returned for its old name"""
+        payee = Payee.get_or_create_one(self.budget.id, "Old Name")
+        payee.name = "New Name"
+        payee.save()
+
+        resolved = Payee.get_or_create_one(self.budget.id, "Old Name")
+        self.assertNotEqual(resolved.pk, payee.pk)
+        self.assertEqual(Payee.get_or_create_one(self.budget.id, "New Name"), payee)
+
+    def test_soft_delete_invalidates(self):
+        """Test that a merged away payee is not reused"""
+        payee = Payee.get_or_create_one(self.budget.id, "Merged")
+        payee.deleted = True
+        payee.save()
+
+        resolved = Payee.get_or_create_one(self.budget.id, "Merged")
+        self.assertNotEqual(resolved.pk, payee.pk)
+        self.assertFalse(resolved.deleted)
+
+    @override_settings(PAYEE_CACHE_SIZE=2)
+    def test_cache_is_bounded(self):
+        """Test that the least recently used names are evicted"""
+        Payee.get_or_create_many(self.budget.id, ["A", "B"])
+        Payee.get_or_create_one(self.budget.id, "A")
+        Payee.get_or_create_one(self.budget.id, "C")
+
+        with self.assertNumQueries(0):
+            Payee.get_or_create_many(self.budget.id, ["A", "C"])
+        with self.assertNumQueries(1):
+            Payee.get_or_create_one(self.budget.id, "B")
+
+
+class PayeeRuleTests(TestCase):
+    def setUp(self):
+        payee_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="rules", password="rules"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+
+    def tearDown(self):
+        payee_cache.clear()
+
+    def test_builtin_rules(self):
+        """Test that bank prefixes, markers and store numbers are removed"""
+        cleaner = get_cleaner(())
+        self.assertEqual(cleaner.clean("Visa - 07/06 Nintendo Ca12331038"), "Nintendo")
+        self.assertEqual(
+            cleaner.clean("Visa - 07/07 Sp Moogoo Usa Moogo"), "Moogoo Usa Moogo"
+        )
+        self.assertEqual(cleaner.clean("TST* JOES PIZZA #123"), "Joes Pizza")
+        self.assertEqual(cleaner.clean("7-ELEVEN 35012"), "7-Eleven")
+        self.assertEqual(cleaner.clean("eBay Marketplace"), "eBay Marketplace")
+        self.assertEqual(cleaner.clean("Spotify"), "Spotify")
+
+    def test_budget_rules_run_first(self):
+        """Test that a budget's rule wins over the built-in rules"""
+        PayeeRule.objects.create(
+            budget=self.budget, pattern=r"^amzn mktp.*", replacement="Amazon"
+        )
+        cleaner = PayeeRule.cleaner_for(self.budget.id)
+        self.assertEqual(cleaner.clean("AMZN MKTP US*2K3L 12345"), "Amazon")
+
+    def test_patterns_must_join_the_matcher(self):
+        """Test that patterns only valid on their own are rejected"""
+        for pattern in ("(?i)amzn", "(?P<store>amzn)", "amzn("):
+            rule = PayeeRule(budget=self.budget, pattern=pattern)
+            with self.assertRaises(ValidationError):
+                rule.full_clean()
+        PayeeRule(budget=self.budget, pattern="amzn(?i:mktp)").full_clean()
+
+    def test_mappings_are_reused(self):
+        """Test that a raw name is cleaned once and then read back"""
+        first = PayeeNameMapping.clean_many(
+            self.budget.id, ["Visa - 01/02 Cafe 123456"]
+        )
+        self.assertEqual(first, {"Visa - 01/02 Cafe 123456": "Cafe"})
+        with self.assertNumQueries(1):
+            again = PayeeNameMapping.clean_many(
+                self.budget.id, ["Visa - 01/02 Cafe 123456"]
+            )
+        self.assertEqual(again, first)
+
+    def test_rule_change_forgets_mappings(self):
+        """Test that changed rules apply to names mapped before"""
+        PayeeNameMapping.clean_many(self.budget.id, ["AMZN MKTP US"])
+        PayeeRule.objects.create(
+            budget=self.budget, pattern=r"^amzn mktp.*", replacement="Amazon"
+        )
+        self.assertEqual(
+            PayeeNameMapping.clean_many(self.budget.id, ["AMZN MKTP US"]),
+            {"AMZN MKTP US": "Amazon"},
+        )
+
+    def test_rule_change_keeps_merges(self):
+        """Test that a payee merge outlives later changes to the rules"""
+        raw_names = ["AMZN MKTP US", "Visa - 01/02 Amazon.com 123456"]
+        payees = Payee.get_or_create_imported(self.budget.id, raw_names)
+        [(kept, _, _)] = Payee.merge_groups(
+            self.budget.id, [([payee.id for payee in payees.values()], "Amazon")]
+        )
+
+        PayeeRule.objects.create(budget=self.budget, pattern=r"^uber", replacement="")
+        resolved = Payee.get_or_create_imported(self.budget.id, raw_names)
+        self.assertEqual({payee.pk for payee in resolved.values()}, {kept.pk})
+        self.assertEqual(
+            Payee.objects.filter(budget=self.budget, deleted=False).count(), 1
+        )
+
+    def test_clean_names_renames_and_merges(self):
+        """Test that payees cleaning to one name are merged in bulk"""
+        account = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        raw = Payee.objects.create(
+            budget=self.budget, name="Visa - 07/06 Nintendo Ca12331038"
+        )
+        shouting = Payee.objects.create(budget=self.budget, name="NINTENDO")
+        kept = Payee.objects.create(budget=self.budget, name="Corner Store")
+        for payee in (raw, shouting, kept):
+            Transaction.objects.create(
+                budget=self.budget,
+                account=account,
+                payee=payee,
+                date="2024-01-01",
+                amount=-1000,
+            )
+
+        self.client.force_login(self.user)
+        response = self.client.post(f"/api/payees/{self.budget.id}/clean-names")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["merged"], 1)
+        self.assertEqual(response.json()["renamed"], 1)
+        active = Payee.objects.filter(budget=self.budget, deleted=False)
+        self.assertEqual(
+            sorted(active.values_list("name", flat=True)),
+            ["Corner Store", "Nintendo"],
+        )
+        nintendo = active.get(name="Nintendo")
+        self.assertEqual(Transaction.objects.filter(payee=nintendo).count(), 2)
+        # Imports of the old names now resolve straight to the merged payee
+        self.assertEqual(
+            Payee.get_or_create_imported(
+                self.budget.id, ["Visa - 07/06 Nintendo Ca12331038"]
+            )["Visa - 07/06 Nintendo Ca12331038"].pk,
+            nintendo.pk,
+        )
+
+    def test_invalid_rule_is_rejected(self):
+        """Test that a pattern that does not compile is refused"""
+        self.client.force_login(self.user)
+        response = self.client.post(
+            f"/api/payees/{self.budget.id}/rules",
+            {"pattern": "(unclosed"},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PayeeRule.objects.exists())
+
+        response = self.client.get(f"/api/payees/{self.budget.id}/rules")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [])
+
+
+class PayeeMergeTests(TestCase):
+    def setUp(self):
+        payee_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            username="merge", password="merge"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.account = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        payee_cache.clear()
+
+    def payee(self, name, transaction_count):
+        payee = Payee.objects.create(budget=self.budget, name=name)
+        for _ in range(transaction_count):
+            Transaction.objects.create(
+                budget=self.budget,
+                account=self.account,
+                payee=payee,
+                date="2024-01-01",
+                amount=-1000,
+            )
+        return payee
+
+    def test_preview_counts_in_one_query(self):
+        """Test that the preview suggests the most used payee's name"""
+        payees = [self.payee("Grocer", 1), self.payee("GROCER INC", 3)]
+        payees += [self.payee(f"Grocer {i}", 0) for i in range(5)]
+
+        with self.assertNumQueries(6):
+            response = self.client.post(
+                f"/api/payees/{self.budget.id}/merge/preview",
+                {"payee_ids": [payee.id for payee in payees]},
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["suggested_name"], "GROCER INC")
+        self.assertEqual(response.json()["transaction_count"], 4)
+        self.assertEqual(len(response.json()["sample_transactions"]), 4)
+
+    def test_batch_merge(self):
+        """Test that several groups are merged in one request"""
+        groups = [
+            [self.payee(f"Store {group} {i}", 2) for i in range(3)]
+            for group in range(20)
+        ]
+        existing = groups[0][1]
+
+        # Still a fixed number of queries, two of them recording name mappings
+        with self.assertNumQueries(13):
+            response = self.client.post(
+                f"/api/payees/{self.budget.id}/merge/batch",
+                {
+                    "merges": [
+                        {
+                            "payee_ids": [payee.id for payee in group],
+                            "new_payee_name": (
+                                existing.name if index == 0 else f"Store {index}"
+                            ),
+                        }
+                        for index, group in enumerate(groups)
+                    ]
+                },
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        result = response.json()
+        self.assertEqual(result["updated_transaction_count"], 80)
+        # The payee already holding the new name is the one kept
+        self.assertEqual(result["merges"][0]["merged_payee"]["id"], existing.id)
+        self.assertEqual(result["merges"][1]["merged_payee"]["name"], "Store 1")
+        self.assertEqual(
+            Payee.objects.filter(budget=self.budget, deleted=False).count(), 20
+        )
+        kept = Payee.objects.get(id=result["merges"][5]["merged_payee"]["id"])
+        self.assertEqual(Transaction.objects.filter(payee=kept).count(), 6)
+
+    def test_batch_merge_is_all_or_nothing(self):
+        """Test that one invalid group leaves every payee untouched"""
+        first = [self.payee("A", 1), self.payee("A 2", 1)]
+        taken = self.payee("Taken", 0)
+        second = [self.payee("B", 1), self.payee("B 2", 1)]
+
+        response = self.client.post(
+            f"/api/payees/{self.budget.id}/merge/batch",
+            {
+                "merges": [
+                    {"payee_ids": [p.id for p in first], "new_payee_name": "A"},
+                    {"payee_ids": [p.id for p in second], "new_payee_name": taken.name},
+                ]
+            },
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("already exists", response.json()["message"])
+        self.assertEqual(
+            Payee.objects.filter(budget=self.budget, deleted=False).count(), 5
+        )
+
+
+class PayeeClusterTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="clusters", password="clusters"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+
+    def names(self, clusters):
+        return sorted(sorted(name for _, name in payees) for payees, _ in clusters)
+
+    def test_store_numbers_and_spellings_cluster(self):
+        """Test that store variants cluster and unrelated payees do not"""
+        for name in ["Maverik 61", "Maverik 37", "MAVERIK #12", "Walmart", "Wal-Mart"]:
+            Payee.objects.create(budget=self.budget, name=name)
+        Payee.objects.create(budget=self.budget, name="Dentist")
+        Payee.objects.create(budget=self.budget, name="Gone", deleted=True)
+
+        clusters = Payee.duplicate_clusters(self.budget.id)
+        self.assertEqual(
+            self.names(clusters),
+            [["MAVERIK #12", "Maverik 37", "Maverik 61"], ["Wal-Mart", "Walmart"]],
+        )
+
+    def test_chains_do_not_merge(self):
+        """Test that payees only similar through a third one are kept apart"""
+        for name in ["Shell Gas", "Shell Gas Station", "Gas Station"]:
+            Payee.objects.create(budget=self.budget, name=name)
+
+        [(payees, score)] = Payee.duplicate_clusters(self.budget.id)
+        self.assertEqual(
+            sorted(name for _, name in payees), ["Gas Station", "Shell Gas Station"]
+        )
+        self.assertGreaterEqual(score, 0.5)
+
+    def test_index_follows_payee_changes(self):
+        """Test that renames and deletes reach the cached index"""
+        first = Payee.objects.create(budget=self.budget, name="Corner Store 1")
+        second = Payee.objects.create(budget=self.budget, name="Corner Store 2")
+        self.assertEqual(len(Payee.duplicate_clusters(self.budget.id)), 1)
+
+        second.name = "Bakery"
+        second.save()
+        self.assertEqual(Payee.duplicate_clusters(self.budget.id), [])
+
+        Payee.objects.create(budget=self.budget, name="Bakery 2")
+        Payee.objects.filter(pk=first.pk).update(deleted=True)
+        self.assertEqual(
+            self.names(Payee.duplicate_clusters(self.budget.id)),
+            [["Bakery", "Bakery 2"]],
+        )
+
+    def test_duplicates_endpoint(self):
+        """Test that clusters come with a suggested name to merge them under"""
+        account = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        popular = Payee.objects.create(budget=self.budget, name="Maverik 61")
+        Payee.objects.create(budget=self.budget, name="Maverik 37")
+        Transaction.objects.create(
+            budget=self.budget,
+            account=account,
+            payee=popular,
+            date="2024-01-01",
+            amount=-1000,
+        )
+
+        self.client.force_login(self.user)
+        response = self.client.get(f"/api/payees/{self.budget.id}/duplicates")
+
+        self.assertEqual(response.status_code, 200)
+        [cluster] = response.json()
+        self.assertEqual(cluster["suggested_name"], "Maverik 61")
+        self.assertEqual(cluster["similarity"], 1.0)
+        self.assertEqual(cluster["transaction_count"], 1)
+        self.assertEqual(len(cluster["payees"]), 2)
@@ -0,0 +1,142 @@
+from datetime import date
+import re
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from accounts.models import Account
+from budgets.models import Budget
+from transactions.models import Transaction
+from transactions.pagination import encode_cursor
+
+# A plan step that reads the whole transactions table or index, or sorts the
+# rows itself instead of reading them in index order
+FULL_SCAN = re.compile(r"^SCAN transactions_transaction\b")
+TEMP_SORT = re.compile(r"USE TEMP B-TREE")
+
+
+class QueryPlanTests(TestCase):
+    """
+    Run EXPLAIN QUERY PLAN on the hot Transaction queries and fail if one
+    of them stops using an index, so a changed query or index shows up here
+    rather than as a slow page on a large budget.
+    """
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="plans", password="plans"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.account = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.other_account = Account.objects.create(
+            budget=self.budget, name="Savings", type="savings"
+        )
+        self.transaction = Transaction.objects.create(
+            budget=self.budget,
+            account=self.account,
+            amount=-1_000,
+            date=date(2025, 5, 1),
+        )
+
+    def explain(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexed(self, sql, params=()):
+        plan = self.explain(sql, params)
+        for step in plan:
+            self.assertNotRegex(step, FULL_SCAN, f"{sql}\n{plan}")
+            self.assertNotRegex(step, TEMP_SORT, f"{sql}\n{plan}")
+
+    def assertQuerysetIndexed(self, queryset):
+        self.assertIndexed(*queryset.query.sql_with_params())
+
+    def assertRequestIndexed(self, url):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        selects = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith("SELECT")
+            and '"transactions_transaction"' in query["sql"]
+        ]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertIndexed(sql)
+
+    def test_transaction_lists(self):
+        """Test the list endpoint with each of its filters"""
+        url = f"/api/transactions/{self.budget.id}"
+        self.assertRequestIndexed(url)
+        self.assertRequestIndexed(f"{url}?in_inbox=true")
+        self.assertRequestIndexed(f"{url}?in_inbox=false")
+        self.assertRequestIndexed(f"{url}?account_id={self.account.id}")
+        self.assertRequestIndexed(f"{url}?account_id={self.account.id}&in_inbox=true")
+        cursor = encode_cursor(self.transaction.date, self.transaction.id)
+        self.assertRequestIndexed(f"{url}?cursor={cursor}")
+        self.assertRequestIndexed(f"{url}?cursor={cursor}&in_inbox=true")
+        self.assertRequestIndexed(f"{url}?cursor={cursor}&account_id={self.account.id}")
+
+    def test_report_date_ranges(self):
+        """Test the report scans over a budget's transactions in a date range"""
+        in_range = Transaction.objects.filter(
+            budget=self.budget,
+            date__gte=date(2025, 1, 1),
+            date__lte=date(2025, 12, 31),
+            deleted=False,
+        )
+        self.assertQuerysetIndexed(
+            in_range.filter(amount__lt=0).select_related("envelope__category")
+        )
+        self.assertQuerysetIndexed(
+            in_range.select_related("payee", "account", "envelope").order_by(
+                "-date", "-id"
+            )
+        )
+        self.assertQuerysetIndexed(
+            Transaction.objects.filter(budget=self.budget).order_by("date")[:1]
+        )
+
+    def test_import_dedup(self):
+        """Test the lookups of already imported transactions"""
+        ids = ["FIT-1", "FIT-2"]
+        existing = Transaction.objects.include_deleted().order_by()
+        # OFX
+        self.assertQuerysetIndexed(
+            existing.filter(
+                budget=self.budget, account=self.account, import_id__in=ids
+            ).values_list("import_id", "id")
+        )
+        # SimpleFIN
+        self.assertQuerysetIndexed(
+            existing.filter(budget=self.budget, account=self.account)
+            .filter(Q(import_id__in=ids) | Q(sfin_id__in=ids))
+            .values("id", "import_id", "sfin_id", "pending")
+        )
+        # Plaid
+        self.assertQuerysetIndexed(
+            existing.filter(
+                budget=self.budget,
+                account__in=[self.account, self.other_account],
+                import_id__in=ids,
+            )
+        )
+
+    def test_transfer_matching(self):
+        """Test the queries that look for the other side of a transfer"""
+        self.assertQuerysetIndexed(
+            Transaction.find_potential_transfer_matches(self.transaction)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            Transaction.find_transfer_pairs(self.budget.id)
+        self.assertEqual(len(queries), 2)
+        for query in queries:
+            self.assertIndexed(query["sql"])
@@ -1,8 +1,67 @@
-import re
+from collections import OrderedDict
 from datetime import datetime
 from decimal import Decimal
+from typing import NamedTuple
+import re
+import threading
+
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+# Full-text index over payee, memo, envelope and imported payee names, kept
+# up to date by triggers (migration 0017_transaction_search_rows). The index
+# reads its text from SEARCH_ROWS, whose rows carry the transaction ID.
+SEARCH_INDEX = "transactions_transaction_fts"
+SEARCH_ROWS = "transactions_transaction_search"
+
+# The index is made of trigrams, so shorter terms cannot be looked up in it
+MIN_INDEXED_TERM_LENGTH = 3
+
+# bm25 weights of the indexed columns: payee, memo, envelope, import_payee
+RANK_WEIGHTS = (4.0, 1.0, 2.0, 3.0)
+
+# Planned queries kept per process, keyed on (budget ID, normalized query)
+SEARCH_PLAN_CACHE_SIZE = 512
+
+# Filter keys and the canonical key each one compiles to
+FILTER_KEYS = {
+    "is": "is",
+    "in": "in",
+    "envelope": "envelope",
+    "account": "account",
+    "after": "after",
+    "since": "after",
+    "before": "before",
+    "on": "on",
+    "amount": "amount",
+    "inflow": "inflow",
+    "outflow": "outflow",
+}
+
+# Filters on names, which the planner resolves to the IDs of the matching
+# envelopes and accounts of the budget
+NAME_FILTERS = ("envelope", "account")
+
+
+class SearchFilter(NamedTuple):
+    """A ``key:value`` section of a search query."""
+
+    key: str
+    value: str
+
 
-from django.db.models import Q
+class CompiledSearch(NamedTuple):
+    """
+    A search query parsed into its filters and free-text terms, in the order
+    they were written. It does not depend on any budget.
+    """
+
+    filters: tuple
+    terms: tuple
+
+    @property
+    def name_filters(self):
+        return [f for f in self.filters if f.key in NAME_FILTERS]
 
 
 def parse_search_query(query_string, budget_id):
@@ -16,6 +75,9 @@ def parse_search_query(query_string, budget_id):
     - Individual word matching for non-quoted terms
     - Special filters with colon syntax (is:, in:, envelope:, etc.)
 
+    The query is compiled and planned once and the plan reused for as long
+    as it stays valid; see ``SearchPlanCache``.
+
     Args:
         query_string (str): The search query string
         budget_id (str): The budget ID to scope the search
@@ -23,34 +85,188 @@ def parse_search_query(query_string, budget_id):
     Returns:
         Q: A Django Q object for filtering transactions
     """
-    # Base filter for the budget
-    base_filter = Q(budget_id=budget_id, deleted=False)
-
     # If query is empty, return all transactions for the budget
     if not query_string.strip():
-        return base_filter
+        return Q(budget_id=budget_id, deleted=False)
 
-    # Split the query into comma-separated terms
-    comma_separated_terms = _split_by_commas(query_string)
+    normalized = normalize_search_query(query_string)
+    plan = _plans.get(budget_id, normalized)
+    if plan is None:
+        compiled = compile_search_query(normalized)
+        plan = _plans.put(budget_id, normalized, compiled)
+    return plan
 
-    # Initialize filters
-    filters = Q()
-    text_search_terms = []
 
-    for term_group in comma_separated_terms:
+def normalize_search_query(query_string):
+    """
+    Rewrite a query so that queries that differ only in spacing around
+    commas or empty sections share a cache entry.
+    """
+    return ", ".join(group for group in _split_by_commas(query_string) if group)
+
+
+def compile_search_query(query_string):
+    """
+    Parse a search query into its filters and free-text terms.
+
+    Sections with an unknown filter key are dropped, as before.
+
+    Args:
+        query_string (str): The search query string
+
+    Returns:
+        CompiledSearch: The filters and terms of the query
+    """
+    filters, terms = [], []
+    for term_group in _split_by_commas(query_string):
         if not term_group:
             continue
+        filter_match = re.match(r"(\w+):(.*)", term_group)
+        if not filter_match:
+            _extract_search_terms(term_group, terms)
+        elif filter_match.group(1) in FILTER_KEYS:
+            key = FILTER_KEYS[filter_match.group(1)]
+            filters.append(SearchFilter(key, filter_match.group(2).strip()))
+    return CompiledSearch(tuple(filters), tuple(terms))
+
+
+def plan_search_query(compiled, budget_id):
+    """
+    Turn a compiled query into a filter for one budget.
+
+    ``envelope:`` and ``account:`` are looked up in the budget's envelopes
+    and accounts here, once, so the transaction query filters on indexed
+    ``envelope_id``/``account_id`` instead of joining to compare names on
+    every row.
+
+    Args:
+        compiled (CompiledSearch): The compiled query
+        budget_id (str): The budget ID to scope the search
 
-        # Process each term group
-        term_filters = _process_term_group(term_group, text_search_terms)
-        filters &= term_filters
+    Returns:
+        Q: A Django Q object for filtering transactions
+    """
+    resolved = _resolve_name_filters(compiled.name_filters, budget_id)
+
+    filters = Q()
+    for search_filter in compiled.filters:
+        key, value = search_filter
+        if key == "is":
+            filters &= _parse_is_filter(value)
+        elif key == "in":
+            filters &= _parse_in_filter(value)
+        elif key == "envelope":
+            filters &= _parse_envelope_filter(resolved[search_filter])
+        elif key == "account":
+            filters &= _parse_account_filter(resolved[search_filter])
+        elif key == "after":
+            filters &= _parse_date_filter(value, ">=")
+        elif key == "before":
+            filters &= _parse_date_filter(value, "<=")
+        elif key == "on":
+            filters &= _parse_date_filter(value, "==")
+        elif key == "amount":
+            filters &= _parse_amount_filter(value)
+        elif key == "inflow":
+            filters &= _parse_inflow_filter(value)
+        elif key == "outflow":
+            filters &= _parse_outflow_filter(value)
 
     # Add text search if there are any terms
-    if text_search_terms:
-        text_filter = _build_text_search_filter(text_search_terms)
-        filters &= text_filter
+    if compiled.terms:
+        filters &= _build_text_search_filter(compiled.terms)
+
+    return Q(budget_id=budget_id, deleted=False) & filters
+
+
+def _resolve_name_filters(name_filters, budget_id):
+    """
+    Find the envelopes and accounts whose names contain each filter value,
+    case-insensitively, with at most one query per kind. A quoted value,
+    such as ``envelope:"Food, Dining"``, must be the whole name.
+
+    Returns:
+        dict: Each ``SearchFilter`` to a sorted list of IDs
+    """
+    # pylint: disable=import-outside-toplevel
+    from accounts.models import Account
+    from envelopes.models import Envelope
+
+    # Deleted and hidden envelopes still own transactions that can be found
+    querysets = {"envelope": Envelope.objects.include_all(), "account": Account.objects}
+    resolved = {}
+    for key, queryset in querysets.items():
+        wanted = [f for f in name_filters if f.key == key]
+        if not wanted:
+            continue
+        names = queryset.filter(budget_id=budget_id).values_list("id", "name")
+        names = [(row_id, name.casefold()) for row_id, name in names]
+        for search_filter in wanted:
+            needle = search_filter.value.casefold()
+            if len(needle) > 1 and needle[0] == needle[-1] == '"':
+                needle = needle[1:-1]
+                matches = (row_id for row_id, name in names if needle == name)
+            else:
+                matches = (row_id for row_id, name in names if needle in name)
+            resolved[search_filter] = sorted(matches)
+    return resolved
+
+
+class SearchPlanCache:
+    """
+    A per-process, bounded LRU of ``(budget_id, normalized query)`` to the
+    planned filter.
+
+    The search bar sends the same few queries over and over; a hit skips
+    parsing and planning. Plans that resolved names are only reused while
+    the budget's ``BudgetVersion`` is unchanged, so renamed or new envelopes
+    and accounts are picked up on the next search, from any process.
+    """
+
+    def __init__(self, size=SEARCH_PLAN_CACHE_SIZE):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
 
-    return base_filter & filters
+    def get(self, budget_id, normalized):
+        """Return the cached plan, or None if there is no valid one."""
+        key = (budget_id, normalized)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        version, plan = entry
+        if version is not None and version != _budget_version(budget_id):
+            return None
+        return plan
+
+    def put(self, budget_id, normalized, compiled):
+        """Plan a compiled query for a budget, cache the plan and return it."""
+        # Read the version first: a write that lands while planning then
+        # makes the plan stale rather than hiding in it
+        version = _budget_version(budget_id) if compiled.name_filters else None
+        plan = plan_search_query(compiled, budget_id)
+        with self._lock:
+            self._entries[(budget_id, normalized)] = (version, plan)
+            self._entries.move_to_end((budget_id, normalized))
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return plan
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _budget_version(budget_id):
+    # pylint: disable=import-outside-toplevel
+    from budgets.models import BudgetVersion
+
+    return BudgetVersion.current(budget_id)
+
+
+_plans = SearchPlanCache()
 
 
 def _split_by_commas(query_string):
@@ -78,43 +294,6 @@ def _split_by_commas(query_string):
     return result
 
 
-def _process_term_group(term_group, text_search_terms):
-    """Process a group of terms (a single comma-separated section)"""
-    # Check if this term group contains a filter operator
-    filter_match = re.match(r"(\w+):(.*)", term_group)
-
-    if filter_match:
-        key = filter_match.group(1)
-        value = filter_match.group(2).strip()
-
-        # Handle different filter types
-        if key == "is":
-            return _parse_is_filter(value)
-        elif key == "in":
-            return _parse_in_filter(value)
-        elif key == "envelope":
-            return _parse_envelope_filter(value)
-        elif key == "account":
-            return _parse_account_filter(value)
-        elif key == "after" or key == "since":
-            return _parse_date_filter(value, ">=")
-        elif key == "before":
-            return _parse_date_filter(value, "<=")
-        elif key == "on":
-            return _parse_date_filter(value, "==")
-        elif key == "amount":
-            return _parse_amount_filter(value)
-        elif key == "inflow":
-            return _parse_inflow_filter(value)
-        elif key == "outflow":
-            return _parse_outflow_filter(value)
-    else:
-        # Process text search terms, handling quoted phrases
-        _extract_search_terms(term_group, text_search_terms)
-
-    return Q()
-
-
 def _extract_search_terms(text, text_search_terms):
     """
     Extract search terms from text, handling quoted phrases.
@@ -162,14 +341,14 @@ def _parse_in_filter(value):
     return Q()
 
 
-def _parse_envelope_filter(value):
-    """Parse 'envelope:X' filters, supporting emojis and spaces"""
-    return Q(envelope__name__icontains=value)
+def _parse_envelope_filter(envelope_ids):
+    """Build 'envelope:X' filters from the IDs of the matching envelopes"""
+    return Q(envelope_id__in=envelope_ids)
 
 
-def _parse_account_filter(value):
-    """Parse 'account:X' filters, supporting emojis and spaces"""
-    return Q(account__name__icontains=value)
+def _parse_account_filter(account_ids):
+    """Build 'account:X' filters from the IDs of the matching accounts"""
+    return Q(account_id__in=account_ids)
 
 
 def _parse_date_filter(value, operator):
@@ -276,16 +455,81 @@ def _parse_outflow_filter(value):
     return Q() & Q(amount__lt=0)
 
 
+def search_rank(query_string):
+    """
+    Rank transactions by how well they match the free text of a query.
+
+    Returns:
+        RawSQL: A bm25 score to order by, lower is better, or None if the
+        query has no terms that the full-text index can answer
+    """
+    terms = compile_search_query(query_string).terms
+    indexed_terms, _ = _split_indexed_terms(terms)
+    if not indexed_terms:
+        return None
+    weights = ", ".join(str(weight) for weight in RANK_WEIGHTS)
+    # bm25 reads index-wide statistics, so scoring one row at a time would
+    # repeat the whole search per row; score every match once instead
+    return RawSQL(
+        f"(WITH ranked AS MATERIALIZED ("
+        f"SELECT matched.rowid AS matched_rowid, "
+        f"bm25({SEARCH_INDEX}, {weights}) AS score "
+        f"FROM {SEARCH_INDEX} "
+        f"JOIN {SEARCH_ROWS} ON {SEARCH_ROWS}.id = {SEARCH_INDEX}.rowid "
+        f"JOIN transactions_transaction matched "
+        f"ON matched.id = {SEARCH_ROWS}.transaction_id "
+        f"WHERE {SEARCH_INDEX} MATCH %s) "
+        f"SELECT score FROM ranked "
+        f"WHERE ranked.matched_rowid = transactions_transaction.rowid)",
+        [_match_expression(indexed_terms)],
+    )
+
+
+def _split_indexed_terms(terms):
+    """Split terms into those the full-text index can answer and the rest."""
+    indexed, short = [], []
+    for term in terms:
+        if term:
+            long_enough = len(term) >= MIN_INDEXED_TERM_LENGTH
+            (indexed if long_enough else short).append(term)
+    return indexed, short
+
+
+def _match_expression(terms):
+    """FTS5 query matching rows that contain every term as a substring."""
+    phrases = ['"{}"'.format(term.replace('"', '""')) for term in terms]
+    return " AND ".join(phrases)
+
+
 def _build_text_search_filter(terms):
-    """Build a filter for text search across multiple fields"""
+    """
+    Build a filter for text search across payee, memo, envelope and
+    imported payee names.
+
+    Terms of three or more characters are looked up in the full-text
+    index together; shorter ones fall back to ``icontains``.
+    """
+    indexed_terms, short_terms = _split_indexed_terms(terms)
     text_filter = Q()
-    for term in terms:
-        if not term:
-            continue
-        term_filter = (
+    if indexed_terms:
+        # Matches are looked up by transaction ID and compared by the rowid
+        # that ID has now: the list's indexes carry the rowid, not the ID
+        text_filter &= Q(
+            RawSQL(
+                f"transactions_transaction.rowid IN "
+                f"(SELECT matched.rowid FROM transactions_transaction matched "
+                f"JOIN {SEARCH_ROWS} ON {SEARCH_ROWS}.transaction_id = matched.id "
+                f"JOIN {SEARCH_INDEX} ON {SEARCH_INDEX}.rowid = {SEARCH_ROWS}.id "
+                f"WHERE {SEARCH_INDEX} MATCH %s)",
+                [_match_expression(indexed_terms)],
+                output_field=BooleanField(),
+            )
+        )
+    for term in short_terms:
+        text_filter &= (
             Q(payee__name__icontains=term)
             | Q(envelope__name__icontains=term)
             | Q(memo__icontains=term)
+            | Q(import_payee_name__icontains=term)
         )
-        text_filter &= term_filter
     return text_filter
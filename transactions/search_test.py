@@ -1,10 +1,22 @@
 from datetime import date, timedelta
+import io
 
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.db.models import Q
 from django.test import TestCase
 
+from accounts.models import Account
+from budgets.models import Budget
+from envelopes.models import Category, Envelope
+from transactions.models import Payee, Transaction
 from transactions.search import (
+    SearchFilter,
+    compile_search_query,
+    normalize_search_query,
     parse_search_query,
+    search_rank,
     _parse_is_filter,
     _parse_in_filter,
     _parse_envelope_filter,
@@ -39,18 +51,8 @@ class SearchQueryParserTests(TestCase):
     def test_text_search(self):
         """Test basic text search"""
         result = parse_search_query("grocery store", self.budget_id)
-        expected = (
-            Q(budget_id=self.budget_id, deleted=False)
-            & Q(
-                Q(payee__name__icontains="grocery")
-                | Q(envelope__name__icontains="grocery")
-                | Q(memo__icontains="grocery")
-            )
-            & Q(
-                Q(payee__name__icontains="store")
-                | Q(envelope__name__icontains="store")
-                | Q(memo__icontains="store")
-            )
+        expected = Q(budget_id=self.budget_id, deleted=False) & (
+            _build_text_search_filter(["grocery", "store"])
         )
         self.assertEqual(str(result), str(expected))
 
@@ -93,17 +95,13 @@ class SearchQueryParserTests(TestCase):
     def test_envelope_filter(self):
         """Test envelope filter with spaces and emoji"""
         result = parse_search_query("envelope:🍕 Food & Dining", self.budget_id)
-        expected = Q(budget_id=self.budget_id, deleted=False) & Q(
-            envelope__name__icontains="🍕 Food & Dining"
-        )
+        expected = Q(budget_id=self.budget_id, deleted=False) & Q(envelope_id__in=[])
         self.assertEqual(str(result), str(expected))
 
     def test_account_filter(self):
         """Test account filter with spaces and emoji"""
         result = parse_search_query("account:💰 Checking Account", self.budget_id)
-        expected = Q(budget_id=self.budget_id, deleted=False) & Q(
-            account__name__icontains="💰 Checking Account"
-        )
+        expected = Q(budget_id=self.budget_id, deleted=False) & Q(account_id__in=[])
         self.assertEqual(str(result), str(expected))
 
     def test_date_filters(self):
@@ -197,7 +195,7 @@ class SearchQueryParserTests(TestCase):
         expected = (
             Q(budget_id=self.budget_id, deleted=False)
             & Q(cleared=True)
-            & Q(envelope__name__icontains="🏠 Housing")
+            & Q(envelope_id__in=[])
             & Q(amount__gt=100000)
         )
         self.assertEqual(str(result), str(expected))
@@ -209,11 +207,7 @@ class SearchQueryParserTests(TestCase):
             Q(budget_id=self.budget_id, deleted=False)
             & Q(cleared=True)
             & Q(amount__lt=-50000)
-            & Q(
-                Q(payee__name__icontains="grocery")
-                | Q(envelope__name__icontains="grocery")
-                | Q(memo__icontains="grocery")
-            )
+            & _build_text_search_filter(["grocery"])
         )
         self.assertEqual(str(result), str(expected))
 
@@ -244,11 +238,7 @@ class SearchQueryParserTests(TestCase):
         result = parse_search_query('"grocery store"', self.budget_id)
 
         # The quoted phrase should be searched as a single term
-        phrase_filter = (
-            Q(payee__name__icontains="grocery store")
-            | Q(envelope__name__icontains="grocery store")
-            | Q(memo__icontains="grocery store")
-        )
+        phrase_filter = _build_text_search_filter(["grocery store"])
 
         expected = Q(budget_id=self.budget_id, deleted=False) & phrase_filter
 
@@ -258,22 +248,9 @@ class SearchQueryParserTests(TestCase):
         """Test search with both quoted and unquoted terms"""
         result = parse_search_query('walmart "grocery store"', self.budget_id)
 
-        # The quoted phrase should be searched as a single term
-        phrase_filter = (
-            Q(payee__name__icontains="grocery store")
-            | Q(envelope__name__icontains="grocery store")
-            | Q(memo__icontains="grocery store")
-        )
-
-        # The unquoted term should be searched separately
-        word_filter = (
-            Q(payee__name__icontains="walmart")
-            | Q(envelope__name__icontains="walmart")
-            | Q(memo__icontains="walmart")
-        )
-
-        expected = (
-            Q(budget_id=self.budget_id, deleted=False) & phrase_filter & word_filter
+        # The quoted phrase is one term, the unquoted word another
+        expected = Q(budget_id=self.budget_id, deleted=False) & (
+            _build_text_search_filter(["grocery store", "walmart"])
         )
 
         self.assertEqual(str(result), str(expected))
@@ -283,11 +260,7 @@ class SearchQueryParserTests(TestCase):
         result = parse_search_query('"food, dining"', self.budget_id)
 
         # The quoted phrase with comma should be treated as a single term
-        phrase_filter = (
-            Q(payee__name__icontains="food, dining")
-            | Q(envelope__name__icontains="food, dining")
-            | Q(memo__icontains="food, dining")
-        )
+        phrase_filter = _build_text_search_filter(["food, dining"])
 
         expected = Q(budget_id=self.budget_id, deleted=False) & phrase_filter
 
@@ -328,22 +301,30 @@ class SearchHelperFunctionTests(TestCase):
 
     def test_parse_envelope_filter(self):
         self.assertEqual(
-            str(_parse_envelope_filter("Groceries")),
-            str(Q(envelope__name__icontains="Groceries")),
+            str(_parse_envelope_filter(["a", "b"])),
+            str(Q(envelope_id__in=["a", "b"])),
         )
+
+    def test_parse_account_filter(self):
         self.assertEqual(
-            str(_parse_envelope_filter("🍕 Food & Dining")),
-            str(Q(envelope__name__icontains="🍕 Food & Dining")),
+            str(_parse_account_filter(["a"])), str(Q(account_id__in=["a"]))
         )
 
-    def test_parse_account_filter(self):
+    def test_compile_search_query(self):
+        compiled = compile_search_query(
+            'since:2023-05-15, coffee "oat milk", envelope:🍕 Food, nope:x'
+        )
         self.assertEqual(
-            str(_parse_account_filter("Checking")),
-            str(Q(account__name__icontains="Checking")),
+            compiled.filters,
+            (
+                SearchFilter("after", "2023-05-15"),
+                SearchFilter("envelope", "🍕 Food"),
+            ),
         )
+        self.assertEqual(compiled.terms, ("oat milk", "coffee"))
+        self.assertEqual(compiled.name_filters, [SearchFilter("envelope", "🍕 Food")])
         self.assertEqual(
-            str(_parse_account_filter("💰 Savings Account")),
-            str(Q(account__name__icontains="💰 Savings Account")),
+            normalize_search_query(" is:cleared ,, coffee "), "is:cleared, coffee"
         )
 
     def test_parse_date_filter(self):
@@ -358,3 +339,195 @@ class SearchHelperFunctionTests(TestCase):
             str(_parse_date_filter("2023-05-15", "==")), str(Q(date=date_obj))
         )
         self.assertEqual(str(_parse_date_filter("invalid", ">=")), str(Q()))
+
+
+class SearchIndexTests(TestCase):
+    """Text search answered from the full-text index"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="fts", password="fts")
+        self.client.force_login(user)
+        self.budget = Budget.objects.create(user=user, name="Budget")
+        account = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        category = Category.objects.create(budget=self.budget, name="Everyday")
+        self.groceries = Envelope.objects.create(
+            budget=self.budget, category=category, name="Groceries"
+        )
+        self.coffee_shop = Payee.get_or_create_one(self.budget.id, "Blue Bottle Coffee")
+        self.market = Payee.get_or_create_one(self.budget.id, "Farmers Market")
+
+        def add(**fields):
+            return Transaction.objects.create(
+                budget=self.budget, account=account, date=date(2025, 5, 1), **fields
+            )
+
+        self.latte = add(amount=-5_500, payee=self.coffee_shop, memo="Oat latte")
+        self.beans = add(
+            amount=-18_000, payee=self.market, memo="Coffee beans", cleared=True
+        )
+        self.apples = add(
+            amount=-7_000, payee=self.market, envelope=self.groceries, memo="Apples"
+        )
+        self.imported = add(amount=-42_000, import_payee_name="AMZN MKTP US*2K4")
+
+    def search(self, query):
+        return set(
+            Transaction.objects.include_deleted()
+            .filter(parse_search_query(query, self.budget.id))
+            .values_list("id", flat=True)
+        )
+
+    def test_substrings_and_phrases(self):
+        """Test that terms match anywhere in any indexed field, in any case"""
+        self.assertEqual(self.search("coffee"), {self.latte.id, self.beans.id})
+        self.assertEqual(self.search("BOTTLE"), {self.latte.id})
+        self.assertEqual(self.search("ocer"), {self.apples.id})
+        self.assertEqual(self.search("mktp"), {self.imported.id})
+        self.assertEqual(self.search("market coffee"), {self.beans.id})
+        self.assertEqual(self.search('"coffee beans"'), {self.beans.id})
+        self.assertEqual(self.search('"beans coffee"'), set())
+
+    def test_short_terms_and_filters(self):
+        """Test short terms and structured filters alongside indexed terms"""
+        self.assertEqual(self.search("coffee, is:cleared"), {self.beans.id})
+        self.assertEqual(self.search("coffee, amount:-5.50"), {self.latte.id})
+        self.assertEqual(self.search("market ap"), {self.apples.id})
+        self.latte.soft_delete()
+        self.assertEqual(self.search("coffee"), {self.beans.id})
+
+    def test_index_follows_writes(self):
+        """Test that edits and renames are searchable straight away"""
+        self.apples.memo = "Pears"
+        self.apples.save()
+        self.assertEqual(self.search("apples"), set())
+        self.assertEqual(self.search("pears"), {self.apples.id})
+
+        self.coffee_shop.name = "Corner Cafe"
+        self.coffee_shop.save()
+        self.groceries.name = "Produce"
+        self.groceries.save()
+        self.assertEqual(self.search("corner"), {self.latte.id})
+        self.assertEqual(self.search("bottle"), set())
+        self.assertEqual(self.search("produce"), {self.apples.id})
+
+        self.beans.delete()
+        self.assertEqual(self.search("coffee"), set())
+
+    def test_index_survives_renumbered_rowids(self):
+        """Test that results do not depend on the rowids of transactions"""
+        with connection.cursor() as cursor:
+            # What a VACUUM may do to a table without an INTEGER PRIMARY KEY
+            cursor.execute("UPDATE transactions_transaction SET rowid = -rowid")
+        self.assertEqual(self.search("coffee"), {self.latte.id, self.beans.id})
+        ranked = (
+            Transaction.objects.filter(parse_search_query("coffee", self.budget.id))
+            .annotate(rank=search_rank("coffee"))
+            .values_list("rank", flat=True)
+        )
+        self.assertNotIn(None, ranked)
+
+        call_command("rebuild_search_index", stdout=io.StringIO())
+        self.assertEqual(self.search("mktp"), {self.imported.id})
+
+    def test_relevance_ordering(self):
+        """Test that payee matches rank above memo matches"""
+        self.assertIsNone(search_rank("is:cleared ab"))
+        ranked = list(
+            Transaction.objects.filter(parse_search_query("coffee", self.budget.id))
+            .annotate(rank=search_rank("coffee"))
+            .order_by("rank")
+            .values_list("id", flat=True)
+        )
+        self.assertEqual(ranked, [self.latte.id, self.beans.id])
+
+        url = f"/api/transactions/{self.budget.id}"
+        response = self.client.get(url, {"search": "coffee", "sort": "relevance"})
+        self.assertEqual(
+            [item["id"] for item in response.json()["items"]],
+            [self.latte.id, self.beans.id],
+        )
+        response = self.client.get(
+            url, {"search": "coffee", "sort": "relevance", "cursor": ""}
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+class SearchPlanTests(TestCase):
+    """Name filters resolved to IDs, and cached plans"""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(username="plan", password="plan")
+        self.budget = Budget.objects.create(user=user, name="Budget")
+        self.checking = Account.objects.create(
+            budget=self.budget, name="Joint Checking", type="checking"
+        )
+        self.savings = Account.objects.create(
+            budget=self.budget, name="Savings", type="savings"
+        )
+        category = Category.objects.create(budget=self.budget, name="Food")
+        self.dining = Envelope.objects.create(
+            budget=self.budget, category=category, name="🍕 Dining Out"
+        )
+        self.old = Envelope.objects.create(
+            budget=self.budget, category=category, name="Old Dining", deleted=True
+        )
+        self.out = Transaction.objects.create(
+            budget=self.budget,
+            account=self.checking,
+            envelope=self.dining,
+            amount=-30_000,
+            date=date(2025, 5, 2),
+        )
+        self.saved = Transaction.objects.create(
+            budget=self.budget,
+            account=self.savings,
+            envelope=self.old,
+            amount=-12_000,
+            date=date(2025, 5, 3),
+        )
+
+    def search(self, query):
+        return set(
+            Transaction.objects.filter(
+                parse_search_query(query, self.budget.id)
+            ).values_list("id", flat=True)
+        )
+
+    def test_names_resolve_to_ids(self):
+        """Test that name filters match IDs the way icontains matched names"""
+        result = parse_search_query("envelope:DINING, account:check", self.budget.id)
+        expected = (
+            Q(budget_id=self.budget.id, deleted=False)
+            & Q(envelope_id__in=sorted([self.dining.id, self.old.id]))
+            & Q(account_id__in=[self.checking.id])
+        )
+        self.assertEqual(str(result), str(expected))
+        self.assertEqual(self.search("envelope:🍕"), {self.out.id})
+        self.assertEqual(self.search("account:savings"), {self.saved.id})
+        self.assertEqual(self.search("account:nothing"), set())
+
+    def test_quoted_names_match_whole_names(self):
+        """Test that a quoted name filter matches that name only, commas and all"""
+        self.old.name = "Dining, Old"
+        self.old.save()
+        self.assertEqual(self.search('envelope:"🍕 dining out"'), {self.out.id})
+        self.assertEqual(self.search('envelope:"Dining, Old"'), {self.saved.id})
+        self.assertEqual(self.search('envelope:"dining"'), set())
+        self.assertEqual(self.search("envelope:dining"), {self.out.id, self.saved.id})
+
+    def test_plans_are_cached_until_the_budget_changes(self):
+        """Test that repeated searches reuse the plan and renames invalidate it"""
+        query = "envelope:dining, account:checking"
+        self.assertEqual(self.search(query), {self.out.id})
+        # Only the version check runs for a cached plan with name filters
+        with self.assertNumQueries(1):
+            parse_search_query(" envelope:dining ,account:checking", self.budget.id)
+        with self.assertNumQueries(0):
+            parse_search_query("is:cleared, amount:>5", self.budget.id)
+            parse_search_query("is:cleared, amount:>5", self.budget.id)
+
+        self.savings.name = "Checking Reserve"
+        self.savings.save()
+        self.assertEqual(self.search(query), {self.out.id, self.saved.id})
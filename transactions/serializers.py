@@ -0,0 +1,85 @@
+"""
+Fast JSON for transaction lists.
+
+Returning Transaction instances through ``TransactionSchema`` loads the
+account, payee and envelope of every row with a query each and validates
+every field with pydantic. Lists instead fetch exactly the schema's columns
+with one joined ``values()`` query, build the response dicts directly and
+encode them once with the standard library.
+"""
+
+import json
+
+from django.http import HttpResponse
+
+# Columns of TransactionSchema, as values() paths
+TRANSACTION_COLUMNS = (
+    "id",
+    "budget_id",
+    "account_id",
+    "account__name",
+    "payee_id",
+    "payee__name",
+    "import_payee_name",
+    "envelope_id",
+    "envelope__name",
+    "date",
+    "amount",
+    "memo",
+    "cleared",
+    "pending",
+    "reconciled",
+    "import_id",
+    "sfin_id",
+)
+
+
+def transaction_rows(queryset):
+    """
+    Project a Transaction queryset onto the columns of ``TransactionSchema``.
+
+    Returns:
+        QuerySet: Rows as dicts with ``TRANSACTION_COLUMNS`` keys
+    """
+    return queryset.values(*TRANSACTION_COLUMNS)
+
+
+def transaction_dict(row):
+    """Shape a row from ``transaction_rows`` like ``TransactionSchema``."""
+    return {
+        "id": row["id"],
+        "budget_id": row["budget_id"],
+        "account": {"id": row["account_id"], "name": row["account__name"]},
+        "payee": (
+            {"id": row["payee_id"], "name": row["payee__name"]}
+            if row["payee_id"]
+            else None
+        ),
+        "import_payee_name": row["import_payee_name"],
+        "envelope": (
+            {"id": row["envelope_id"], "name": row["envelope__name"]}
+            if row["envelope_id"]
+            else None
+        ),
+        "date": row["date"].isoformat(),
+        "amount": row["amount"],
+        "memo": row["memo"],
+        "cleared": row["cleared"],
+        "pending": row["pending"],
+        "reconciled": row["reconciled"],
+        "import_id": row["import_id"],
+        "sfin_id": row["sfin_id"],
+    }
+
+
+def dumps(data):
+    """Encode JSON-ready data to compact UTF-8 bytes."""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def json_response(data, status=200):
+    """
+    Respond with already JSON-ready data, skipping ninja's response
+    validation.
+    """
+    return HttpResponse(dumps(data), status=status, content_type="application/json")
@@ -272,7 +272,7 @@ function payeeData() {
     async cleanPayeeNames() {
       if (this.isLoading) return;
 
-      if (!confirm('This will use AI to clean up all payee names. Continue?')) {
+      if (!confirm('This will clean up all payee names and merge payees that end up with the same name. Continue?')) {
         return;
       }
 
@@ -27,7 +27,7 @@ async function get_transactions(budgetId, page = 1, pageSize = 20, accountId = n
   }
 }
 
-async function get_transactions_with_search(budgetId, page = 1, pageSize = 20, accountId = null, searchQuery = null) {
+async function get_transactions_with_search(budgetId, page = 1, pageSize = 20, accountId = null, searchQuery = null, withFacets = false) {
   const offset = (page - 1) * pageSize;
   let url = `/api/transactions/${budgetId}?offset=${offset}&limit=${pageSize}`;
 
@@ -42,9 +42,12 @@ async function get_transactions_with_search(budgetId, page = 1, pageSize = 20, a
     url += `&account_id=${accountId}`;
   }
 
-  // Add search query if provided
+  // Add search query if provided, and how the matches break down if asked
   if (searchQuery) {
     url += `&search=${encodeURIComponent(searchQuery)}`;
+    if (withFacets) {
+      url += '&facets=true';
+    }
   }
 
   try {
@@ -67,6 +70,13 @@ async function get_transactions_with_search(budgetId, page = 1, pageSize = 20, a
   }
 }
 
+// A search filter matching exactly one envelope or account name; quoting
+// keeps commas in the name and stops it matching names that contain it.
+// Names with a double quote cannot be quoted, so they get no filter.
+function nameFilter(key, name) {
+  return name.includes('"') ? null : `${key}:"${name}"`;
+}
+
 async function patchTransaction(id, data) {
   const budgetId = getCookie('budget_id');
   const url = `/api/transactions/${budgetId}/${id}`;
@@ -215,6 +225,16 @@ async function updateAccountBalances() {
   }
 }
 
+// Streams a budget's changes as they commit; the browser reconnects and
+// resumes from the last event on its own
+function subscribeToBudgetEvents(budgetId, handlers) {
+  const source = new EventSource(`/budgets/${budgetId}/events`);
+  for (const [event, handler] of Object.entries(handlers)) {
+    source.addEventListener(event, message => handler(JSON.parse(message.data)));
+  }
+  return source;
+}
+
 function transactionData() {
   return {
     activeIndex: 0,
@@ -240,8 +260,13 @@ function transactionData() {
     showSearchSuggestions: false,
     searchSuggestions: [],
     selectedSuggestionIndex: -1,
+    suggestionRequest: null,
     envelopes: [],
     accounts: [],
+    budgetEvents: null,
+    searchFacets: null,
+    // The search the facets were counted for
+    facetsQuery: null,
 
     async loadSearchData() {
       try {
@@ -389,8 +414,6 @@ function transactionData() {
         return;
       }
 
-      const lowerTerm = currentTerm.toLowerCase();
-
       // Number-based suggestions (amount, inflow, outflow)
       const numberMatch = currentTerm.match(/^-?\d+\.?\d{0,2}$/);
       if (numberMatch) {
@@ -455,70 +478,43 @@ function transactionData() {
           }
         );
       } else {
-        // Status and location filters
-        const statusFilters = [
-          { key: 'is:cleared', description: 'Cleared transactions' },
-          { key: 'is:uncleared', description: 'Uncleared transactions' },
-          { key: 'is:pending', description: 'Pending transactions' },
-          { key: 'is:unassigned', description: 'Unassigned transactions' },
-          { key: 'in:inbox', description: 'Transactions in inbox' },
-          { key: 'in:trash', description: 'Transactions in trash' },
-        ];
-
-        for (const filter of statusFilters) {
-          if (filter.key.toLowerCase().includes(lowerTerm)) {
-            suggestions.push({
-              display: filter.key,
-              description: filter.description,
-              type: 'filter',
-              value: filter.key,
-              priority: 100,
-            });
-          }
-        }
-
-        // Envelope suggestions
-        for (const envelope of this.envelopes) {
-          if (envelope.name.toLowerCase().includes(lowerTerm)) {
-            suggestions.push({
-              display: `envelope:${envelope.name}`,
-              description: `Filter by ${envelope.categoryName} envelope`,
-              type: 'envelope',
-              value: `envelope:${envelope.name}`,
-              priority: 200,
-            });
-          }
-        }
-
-        // Account suggestions
-        for (const account of this.accounts) {
-          if (account.name.toLowerCase().includes(lowerTerm)) {
-            suggestions.push({
-              display: `account:${account.name}`,
-              description: 'Filter by account',
-              type: 'account',
-              value: `account:${account.name}`,
-              priority: 300,
-            });
-          }
-        }
+        // Filters and envelope, account and payee names come from the server's
+        // per-budget vocabulary, most used first
+        this.fetchSearchSuggestions(currentTerm);
+        return;
+      }
 
-        // Sort non-number suggestions by relevance (exact matches first, then partial matches)
-        suggestions.sort((a, b) => {
-          const aExact = a.display.toLowerCase().startsWith(lowerTerm);
-          const bExact = b.display.toLowerCase().startsWith(lowerTerm);
+      this.searchSuggestions = suggestions.slice(0, 8); // Limit to 8 suggestions for better UX
+    },
 
-          if (aExact && !bExact) return -1;
-          if (!aExact && bExact) return 1;
+    async fetchSearchSuggestions(term) {
+      if (this.suggestionRequest) {
+        this.suggestionRequest.abort();
+      }
+      const request = new AbortController();
+      this.suggestionRequest = request;
+      const budgetId = getCookie('budget_id');
 
-          // Then by priority, then alphabetically
-          if (a.priority !== b.priority) return a.priority - b.priority;
-          return a.display.localeCompare(b.display);
+      try {
+        const response = await fetch(`/api/transactions/${budgetId}/typeahead?q=${encodeURIComponent(term)}`, {
+          headers: { Accept: 'application/json' },
+          signal: request.signal,
         });
+        if (!response.ok) {
+          throw new Error(`HTTP error! Status: ${response.status}`);
+        }
+        const suggestions = await response.json();
+        // Ignore answers for a term that has since been replaced
+        if (this.getCurrentSearchTerm() === term) {
+          this.searchSuggestions = suggestions;
+        }
+      } catch (error) {
+        if (error.name !== 'AbortError') {
+          console.error('Error fetching search suggestions:', error);
+        }
       }
-
-      this.searchSuggestions = suggestions.slice(0, 8); // Limit to 8 suggestions for better UX
     },
+
     getCurrentSearchTerm() {
       const terms = this.searchQuery.split(',');
       const currentTerm = terms[terms.length - 1].trim();
@@ -573,6 +569,11 @@ function transactionData() {
       const budgetId = getCookie('budget_id');
       const accountId = getCookie('account_id');
 
+      // Facets cover every match, not the page, so paging through the same
+      // search reuses them instead of running the grouped count again
+      const searchQuery = this.searchQuery;
+      const withFacets = !!searchQuery && (this.currentPage === 1 || searchQuery !== this.facetsQuery);
+
       try {
         // Use the search-enabled function
         const data = await get_transactions_with_search(
@@ -580,7 +581,8 @@ function transactionData() {
           this.currentPage,
           this.transactionsPerPage,
           accountId,
-          this.searchQuery
+          searchQuery,
+          withFacets
         );
 
         if (data?.items) {
@@ -589,6 +591,13 @@ function transactionData() {
             checked: false,
           }));
           this.totalTransactions = data.count;
+          if (!searchQuery) {
+            this.searchFacets = null;
+            this.facetsQuery = null;
+          } else if (withFacets) {
+            this.searchFacets = data.facets || null;
+            this.facetsQuery = searchQuery;
+          }
         }
       } catch (error) {
         console.error('Error fetching transactions:', error);
@@ -597,9 +606,10 @@ function transactionData() {
 
     pullSimpleFINTransactions(sfin_id) {
       const budgetId = getCookie('budget_id');
+      const csrfToken = getCookie('csrftoken');
 
       // Base endpoint
-      let endpoint = `/api/accounts/${budgetId}/simplefin/transactions`;
+      let endpoint = `/api/accounts/${budgetId}/simplefin/sync`;
 
       // If we're on an account view, add the account_id parameter
       if (sfin_id) {
@@ -625,33 +635,100 @@ function transactionData() {
         `;
       }
 
-      fetch(endpoint)
-        .then(response => response.json())
-        .then(data => {
-          if (data.errors && data.errors.length > 0) {
-            // Display errors if any
-            showToast(`Error pulling transactions: ${data.errors.join(', ')}`);
-
-            // Reset button
-            if (button) {
-              button.disabled = false;
-              button.querySelector('span').textContent = 'Pull';
+      const resetButton = () => {
+        if (button) {
+          button.disabled = false;
+          button.querySelector('span').textContent = 'Pull';
+        }
+      };
+
+      // The sync runs in the background worker; poll the job until it finishes
+      const pollJob = jobId => {
+        fetch(`/api/accounts/${budgetId}/simplefin/sync/${jobId}`)
+          .then(response => response.json())
+          .then(job => {
+            if (job.status === 'queued' || job.status === 'running') {
+              setTimeout(() => pollJob(jobId), 2000);
+            } else if (job.status === 'failed') {
+              showToast(`Error pulling transactions: ${job.error}`);
+              resetButton();
+            } else if (job.result && job.result.errors && job.result.errors.length > 0) {
+              // Display errors if any
+              showToast(`Error pulling transactions: ${job.result.errors.join(', ')}`);
+              resetButton();
+            } else {
+              // Success - the event stream brings in the new transactions and
+              // balances, so only refetch when it is not connected
+              resetButton();
+              if (this.budgetEvents?.readyState !== EventSource.OPEN) {
+                this.fetchTransactions();
+                updateAccountBalances();
+              }
             }
+          })
+          .catch(error => {
+            console.error('Error checking SimpleFIN sync:', error);
+            showToast(`Failed to pull transactions: ${error.message}`);
+            resetButton();
+          });
+      };
+
+      fetch(endpoint, {
+        method: 'POST',
+        headers: {
+          Accept: 'application/json',
+          'X-CSRFToken': csrfToken,
+        },
+      })
+        .then(response => response.json())
+        .then(job => {
+          if (job.error) {
+            showToast(`Error pulling transactions: ${job.error}`);
+            resetButton();
           } else {
-            // Success - reload the page to show new transactions
-            window.location.reload();
+            pollJob(job.id);
           }
         })
         .catch(error => {
           console.error('Error pulling SimpleFIN transactions:', error);
           showToast(`Failed to pull transactions: ${error.message}`);
+          resetButton();
+        });
+    },
 
-          // Reset button
-          if (button) {
-            button.disabled = false;
-            button.querySelector('span').textContent = 'Pull';
-          }
+    async pullPlaidTransactions(accountId) {
+      const button = document.getElementById('pull-plaid-button');
+      if (button) {
+        button.disabled = true;
+      }
+
+      try {
+        const response = await fetch(`/accounts/plaid-sync/${accountId}/`, {
+          method: 'POST',
+          headers: {
+            Accept: 'application/json',
+            'X-CSRFToken': getCookie('csrftoken'),
+          },
         });
+        if (!response.ok) {
+          throw new Error(`HTTP error! Status: ${response.status}`);
+        }
+
+        const result = await response.json();
+        showToast(result.message);
+        // The event stream brings in the changes when it is connected
+        if (result.status === 'success' && this.budgetEvents?.readyState !== EventSource.OPEN) {
+          this.fetchTransactions();
+          updateAccountBalances();
+        }
+      } catch (error) {
+        console.error('Error syncing Plaid transactions:', error);
+        showToast(`Failed to sync transactions: ${error.message}`);
+      } finally {
+        if (button) {
+          button.disabled = false;
+        }
+      }
     },
 
     async importTransactions() {
@@ -726,9 +803,46 @@ function transactionData() {
     clearSearch() {
       this.searchQuery = '';
       this.isSearching = false;
+      this.searchFacets = null;
+      this.facetsQuery = null;
       this.fetchTransactions();
     },
 
+    // Label and search filter for one value of a facet of the results
+    facetOption(facet, value) {
+      if (facet === 'envelopes') {
+        if (value === null) return { label: 'Unassigned', filter: 'is:unassigned' };
+        const envelope = this.envelopes.find(e => e.id === value);
+        return envelope ? { label: envelope.name, filter: nameFilter('envelope', envelope.name) } : null;
+      }
+      if (facet === 'accounts') {
+        const account = this.accounts.find(a => a.id === value);
+        return account ? { label: account.name, filter: nameFilter('account', account.name) } : null;
+      }
+      if (facet === 'months') {
+        const [year, month] = value.split('-').map(Number);
+        const lastDay = new Date(year, month, 0).getDate();
+        const label = new Date(year, month - 1, 1).toLocaleString(undefined, { month: 'short', year: 'numeric' });
+        return { label, filter: `after:${value}-01, before:${value}-${String(lastDay).padStart(2, '0')}` };
+      }
+      return value ? { label: 'Cleared', filter: 'is:cleared' } : { label: 'Uncleared', filter: 'is:uncleared' };
+    },
+
+    // The largest values of a facet that can be drilled into
+    facetOptions(facet, limit = 5) {
+      if (!this.searchFacets) return [];
+      return this.searchFacets[facet]
+        .map(bucket => ({ ...bucket, ...this.facetOption(facet, bucket.value) }))
+        .filter(bucket => bucket.filter)
+        .slice(0, limit);
+    },
+
+    drillDown(filter) {
+      const query = this.searchQuery.trim().replace(/,$/, '');
+      this.searchQuery = query ? `${query}, ${filter}` : filter;
+      this.performSearch();
+    },
+
     formatAmount(amount, type) {
       if ((type === 'outflow' && amount < 0) || (type === 'inflow' && amount >= 0)) {
         return (Math.abs(amount) / 1000).toFixed(2);
@@ -1157,6 +1271,21 @@ function transactionData() {
       this.fetchTransactions();
       initKeyboardShortcuts(this);
 
+      let refetch = null;
+      this.budgetEvents = subscribeToBudgetEvents(getCookie('budget_id'), {
+        account: account => {
+          const accountBalanceElement = document.getElementById(`id_account_balance_${account.id}`);
+          if (accountBalanceElement) {
+            accountBalanceElement.innerText = moneyFormat(account.balance);
+          }
+        },
+        // An import arrives as a burst of events, so refetch the page once
+        transaction: () => {
+          clearTimeout(refetch);
+          refetch = setTimeout(() => this.fetchTransactions(), 250);
+        },
+      });
+
       // Add event listener for URL params
       const urlParams = new URLSearchParams(window.location.search);
       const searchParam = urlParams.get('search');
@@ -0,0 +1,93 @@
+"""
+Find pairs of unlinked transactions that are the two sides of one transfer,
+such as a checking account payment and the credit card credit it created.
+
+All candidates are loaded once and hash-joined on amount: inflows are
+bucketed by amount with their dates sorted, so each outflow only looks at
+the inflows of the opposite amount inside its date window instead of
+querying for them.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+# Days either side of a transaction's date that its counterpart may fall on
+DEFAULT_WINDOW_DAYS = 1
+
+
+def match_transfers(rows, window_days=DEFAULT_WINDOW_DAYS, inbox_only=True):
+    """
+    Pair outflows with inflows of the opposite amount in another account.
+
+    A pair scores 1.0 when both sides have the same date, less the further
+    apart they are, divided by the number of candidates the busier side
+    has, so ambiguous matches rank below unique ones. Pairs are then taken
+    best first and each transaction is used at most once.
+
+    Args:
+        rows (list): Dicts with ``id``, ``account_id``, ``amount``, ``date``
+            and ``in_inbox`` for each unlinked transaction
+        window_days (int): The most days apart the two sides can be
+        inbox_only (bool): Only pair transactions when at least one side is
+            in the inbox
+
+    Returns:
+        list: ``(outflow_id, inflow_id, score, days_apart)`` tuples, best
+            first
+    """
+    inflows = defaultdict(list)
+    for row in rows:
+        if row["amount"] > 0:
+            inflows[row["amount"]].append(row)
+    dates = {}
+    for amount, bucket in inflows.items():
+        bucket.sort(key=lambda row: (row["date"], row["id"]))
+        dates[amount] = [row["date"] for row in bucket]
+
+    window = timedelta(days=window_days)
+    candidates = []
+    for outflow in rows:
+        bucket = inflows.get(-outflow["amount"])
+        if outflow["amount"] >= 0 or not bucket:
+            continue
+        bucket_dates = dates[-outflow["amount"]]
+        start = bisect_left(bucket_dates, outflow["date"] - window)
+        end = bisect_right(bucket_dates, outflow["date"] + window)
+        for inflow in bucket[start:end]:
+            if inflow["account_id"] == outflow["account_id"]:
+                continue
+            if inbox_only and not (outflow["in_inbox"] or inflow["in_inbox"]):
+                continue
+            days_apart = abs((inflow["date"] - outflow["date"]).days)
+            candidates.append((outflow["id"], inflow["id"], days_apart))
+
+    competing = Counter()
+    for outflow_id, inflow_id, _ in candidates:
+        competing[outflow_id] += 1
+        competing[inflow_id] += 1
+    ranked = sorted(
+        (
+            (
+                outflow_id,
+                inflow_id,
+                round(
+                    (1 - days_apart / (window_days + 1))
+                    / max(competing[outflow_id], competing[inflow_id]),
+                    4,
+                ),
+                days_apart,
+            )
+            for outflow_id, inflow_id, days_apart in candidates
+        ),
+        key=lambda pair: (-pair[2], pair[3], pair[0], pair[1]),
+    )
+
+    used = set()
+    pairs = []
+    for pair in ranked:
+        if pair[0] in used or pair[1] in used:
+            continue
+        used.update(pair[:2])
+        pairs.append(pair)
+    return pairs
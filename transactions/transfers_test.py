@@ -0,0 +1,147 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from accounts.models import Account
+from budgets.models import Budget
+from transactions.models import Transaction
+
+
+class TransferMatchTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="transfers", password="transfers"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.checking = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        self.savings = Account.objects.create(
+            budget=self.budget, name="Savings", type="savings"
+        )
+        self.card = Account.objects.create(
+            budget=self.budget, name="Card", type="credit_card"
+        )
+
+    def transaction(self, account, amount, day, in_inbox=True):
+        return Transaction.objects.create(
+            budget=self.budget,
+            account=account,
+            amount=amount,
+            date=date(2025, 3, day),
+            in_inbox=in_inbox,
+        )
+
+    def test_pairs_are_ranked_and_unique(self):
+        """Test that exact matches rank first and each side is used once"""
+        payment = self.transaction(self.checking, -50_000, 10)
+        credit = self.transaction(self.card, 50_000, 10)
+        saved = self.transaction(self.checking, -20_000, 10)
+        deposit = self.transaction(self.savings, 20_000, 11)
+        # Same account and too far apart never match
+        self.transaction(self.checking, 20_000, 10)
+        self.transaction(self.savings, 50_000, 20)
+
+        with self.assertNumQueries(2):
+            pairs = Transaction.find_transfer_pairs(self.budget.id)
+
+        self.assertEqual(
+            [(outflow, inflow) for outflow, inflow, _, _ in pairs],
+            [(payment.id, credit.id), (saved.id, deposit.id)],
+        )
+        self.assertEqual(pairs[0][2:], (1.0, 0))
+        self.assertEqual(pairs[1][3], 1)
+
+    def test_ambiguous_matches_rank_lower(self):
+        """Test that an outflow with two candidates scores below a unique one"""
+        self.transaction(self.checking, -10_000, 5)
+        self.transaction(self.card, 10_000, 5)
+        self.transaction(self.savings, 10_000, 5)
+        unique_out = self.transaction(self.checking, -30_000, 5)
+        unique_in = self.transaction(self.card, 30_000, 5)
+
+        pairs = Transaction.find_transfer_pairs(self.budget.id)
+
+        self.assertEqual(len(pairs), 2)
+        self.assertEqual(pairs[0][:3], (unique_out.id, unique_in.id, 1.0))
+        self.assertEqual(pairs[1][2], 0.5)
+
+    def test_pairs_need_an_inbox_side(self):
+        """Test that already reviewed transactions are only paired on request"""
+        self.transaction(self.checking, -10_000, 5, in_inbox=False)
+        self.transaction(self.card, 10_000, 5, in_inbox=False)
+
+        self.assertEqual(Transaction.find_transfer_pairs(self.budget.id), [])
+        self.assertEqual(
+            len(Transaction.find_transfer_pairs(self.budget.id, inbox_only=False)), 1
+        )
+
+    def test_link_transfers(self):
+        """Test that accepted pairs are linked with one write per side"""
+        pairs = []
+        for day in range(1, 11):
+            outflow = self.transaction(self.checking, -1_000 * day, day)
+            inflow = self.transaction(self.savings, 1_000 * day, day)
+            pairs.append((outflow.id, inflow.id))
+        self.checking.refresh_from_db()
+        balance = self.checking.balance
+
+        # Savepoint, one SELECT, one bulk update per side, release
+        with self.assertNumQueries(5):
+            self.assertEqual(Transaction.link_transfers(self.budget.id, pairs), 10)
+
+        outflow = Transaction.objects.get(id=pairs[0][0])
+        self.assertTrue(outflow.is_transfer)
+        self.assertFalse(outflow.in_inbox)
+        self.assertEqual(outflow.transfer_account_id, self.savings.id)
+        self.assertEqual(outflow.transfer_transaction_id, pairs[0][1])
+        inflow = Transaction.objects.get(id=pairs[0][1])
+        self.assertEqual(inflow.transfer_transaction_id, pairs[0][0])
+        self.checking.refresh_from_db()
+        self.assertEqual(self.checking.balance, balance)
+        self.assertEqual(Transaction.find_transfer_pairs(self.budget.id), [])
+
+    def test_link_rejects_mismatched_pairs(self):
+        """Test that nothing is linked when one pair is invalid"""
+        good = (
+            self.transaction(self.checking, -1_000, 1).id,
+            self.transaction(self.savings, 1_000, 1).id,
+        )
+        bad = (
+            self.transaction(self.checking, -1_000, 2).id,
+            self.transaction(self.savings, 2_000, 2).id,
+        )
+
+        with self.assertRaises(ValidationError):
+            Transaction.link_transfers(self.budget.id, [good, bad])
+        self.assertFalse(Transaction.objects.filter(is_transfer=True).exists())
+
+    def test_match_and_link_endpoints(self):
+        """Test suggesting and linking transfers through the API"""
+        payment = self.transaction(self.checking, -50_000, 10)
+        credit = self.transaction(self.card, 50_000, 9)
+        self.client.force_login(self.user)
+
+        response = self.client.get(
+            f"/api/transactions/{self.budget.id}/transfers/matches"
+        )
+        self.assertEqual(response.status_code, 200)
+        match = response.json()[0]
+        self.assertEqual(match["outflow"]["id"], payment.id)
+        self.assertEqual(match["inflow"]["id"], credit.id)
+        self.assertEqual(match["days_apart"], 1)
+
+        response = self.client.post(
+            f"/api/transactions/{self.budget.id}/transfers/link",
+            {"pairs": [{"outflow_id": payment.id, "inflow_id": credit.id}]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.json(), {"linked_count": 1})
+        response = self.client.post(
+            f"/api/transactions/{self.budget.id}/transfers/link",
+            {"pairs": [{"outflow_id": payment.id, "inflow_id": credit.id}]},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,315 @@
+"""
+Search-bar suggestions from an in-memory vocabulary per budget.
+
+Each budget's envelope, account and payee names are kept in one sorted list
+of keys (every word of a name and the whole name), so the names with a word
+starting with what was typed are a contiguous run found by bisection, and
+are ranked by how many transactions use them. A lookup touches no database
+table besides the budget's version.
+
+A vocabulary is only rebuilt when its ``BudgetVersion`` moved on and one of
+the names changed: the few envelope and account names read again differ, or
+a payee carries a newer ``sync_version`` (or was hard-deleted). Writes that
+only touch transactions leave the names alone and just let the usage counts
+age for up to ``USAGE_TTL`` seconds. Memory is bounded by keeping at most
+``MAX_CACHED_BUDGETS`` vocabularies and the ``MAX_PAYEES`` most used payees
+of each.
+"""
+
+from bisect import bisect_left
+from collections import OrderedDict
+from typing import NamedTuple
+import heapq
+import re
+import threading
+import time
+
+from django.db.models import Count
+
+# Budgets whose vocabulary is kept in memory
+MAX_CACHED_BUDGETS = 32
+
+# Most used payees kept per budget; the long tail of one-off payees is what
+# makes vocabularies large
+MAX_PAYEES = 2000
+
+# Answers remembered per vocabulary
+MAX_CACHED_LOOKUPS = 1024
+
+# Seconds the usage counts may lag behind transaction writes
+USAGE_TTL = 300
+
+DEFAULT_LIMIT = 8
+
+# Filters that take a fixed value, as (suggestion, description)
+STATIC_FILTERS = (
+    ("is:cleared", "Cleared transactions"),
+    ("is:uncleared", "Uncleared transactions"),
+    ("is:pending", "Pending transactions"),
+    ("is:unassigned", "Unassigned transactions"),
+    ("is:archived", "Archived transactions"),
+    ("in:inbox", "Transactions in inbox"),
+    ("in:trash", "Transactions in trash"),
+)
+
+# Keys past the last character of any key starting with a prefix
+_PREFIX_END = "\U0010ffff"
+
+
+class Term(NamedTuple):
+    """A name in a vocabulary, with how many transactions use it."""
+
+    kind: str
+    name: str
+    description: str
+    usage: int
+
+    @property
+    def value(self):
+        """The search-bar text that filters by this term."""
+        if self.kind == "payee":
+            # Payee names are searched as one phrase
+            return '"{}"'.format(self.name.replace('"', ""))
+        return f"{self.kind}:{self.name}"
+
+
+class Vocabulary:
+    """
+    The envelope, account and payee names of one budget, indexed by the
+    prefixes of their words.
+
+    Terms are stored most used first, so a term's position is its rank and
+    the best matches of a prefix are the smallest positions in its run.
+    """
+
+    def __init__(self, terms, version):
+        self.terms = sorted(terms, key=lambda term: (-term.usage, term.name.casefold()))
+        self.version = version
+        self.counted_at = time.monotonic()
+        self.filter_names = []
+        # Recent answers; the same few prefixes are typed over and over
+        self.lookups = {}
+        keys = sorted(
+            {
+                (word, index)
+                for index, term in enumerate(self.terms)
+                for word in _words(term.name)
+            }
+        )
+        self.keys = [word for word, _ in keys]
+        self.indexes = [index for _, index in keys]
+
+    def lookup(self, prefix, kinds, limit=DEFAULT_LIMIT):
+        """
+        Find the most used terms with a word starting with ``prefix``.
+
+        Args:
+            prefix (str): What was typed, in any case; empty matches all
+            kinds (tuple): The kinds of term to return
+            limit (int): The most terms to return
+
+        Returns:
+            list: Terms, most used first
+        """
+        if limit <= 0:
+            return []
+        prefix = prefix.casefold()
+        key = (prefix, kinds, limit)
+        found = self.lookups.get(key)
+        if found is not None:
+            return found
+
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + _PREFIX_END, start)
+        found = []
+        for index in sorted(set(self.indexes[start:end])):
+            if self.terms[index].kind in kinds:
+                found.append(self.terms[index])
+                if len(found) == limit:
+                    break
+
+        if len(self.lookups) >= MAX_CACHED_LOOKUPS:
+            self.lookups.clear()
+        self.lookups[key] = found
+        return found
+
+    def counts_expired(self):
+        return time.monotonic() - self.counted_at > USAGE_TTL
+
+
+def _words(name):
+    folded = name.casefold()
+    return {folded, *re.findall(r"\w+", folded)}
+
+
+def suggest(budget_id, version, text, limit=DEFAULT_LIMIT):
+    """
+    Suggest search-bar terms for what was typed in the current section.
+
+    ``envelope:`` and ``account:`` complete names of that kind, ``is:`` and
+    ``in:`` their fixed values; anything else matches the fixed filters and
+    every kind of name.
+
+    Args:
+        budget_id (str): The ID of the budget
+        version (int): The budget's current ``BudgetVersion``
+        text (str): The section of the query being typed
+        limit (int): The most suggestions to return
+
+    Returns:
+        list: ``{"display", "description", "type", "value"}`` dicts
+    """
+    text = text.strip()
+    filter_match = re.match(r"(\w+):(.*)", text)
+    if filter_match:
+        key, prefix = filter_match.group(1).lower(), filter_match.group(2).strip()
+        if key in ("is", "in"):
+            return _static_suggestions(text.lower(), limit)
+        if key not in ("envelope", "account"):
+            return []
+        kinds = (key,)
+    else:
+        prefix = text
+        kinds = ("envelope", "account", "payee")
+
+    suggestions = [] if filter_match else _static_suggestions(text.lower(), limit)
+    terms = get_vocabulary(budget_id, version).lookup(
+        prefix, kinds, limit - len(suggestions)
+    )
+    suggestions.extend(
+        {
+            "display": term.value,
+            "description": term.description,
+            "type": term.kind,
+            "value": term.value,
+        }
+        for term in terms
+    )
+    return suggestions
+
+
+def _static_suggestions(text, limit):
+    if not text:
+        return []
+    return [
+        {"display": value, "description": description, "type": "filter", "value": value}
+        for value, description in STATIC_FILTERS
+        if value.startswith(text) or value.split(":")[1].startswith(text)
+    ][:limit]
+
+
+def build_vocabulary(budget_id, version):
+    """
+    Read a budget's names and usage counts, with one query per kind of name
+    and one grouped count per kind.
+    """
+    # pylint: disable=import-outside-toplevel
+    from transactions.models import Payee, Transaction
+
+    transactions = Transaction.objects.filter(budget_id=budget_id).order_by()
+    usage = {
+        kind: dict(
+            transactions.values(f"{kind}_id")
+            .annotate(count=Count("id"))
+            .values_list(f"{kind}_id", "count")
+        )
+        for kind in ("envelope", "account", "payee")
+    }
+
+    filter_names = _filter_names(budget_id)
+    terms = [
+        Term(kind, name, description, usage[kind].get(row_id, 0))
+        for kind, row_id, name, description in filter_names
+    ]
+    payees = Payee.objects.filter(budget_id=budget_id, deleted=False).values_list(
+        "id", "name"
+    )
+    terms.extend(
+        heapq.nlargest(
+            MAX_PAYEES,
+            (
+                Term("payee", name, "Search for payee", usage["payee"].get(payee_id, 0))
+                for payee_id, name in payees
+            ),
+            key=lambda term: term.usage,
+        )
+    )
+    vocabulary = Vocabulary(terms, version)
+    vocabulary.filter_names = filter_names
+    return vocabulary
+
+
+def _filter_names(budget_id):
+    """The budget's envelopes and accounts as (kind, id, name, description)."""
+    # pylint: disable=import-outside-toplevel
+    from accounts.models import Account
+    from envelopes.models import Envelope
+
+    names = [
+        ("envelope", envelope_id, name, f"Filter by {category} envelope")
+        for envelope_id, name, category in Envelope.objects.filter(
+            budget_id=budget_id
+        ).values_list("id", "name", "category__name")
+    ]
+    names.extend(
+        ("account", account_id, name, "Filter by account")
+        for account_id, name in Account.objects.filter(
+            budget_id=budget_id, deleted=False
+        ).values_list("id", "name")
+    )
+    return names
+
+
+def _names_changed(vocabulary, budget_id):
+    """
+    Whether any name a vocabulary holds changed since it was built.
+
+    Accounts and envelopes get a new ``sync_version`` whenever a transaction
+    moves their balance, so their few names are read again and compared.
+    Payees only change when they are renamed, merged, added or deleted.
+    """
+    # pylint: disable=import-outside-toplevel
+    from budgets.models import Tombstone
+    from transactions.models import Payee
+
+    if _filter_names(budget_id) != vocabulary.filter_names:
+        return True
+    return (
+        Payee.objects.filter(
+            budget_id=budget_id, sync_version__gt=vocabulary.version
+        ).exists()
+        or Tombstone.objects.filter(
+            budget_id=budget_id, kind="payees", version__gt=vocabulary.version
+        ).exists()
+    )
+
+
+_vocabularies = OrderedDict()
+_vocabularies_lock = threading.Lock()
+
+
+def get_vocabulary(budget_id, version):
+    """
+    Return the budget's vocabulary as of ``version``, building it only if
+    the cached one is missing, holds outdated names or outdated counts.
+    """
+    with _vocabularies_lock:
+        vocabulary = _vocabularies.get(budget_id)
+        if vocabulary is not None:
+            _vocabularies.move_to_end(budget_id)
+
+    if vocabulary is not None and vocabulary.version < version:
+        if vocabulary.counts_expired() or _names_changed(vocabulary, budget_id):
+            vocabulary = None
+        else:
+            # Only transactions changed since it was built
+            vocabulary.version = version
+
+    if vocabulary is None:
+        vocabulary = build_vocabulary(budget_id, version)
+        with _vocabularies_lock:
+            _vocabularies[budget_id] = vocabulary
+            _vocabularies.move_to_end(budget_id)
+            while len(_vocabularies) > MAX_CACHED_BUDGETS:
+                _vocabularies.popitem(last=False)
+    return vocabulary
@@ -0,0 +1,107 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from accounts.models import Account
+from budgets.models import Budget, BudgetVersion
+from envelopes.models import Category, Envelope
+from transactions import typeahead
+from transactions.models import Payee, Transaction
+
+
+class TypeaheadTests(TestCase):
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username="typeahead", password="typeahead"
+        )
+        self.budget = Budget.objects.create(user=self.user, name="Budget")
+        self.checking = Account.objects.create(
+            budget=self.budget, name="Checking", type="checking"
+        )
+        category = Category.objects.create(budget=self.budget, name="Everyday")
+        self.groceries = Envelope.objects.create(
+            budget=self.budget, category=category, name="Groceries"
+        )
+        Envelope.objects.create(budget=self.budget, category=category, name="Gifts")
+        self.grocer = Payee.get_or_create_one(self.budget.id, "Green Grocer")
+        Payee.get_or_create_one(self.budget.id, "Gas Station")
+        for _ in range(3):
+            self.add_transaction()
+        # The envelope is used once more than the payee
+        Transaction.objects.create(
+            budget=self.budget,
+            account=self.checking,
+            envelope=self.groceries,
+            amount=-1_000,
+            date=date(2025, 6, 2),
+        )
+        self.url = f"/api/transactions/{self.budget.id}/typeahead"
+        self.client.force_login(self.user)
+
+    def add_transaction(self):
+        return Transaction.objects.create(
+            budget=self.budget,
+            account=self.checking,
+            envelope=self.groceries,
+            payee=self.grocer,
+            amount=-4_000,
+            date=date(2025, 6, 1),
+        )
+
+    def suggest(self, text):
+        version = BudgetVersion.current(self.budget.id)
+        return [s["value"] for s in typeahead.suggest(self.budget.id, version, text)]
+
+    def test_prefix_lookups(self):
+        """Test word-prefix matches, most used first, and scoped filters"""
+        self.assertEqual(self.suggest("gr"), ["envelope:Groceries", '"Green Grocer"'])
+        self.assertEqual(
+            self.suggest("G")[:2], ["envelope:Groceries", '"Green Grocer"']
+        )
+        self.assertEqual(self.suggest("station"), ['"Gas Station"'])
+        self.assertEqual(self.suggest("envelope:gi"), ["envelope:Gifts"])
+        self.assertEqual(self.suggest("account:"), ["account:Checking"])
+        self.assertEqual(self.suggest("is:un"), ["is:uncleared", "is:unassigned"])
+        self.assertEqual(self.suggest("cle"), ["is:cleared"])
+        self.assertEqual(self.suggest("after:2025"), [])
+
+    def test_vocabulary_is_cached_until_names_change(self):
+        """Test that only name changes rebuild a budget's vocabulary"""
+        version = BudgetVersion.current(self.budget.id)
+        vocabulary = typeahead.get_vocabulary(self.budget.id, version)
+        with self.assertNumQueries(0):
+            typeahead.get_vocabulary(self.budget.id, version)
+
+        # A transaction write keeps the names; only the version moves on
+        self.add_transaction()
+        version = BudgetVersion.current(self.budget.id)
+        self.assertIs(typeahead.get_vocabulary(self.budget.id, version), vocabulary)
+        self.assertEqual(vocabulary.version, version)
+
+        self.grocer.name = "Corner Grocer"
+        self.grocer.save()
+        self.assertIn('"Corner Grocer"', self.suggest("corner"))
+        self.assertEqual(self.suggest("green"), [])
+
+    def test_api(self):
+        """Test the endpoint for the owner and for someone else"""
+        response = self.client.get(self.url, {"q": "envelope:groc"})
+        self.assertEqual(
+            response.json(),
+            [
+                {
+                    "display": "envelope:Groceries",
+                    "description": "Filter by Everyday envelope",
+                    "type": "envelope",
+                    "value": "envelope:Groceries",
+                }
+            ],
+        )
+        self.assertEqual(
+            len(self.client.get(self.url, {"q": "g", "limit": 1}).json()), 1
+        )
+
+        other = get_user_model().objects.create_user(username="other", password="x")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(self.url, {"q": "g"}).status_code, 404)
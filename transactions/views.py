@@ -2,6 +2,7 @@ from django.contrib.auth.decorators import login_required
 from django.shortcuts import render
 from django.http import JsonResponse
 
+from budgets.versions import condition_on_budget_version, session_budget_id
 from envelopes.models import Category, Envelope
 from .models import Payee
 
@@ -37,6 +38,7 @@ def payees(request):
 
 
 @login_required
+@condition_on_budget_version(session_budget_id)
 def payees_json(request):
     """
     Return payees for the current budget as JSON.